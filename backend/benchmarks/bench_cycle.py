@@ -0,0 +1,270 @@
+"""
+End-to-end benchmark of the scan cycle against synthetic career sites.
+
+Runs the real lambda_handler (scheduler, Playwright scraper, diff, outbox,
+matcher, notifier) with Firestore, Anthropic and Expo replaced by the
+in-memory fakes in benchmarks/fakes.py, and pages served by a local HTTP
+server (benchmarks/synthetic_site.py). Each scenario runs in its own process
+so peak memory is per scenario, and reports two cycles: "cold" (every job is
+new, some companies need learning) and "steady" (after churning a fraction
+of the postings).
+
+Each site lists all of its jobs on one page. A scenario fails (non-zero
+exit, no baseline saved) if any company's scan fails or a cycle extracts
+fewer jobs than the sites list, so a run without browsers is never mistaken
+for a fast one.
+
+``--shards N`` fans the scrape stage out to N local worker processes (the
+"process" fan-out backend), each with its own copy of the fake Firestore.
+Selectors learned in a worker are not shared back, so the steady cycle
+re-learns them; combine with ``--unlearned 0`` to compare cycle times.
+
+Requires Playwright browsers (``playwright install webkit``).
+
+Usage (from backend/):
+    python -m benchmarks.bench_cycle [--scenarios 10x100,100x10000,1000x100000]
+    python -m benchmarks.bench_cycle --save-baseline
+    python -m benchmarks.bench_cycle --scenarios 1000x1000 --shards 4 --unlearned 0
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "bench_cycle.json")
+DAY_MS = 24 * 3600 * 1000
+
+
+def make_users(count: int, companies: List[str], rng: random.Random):
+    from src.models import UserProfile, UserFilters
+    from benchmarks.synthetic_site import ROLES
+
+    words = sorted({word.lower() for role in ROLES for word in role.split()})
+    return [
+        UserProfile(
+            push_token=f"ExponentPushToken[{i}]",
+            user_id=f"user{i}",
+            filters=UserFilters(
+                companies=rng.sample(companies, min(len(companies), rng.randint(1, 5))),
+                roles=rng.sample(words, rng.randint(0, 2)),
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def run_cycle(context_ms: int = DAY_MS) -> Dict[str, Any]:
+    from src.handler import lambda_handler
+    from src.scheduling.budget import FakeLambdaContext
+
+    started = time.perf_counter()
+    result = lambda_handler(None, FakeLambdaContext(timeout_ms=context_ms))
+    elapsed = time.perf_counter() - started
+
+    metrics = result.get("metrics", {})
+    outcomes = metrics.get("companies", {}).get("outcomes", {})
+    return {
+        "cycle_s": round(elapsed, 3),
+        "companies_failed": sum(n for outcome, n in outcomes.items() if outcome != "ok"),
+        "jobs_found": metrics.get("counters", {}).get("jobs_found", 0),
+        "new_jobs": result.get("new_jobs", 0),
+        "notifications": result.get("notifications", {}).get("notifications", 0),
+        "first_notification_ms": result.get("first_notification_ms"),
+        "stages_ms": {name: s["total_ms"] for name, s in metrics.get("stages", {}).items()},
+        "company_latency_p95_ms": metrics.get("companies", {}).get("latency_p95_ms"),
+        "firestore_reads": metrics.get("firestore", {}).get("reads", 0),
+        "firestore_writes": metrics.get("firestore", {}).get("writes", 0),
+    }
+
+
+def run_scenario(companies: int, users: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Build the fakes and sites for one scenario and run a cold and a steady cycle."""
+    from config import Config
+    from src import clients
+    from src.models import ScraperConfig
+    from benchmarks.fakes import FakeFirestore, FakeSelectorLearner, make_notifier, write_fakes_spec
+    from benchmarks.synthetic_site import LAYOUTS, SyntheticSites, churn, make_sites
+
+    Config.FIREBASE_PROJECT_ID = Config.FIREBASE_PROJECT_ID or "benchmark"
+    Config.ANTHROPIC_API_KEY = Config.ANTHROPIC_API_KEY or "benchmark"
+    Config.SCRAPER_CONCURRENCY = args.concurrency
+
+    rng = random.Random(args.seed)
+    sites = make_sites(companies, rng, jobs=args.jobs, latency_ms=args.site_latency_ms)
+    expected_jobs = sum(min(site.jobs, Config.SCRAPER_MAX_CONTAINERS) for site in sites)
+
+    with SyntheticSites(sites) as server:
+        configs = []
+        for site in sites:
+            layout = LAYOUTS[site.layout]
+            configs.append(ScraperConfig(
+                company=site.company,
+                career_url=server.url_for(site),
+                job_container_selector=layout["job_container_selector"],
+                title_selector=layout["title_selector"],
+                location_selector=layout["location_selector"],
+                link_selector=layout["link_selector"],
+                is_learned=rng.random() >= args.unlearned,
+            ))
+
+        db = FakeFirestore(
+            make_users(users, [site.company for site in sites], rng),
+            configs,
+            latency_ms=args.db_latency_ms,
+        )
+        learner = FakeSelectorLearner(args.llm_latency_ms)
+        if args.shards > 1:
+            Config.FANOUT_SHARDS = args.shards
+            Config.FANOUT_BACKEND = "process"
+            spec_path = os.path.join(tempfile.mkdtemp(), "fakes.json")
+            write_fakes_spec(
+                spec_path, configs,
+                db_latency_ms=args.db_latency_ms,
+                llm_latency_ms=args.llm_latency_ms,
+                concurrency=args.concurrency,
+            )
+        clients.reset()
+        clients.use("firestore", db)
+        clients.use("learner", learner)
+        clients.use("notifier", make_notifier(args.expo_latency_ms))
+
+        cold = run_cycle()
+
+        churn(sites, args.churn, rng)
+        db.cursor.next_due.clear()  # Make every company due again
+        steady = run_cycle()
+
+    return {
+        "companies": companies,
+        "users": users,
+        "shards": args.shards,
+        "expected_jobs": expected_jobs,
+        "cold": cold,
+        "steady": steady,
+        "learned": learner.calls,
+        "page_requests": server.requests,
+        # ru_maxrss is KiB on Linux; browser processes are not included
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def problems(result: Dict[str, Any]) -> List[str]:
+    """Why a scenario's numbers cannot be trusted (failed scans, missing jobs); empty if they can."""
+    found = []
+    for phase in ("cold", "steady"):
+        r = result[phase]
+        if r["companies_failed"]:
+            found.append(f"{phase}: {r['companies_failed']} of {result['companies']} companies failed")
+        if r["jobs_found"] < result["expected_jobs"]:
+            found.append(f"{phase}: extracted {r['jobs_found']} of {result['expected_jobs']} jobs")
+    return found
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """Print deltas against the baseline; returns False if anything regressed beyond ``tolerance``."""
+    ok = True
+    print(f"\nvs baseline ({BASELINE_PATH}), tolerance {tolerance:.0%}:")
+    for result in results:
+        key = f"{result['companies']}x{result['users']}"
+        base = baseline.get(key)
+        if base is None:
+            print(f"  {key:>14}: no baseline")
+            continue
+        for label, now, then in [
+            ("cold cycle_s", result["cold"]["cycle_s"], base["cold"]["cycle_s"]),
+            ("steady cycle_s", result["steady"]["cycle_s"], base["steady"]["cycle_s"]),
+            ("peak_rss_mb", result["peak_rss_mb"], base["peak_rss_mb"]),
+        ]:
+            delta = (now - then) / then if then else 0.0
+            flag = "REGRESSION" if delta > tolerance else ""
+            ok = ok and not flag
+            print(f"  {key:>14} {label:>15}: {then:9.2f} -> {now:9.2f} ({delta:+.1%}) {flag}")
+    return ok
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    key = f"{result['companies']} companies x {result['users']} users, {result['shards']} shard(s)"
+    print(f"\n{key}  (peak RSS {result['peak_rss_mb']} MB, {result['learned']} learned, "
+          f"{result['page_requests']} page loads)")
+    for phase in ("cold", "steady"):
+        r = result[phase]
+        print(f"  {phase:>6}: {r['cycle_s']:8.2f}s  jobs_found={r['jobs_found']:<6} new_jobs={r['new_jobs']:<6} "
+              f"notifications={r['notifications']:<6} first_notification_ms={r['first_notification_ms']} "
+              f"firestore_reads={r['firestore_reads']} firestore_writes={r['firestore_writes']}")
+        stages = sorted(r["stages_ms"].items(), key=lambda item: -item[1])
+        print("          " + "  ".join(f"{name}={ms / 1000:.2f}s" for name, ms in stages))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="10x100,100x10000,1000x100000",
+                        help="Comma-separated COMPANIESxUSERS")
+    parser.add_argument("--jobs", type=int, default=25, help="Mean jobs per company")
+    parser.add_argument("--churn", type=float, default=0.05, help="Fraction of postings replaced between cycles")
+    parser.add_argument("--unlearned", type=float, default=0.1, help="Fraction of companies needing learning")
+    parser.add_argument("--concurrency", type=int, default=4, help="Companies scraped at once per worker")
+    parser.add_argument("--shards", type=int, default=1, help="Fan-out worker processes (1 = no fan-out)")
+    parser.add_argument("--site-latency-ms", type=float, default=50.0)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=2000.0)
+    parser.add_argument("--expo-latency-ms", type=float, default=150.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        companies, users = (int(n) for n in args.scenarios.split("x"))
+        result = run_scenario(companies, users, args)
+        sys.stdout.write("\nRESULT " + json.dumps(result) + "\n")
+        return
+
+    results = []
+    failed = False
+    child_args = [
+        f"--{name.replace('_', '-')}={value}"
+        for name, value in vars(args).items()
+        if name not in ("scenarios", "save_baseline", "tolerance", "single")
+    ]
+    for scenario in args.scenarios.split(","):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_cycle", "--single", "--scenarios", scenario, *child_args],
+            capture_output=True,
+            text=True,
+        )
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("RESULT ")]
+        if proc.returncode != 0 or not lines:
+            print(f"Scenario {scenario} failed:\n{proc.stderr[-2000:]}")
+            sys.exit(1)
+        result = json.loads(lines[-1][len("RESULT "):])
+        print_result(result)
+        for problem in problems(result):
+            print(f"  FAILED {problem}")
+            failed = True
+        results.append(result)
+
+    if failed:
+        print("\nScenarios did not scrape every company and job; not comparing or saving a baseline")
+        sys.exit(1)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({f"{r['companies']}x{r['users']}": r for r in results}, f, indent=2)
+        print(f"\nSaved baseline to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Microbenchmark compiled UserFilters.matches against the previous implementation,
+which lowercased every term and job field on every call.
+
+Usage (from backend/):
+    python -m benchmarks.bench_filters [--pairs 1000000]
+"""
+import argparse
+import random
+import timeit
+
+from src.models import JobPosting, UserFilters
+from benchmarks.bench_matcher import make_jobs, make_users
+
+
+def legacy_matches(filters: UserFilters, job: JobPosting) -> bool:
+    """UserFilters.matches as it was before filters were compiled."""
+    if not filters.companies and not filters.roles and not filters.keywords:
+        return True
+    if filters.companies:
+        if not any(comp.lower() in job.company.lower() for comp in filters.companies):
+            return False
+    if filters.roles or filters.keywords:
+        search_terms = filters.roles + filters.keywords
+        if not any(term.lower() in job.role.lower() for term in search_terms):
+            return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    users = make_users(2000, rng)
+    jobs = make_jobs(args.pairs // 2000 or 1, rng)
+    pairs = [(user.filters, job) for user in users for job in jobs]
+
+    for filters, job in pairs[:10000]:
+        assert filters.matches(job) == legacy_matches(filters, job)
+
+    legacy_s = timeit.timeit(lambda: [legacy_matches(f, j) for f, j in pairs], number=1)
+    compiled_s = timeit.timeit(lambda: [f.matches(j) for f, j in pairs], number=1)
+
+    per_legacy = legacy_s / len(pairs) * 1e9
+    per_compiled = compiled_s / len(pairs) * 1e9
+    print(f"pairs={len(pairs)}")
+    print(f"legacy matches():   {per_legacy:7.0f} ns/call")
+    print(f"compiled matches(): {per_compiled:7.0f} ns/call  ({legacy_s / compiled_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare time and memory of building 10k full JobPosting models per page
+against JobRecord with bulk ID hashing (the scrape-and-diff hot path).
+
+Usage (from backend/):
+    python -m benchmarks.bench_job_records [--jobs 10000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from src.models import JobPosting, JobRecord
+
+CAREER_URL = "https://example.com/careers"
+
+
+def scraped_fields(count: int):
+    return [
+        (f"Software Engineer {i}", f"City {i % 50}, CA", f"{CAREER_URL}/apply/{i}")
+        for i in range(count)
+    ]
+
+
+def build_postings(fields):
+    return [
+        JobPosting(id="auto", company="Example", role=role, location=location,
+                   link=link, source_url=CAREER_URL)
+        for role, location, link in fields
+    ]
+
+
+def build_records(fields):
+    return JobRecord.assign_ids([
+        JobRecord("Example", role, location, link, CAREER_URL)
+        for role, location, link in fields
+    ])
+
+
+def measure(build, fields):
+    start = time.perf_counter()
+    build(fields)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = build(fields)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=10_000)
+    args = parser.parse_args()
+
+    fields = scraped_fields(args.jobs)
+    posting_s, posting_peak, postings = measure(build_postings, fields)
+    record_s, record_peak, records = measure(build_records, fields)
+    assert [p.id for p in postings] == [r.id for r in records]
+
+    print(f"jobs={args.jobs}")
+    print(f"JobPosting: {posting_s * 1000:8.1f} ms  peak {posting_peak / 1e6:6.2f} MB")
+    print(f"JobRecord:  {record_s * 1000:8.1f} ms  peak {record_peak / 1e6:6.2f} MB  "
+          f"({posting_s / record_s:.1f}x faster, {posting_peak / record_peak:.1f}x less memory)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark FilterIndex against per-(user, job) UserFilters.matches.
+
+Usage (from backend/):
+    python -m benchmarks.bench_matcher [--users 100000] [--jobs 200]
+"""
+import argparse
+import random
+import time
+
+from src.models import JobPosting, UserProfile, UserFilters
+from src.notifier.matcher import FilterIndex
+
+COMPANIES = [f"Company {i}" for i in range(300)] + ["Google", "Google DeepMind", "Meta", "OpenAI"]
+ROLE_WORDS = ["software", "engineer", "research", "scientist", "product", "manager", "data",
+              "ml", "backend", "frontend", "mobile", "security", "intern", "designer"]
+KEYWORDS = ["new grad", "entry level", "junior", "2026", "university", "early career"]
+
+
+def make_users(count: int, rng: random.Random):
+    return [
+        UserProfile(
+            push_token=f"ExponentPushToken[{i}]",
+            filters=UserFilters(
+                companies=rng.sample(COMPANIES, rng.randint(1, 5)),
+                roles=rng.sample(ROLE_WORDS, rng.randint(0, 3)),
+                keywords=rng.sample(KEYWORDS, rng.randint(0, 2)),
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def make_jobs(count: int, rng: random.Random):
+    jobs = []
+    for _ in range(count):
+        role = " ".join(rng.sample(ROLE_WORDS, 2)).title()
+        if rng.random() < 0.3:
+            role += " - " + rng.choice(KEYWORDS).title()
+        jobs.append(JobPosting(
+            id="auto",
+            company=rng.choice(COMPANIES),
+            role=role,
+            location="Remote",
+            source_url="https://example.com/careers",
+        ))
+    return jobs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    users = make_users(args.users, rng)
+    jobs = make_jobs(args.jobs, rng)
+
+    start = time.perf_counter()
+    naive = {}
+    for i, user in enumerate(users):
+        relevant = [job for job in jobs if user.filters.matches(job)]
+        if relevant:
+            naive[i] = relevant
+    naive_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = FilterIndex(users)
+    build_s = time.perf_counter() - start
+    indexed = index.match_all(jobs)
+    total_s = time.perf_counter() - start
+
+    assert naive.keys() == indexed.keys(), "index results differ from UserFilters.matches"
+    assert all([j.id for j in naive[i]] == [j.id for j in indexed[i]] for i in naive)
+
+    print(f"users={args.users} jobs={args.jobs} matched_users={len(indexed)}")
+    print(f"naive matches():   {naive_s * 1000:9.1f} ms")
+    print(f"FilterIndex build: {build_s * 1000:9.1f} ms")
+    print(f"FilterIndex total: {total_s * 1000:9.1f} ms  ({naive_s / total_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
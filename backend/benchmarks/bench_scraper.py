@@ -0,0 +1,284 @@
+"""
+Offline, repeatable benchmark of the Playwright scraper against recorded pages.
+
+A corpus is a directory holding ``corpus.json`` and one HAR archive per
+career page. Replaying it (the default) runs ``scrape_company`` and
+``fetch_html_for_learning`` with SCRAPER_HAR_MODE=replay, so every response
+comes from the archives and nothing reaches the network. Each page reports
+its scrape and learning-fetch times, the requests it made and whether the
+extracted job IDs and learning HTML still match what was recorded; any
+mismatch, or a slowdown beyond ``--tolerance`` against the saved baseline,
+exits non-zero.
+
+``--engines chromium,webkit,firefox`` replays the corpus once per browser
+engine instead, reporting each page's load time, peak memory and whether
+extraction still matched, and the engine that did best per company: the
+value to set as ``browser`` in that company's scraper config.
+
+``--record`` (re)builds the corpus: from the live sites already listed in
+``corpus.json``, or with ``--synthetic N`` from N synthetic sites served
+locally (benchmarks/synthetic_site.py), which needs no network either.
+
+Requires Playwright browsers (``playwright install webkit``, plus any engine
+passed to ``--engines``).
+
+Usage (from backend/):
+    python -m benchmarks.bench_scraper --record --synthetic 20
+    python -m benchmarks.bench_scraper [--corpus DIR] [--repeat 5] [--save-baseline]
+    python -m benchmarks.bench_scraper --engines chromium,webkit,firefox
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "bench_scraper.json")
+
+
+def load_corpus(corpus_dir: str) -> List[Dict[str, Any]]:
+    with open(os.path.join(corpus_dir, "corpus.json")) as f:
+        return json.load(f)["entries"]
+
+
+def load_page(scraper, config) -> Dict[str, Any]:
+    """Learning fetch and scrape of one page, with timings, request counts and peak memory."""
+    from src.metrics.memory import watching_memory
+    from src.metrics.recorder import CycleMetrics, recording
+
+    metrics = CycleMetrics()
+    with recording(metrics), watching_memory() as memory:
+        started = time.perf_counter()
+        html = scraper.fetch_html_for_learning(config.career_url, browser=config.browser)
+        learning_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        jobs = scraper.scrape_company(config)
+        scrape_ms = (time.perf_counter() - started) * 1000
+
+    stages = metrics.summary()["stages"]
+    return {
+        "scrape_ms": scrape_ms,
+        "extraction_ms": stages.get("extraction", {}).get("total_ms", 0.0),
+        "learning_ms": learning_ms,
+        "load_ms": jobs.load_ms or 0.0,
+        "peak_memory_mb": memory.peak_mb,
+        "requests": metrics.counters.get("page_requests", 0),
+        "job_ids": sorted(job.id for job in jobs),
+        "learning_html_sha1": hashlib.sha1(html.encode()).hexdigest(),
+    }
+
+
+def record(corpus_dir: str, args: argparse.Namespace) -> None:
+    """Record a HAR and the expected results for every page of the corpus."""
+    from config import Config
+    from src.models import ScraperConfig
+    from src.scraper.playwright_scraper import CareerPageScraper
+
+    Config.SCRAPER_HAR_MODE = "record"
+    Config.SCRAPER_HAR_DIR = corpus_dir
+    os.makedirs(corpus_dir, exist_ok=True)
+    scraper = CareerPageScraper(keep_browser=True)
+
+    def record_all(configs: List[ScraperConfig]) -> None:
+        entries = []
+        for config in configs:
+            page = load_page(scraper, config)
+            print(f"  {config.company}: {len(page['job_ids'])} jobs, {page['requests']} requests")
+            entries.append({
+                "config": config.model_dump(mode="json"),
+                "expected": {key: page[key] for key in ("job_ids", "requests", "learning_html_sha1")},
+            })
+        with open(os.path.join(corpus_dir, "corpus.json"), "w") as f:
+            json.dump({"entries": entries}, f, indent=2)
+        print(f"Recorded {len(entries)} pages to {corpus_dir}")
+
+    try:
+        if args.synthetic:
+            from benchmarks.synthetic_site import LAYOUTS, SyntheticSites, make_sites
+
+            rng = random.Random(args.seed)
+            sites = make_sites(args.synthetic, rng, jobs=args.jobs, latency_ms=0.0)
+            with SyntheticSites(sites) as server:
+                record_all([
+                    ScraperConfig(
+                        company=site.company,
+                        career_url=server.url_for(site),
+                        **{key: LAYOUTS[site.layout][key] for key in (
+                            "job_container_selector", "title_selector", "location_selector", "link_selector",
+                        )},
+                    )
+                    for site in sites
+                ])
+        else:
+            record_all([ScraperConfig(**entry["config"]) for entry in load_corpus(corpus_dir)])
+    finally:
+        scraper.close_thread_browser()
+
+
+def replay(corpus_dir: str, repeat: int) -> List[Dict[str, Any]]:
+    """Replay every page ``repeat`` times; medians per page plus correctness."""
+    from config import Config
+    from src.models import ScraperConfig
+    from src.scraper.playwright_scraper import CareerPageScraper
+
+    Config.SCRAPER_HAR_MODE = "replay"
+    Config.SCRAPER_HAR_DIR = corpus_dir
+    scraper = CareerPageScraper(keep_browser=True)
+
+    results = []
+    try:
+        for entry in load_corpus(corpus_dir):
+            config = ScraperConfig(**entry["config"])
+            expected = entry["expected"]
+            runs = [load_page(scraper, config) for _ in range(repeat)]
+            last = runs[-1]
+            results.append({
+                "company": config.company,
+                "scrape_ms": round(statistics.median(r["scrape_ms"] for r in runs), 1),
+                "extraction_ms": round(statistics.median(r["extraction_ms"] for r in runs), 1),
+                "learning_ms": round(statistics.median(r["learning_ms"] for r in runs), 1),
+                "requests": last["requests"],
+                "jobs": len(last["job_ids"]),
+                "jobs_match": all(r["job_ids"] == expected["job_ids"] for r in runs),
+                "requests_match": last["requests"] == expected["requests"],
+                "learning_html_match": last["learning_html_sha1"] == expected["learning_html_sha1"],
+            })
+    finally:
+        scraper.close_thread_browser()
+    return results
+
+
+def compare_engines(corpus_dir: str, engines: List[str], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Replay every page with each engine; medians per page and engine.
+
+    Each engine gets its own warm browser, so launch cost is paid once per
+    engine and the numbers reflect steady-state page loads.
+    """
+    from config import Config
+    from src.models import ScraperConfig
+    from src.scraper.playwright_scraper import CareerPageScraper
+
+    Config.SCRAPER_HAR_MODE = "replay"
+    Config.SCRAPER_HAR_DIR = corpus_dir
+    entries = load_corpus(corpus_dir)
+
+    results = []
+    for engine in engines:
+        scraper = CareerPageScraper(keep_browser=True)
+        try:
+            for entry in entries:
+                config = ScraperConfig(**entry["config"]).model_copy(update={"browser": engine})
+                try:
+                    runs = [load_page(scraper, config) for _ in range(repeat)]
+                except Exception as e:
+                    print(f"  {config.company} failed on {engine}: {e}")
+                    results.append({"company": config.company, "engine": engine, "jobs_match": False})
+                    continue
+                results.append({
+                    "company": config.company,
+                    "engine": engine,
+                    "load_ms": round(statistics.median(r["load_ms"] for r in runs), 1),
+                    "scrape_ms": round(statistics.median(r["scrape_ms"] for r in runs), 1),
+                    "peak_memory_mb": round(max(r["peak_memory_mb"] for r in runs), 1),
+                    "jobs": len(runs[-1]["job_ids"]),
+                    "jobs_match": all(r["job_ids"] == entry["expected"]["job_ids"] for r in runs),
+                })
+        finally:
+            scraper.close_thread_browser()
+    return results
+
+
+def best_engines(results: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Per company, the fastest engine among those that extracted every job."""
+    best: Dict[str, Dict[str, Any]] = {}
+    for r in results:
+        if r["jobs_match"] and (r["company"] not in best or r["scrape_ms"] < best[r["company"]]["scrape_ms"]):
+            best[r["company"]] = r
+    return {company: r["engine"] for company, r in best.items()}
+
+
+def totals(results: List[Dict[str, Any]]) -> Dict[str, float]:
+    return {
+        key: round(sum(r[key] for r in results), 1)
+        for key in ("scrape_ms", "extraction_ms", "learning_ms", "requests")
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """Print deltas against the baseline; returns False if anything regressed beyond ``tolerance``."""
+    ok = True
+    now, then = totals(results), baseline["totals"]
+    print(f"\nvs baseline ({BASELINE_PATH}), tolerance {tolerance:.0%}:")
+    for key in ("scrape_ms", "extraction_ms", "learning_ms", "requests"):
+        delta = (now[key] - then[key]) / then[key] if then.get(key) else 0.0
+        flag = "REGRESSION" if delta > tolerance else ""
+        ok = ok and not flag
+        print(f"  {key:>14}: {then[key]:10.1f} -> {now[key]:10.1f} ({delta:+.1%}) {flag}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="Directory with corpus.json and the HAR archives")
+    parser.add_argument("--record", action="store_true", help="Record the corpus instead of replaying it")
+    parser.add_argument("--synthetic", type=int, default=0, help="With --record: record N synthetic sites")
+    parser.add_argument("--jobs", type=int, default=25, help="Mean jobs per synthetic site")
+    parser.add_argument("--repeat", type=int, default=5, help="Replays per page (medians are reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--engines", help="Compare these browser engines (comma-separated) instead")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.corpus, args)
+        return
+
+    if args.engines:
+        results = compare_engines(args.corpus, args.engines.split(","), args.repeat)
+        for r in results:
+            if "load_ms" in r:
+                print(f"  {r['company']:>24} {r['engine']:>8}: load {r['load_ms']:8.1f}ms  "
+                      f"scrape {r['scrape_ms']:8.1f}ms  peak {r['peak_memory_mb']:7.1f}MB  {r['jobs']:4d} jobs"
+                      f"{'' if r['jobs_match'] else '  MISMATCH'}")
+        best = best_engines(results)
+        print(f"\nBest engine per company: {json.dumps(best, indent=2)}")
+        for engine in args.engines.split(","):
+            print(f"  {engine}: best for {sum(e == engine for e in best.values())} of {len(best)} companies")
+        return
+
+    results = replay(args.corpus, args.repeat)
+    correct = True
+    for r in results:
+        mismatches = [key[:-len("_match")] for key in ("jobs_match", "requests_match", "learning_html_match")
+                      if not r[key]]
+        correct = correct and not mismatches
+        print(f"  {r['company']:>24}: scrape {r['scrape_ms']:8.1f}ms  extraction {r['extraction_ms']:8.1f}ms  "
+              f"learning {r['learning_ms']:8.1f}ms  {r['requests']:3d} requests  {r['jobs']:4d} jobs"
+              f"{'  MISMATCH: ' + ', '.join(mismatches) if mismatches else ''}")
+    print(f"\n{len(results)} pages, totals: {json.dumps(totals(results))}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"corpus": os.path.abspath(args.corpus), "totals": totals(results), "pages": results}, f, indent=2)
+        print(f"Saved baseline to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            correct = False
+
+    if not correct:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
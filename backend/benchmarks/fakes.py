@@ -0,0 +1,293 @@
+"""
+In-memory stand-ins for Firestore, Anthropic and Expo used by the offline
+benchmarks. They implement the same methods as ``FirestoreClient``,
+``SelectorLearner`` and Expo's ``PushClient``, with optional latency, so the
+real handler, scraper, matcher and notifier run unchanged against them.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from exponent_server_sdk import PushReceipt, PushTicket
+
+from config import Config
+from src import clients
+from src.diff.near_duplicates import NearDuplicateIndex
+from src.diff.snapshots import JobSnapshot
+from src.metrics.recorder import record_firestore
+from src.models import CompanyEntry, JobList, JobRecord, OutboxEntry, PushTicketRecord, ScanCursor, ScraperConfig, UserProfile
+from src.notifier.expo_push import NotificationService
+from benchmarks.synthetic_site import LAYOUTS
+
+
+class FakeFirestore:
+    """
+    Dict-backed implementation of every ``FirestoreClient`` method.
+
+    Calls are accounted like the real client's: one read per document
+    returned (at least one per query) and one write per document written,
+    though without byte estimates.
+    """
+
+    def __init__(self, users: List[UserProfile], configs: List[ScraperConfig], latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self._lock = threading.Lock()
+        self.users = {user.user_id: user for user in users}
+        self.configs = {config.company: config for config in configs}
+        self.seen_jobs: Set[str] = set()
+        self.push_tickets: Dict[str, PushTicketRecord] = {}
+        self.outbox: Dict[str, OutboxEntry] = {}
+        self.fingerprints: Dict[str, Tuple[bytes, bytes]] = {}
+        self.snapshots: Dict[str, bytes] = {}
+        self.job_status: Dict[str, str] = {}
+        self.cursor = ScanCursor()
+        self.companies: Dict[str, CompanyEntry] = {}
+        self.calls: Dict[str, int] = {}
+
+    def _call(self, name: str, reads: int = 0, writes: int = 0) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        record_firestore(name, reads, writes, 0, self.latency_ms)
+
+    def get_seen_jobs(self) -> Set[str]:
+        self._call("get_seen_jobs", reads=max(1, len(self.seen_jobs)))
+        return set(self.seen_jobs)
+
+    def add_seen_jobs(self, job_ids: List[str]) -> None:
+        self._call("add_seen_jobs", writes=len(job_ids))
+        with self._lock:
+            self.seen_jobs.update(job_ids)
+
+    def update_job_status(self, job_ids: List[str], status: str) -> None:
+        self._call("update_job_status", writes=len(job_ids))
+        with self._lock:
+            self.job_status.update((job_id, status) for job_id in job_ids)
+
+    def get_users(self) -> List[UserProfile]:
+        self._call("get_users", reads=max(1, len(self.users)))
+        return list(self.users.values())
+
+    def get_scraper_config(self, company: str) -> Optional[ScraperConfig]:
+        self._call("get_scraper_config", reads=1)
+        return self.configs.get(company)
+
+    def save_scraper_config(self, config: ScraperConfig) -> None:
+        self._call("save_scraper_config", writes=1)
+        self.configs[config.company] = config
+
+    def mark_config_needs_relearning(self, company: str) -> None:
+        self._call("mark_config_needs_relearning", writes=1)
+        if company in self.configs:
+            self.configs[company] = self.configs[company].model_copy(update={"is_learned": False})
+
+    def get_companies(self) -> List[CompanyEntry]:
+        self._call("get_companies", reads=max(1, len(self.companies)))
+        return list(self.companies.values())
+
+    def save_company(self, entry: CompanyEntry) -> None:
+        self._call("save_company", writes=1)
+        self.companies[entry.name] = entry
+
+    def deactivate_users(self, user_ids: List[str]) -> None:
+        self._call("deactivate_users", writes=len(set(user_ids)))
+        for user_id in user_ids:
+            self.users.pop(user_id, None)
+
+    def save_push_tickets(self, tickets: List[PushTicketRecord]) -> None:
+        self._call("save_push_tickets", writes=len(tickets))
+        with self._lock:
+            self.push_tickets.update({ticket.ticket_id: ticket for ticket in tickets})
+
+    def get_push_tickets(self, created_before: datetime) -> List[PushTicketRecord]:
+        tickets = [t for t in self.push_tickets.values() if t.created_at < created_before]
+        self._call("get_push_tickets", reads=max(1, len(tickets)))
+        return tickets
+
+    def delete_push_tickets(self, ticket_ids: List[str]) -> None:
+        self._call("delete_push_tickets", writes=len(ticket_ids))
+        for ticket_id in ticket_ids:
+            self.push_tickets.pop(ticket_id, None)
+
+    def enqueue_outbox(self, entries: List[OutboxEntry]) -> int:
+        with self._lock:
+            unique = {e.dedupe_key: e for e in entries}
+            new = {key: e for key, e in unique.items() if key not in self.outbox}
+            self.outbox.update(new)
+        self._call("enqueue_outbox", reads=len(unique), writes=len(new))
+        return len(new)
+
+    def get_pending_outbox(self, limit: int) -> List[OutboxEntry]:
+        now = datetime.utcnow()
+        with self._lock:
+            due = [e for e in self.outbox.values() if e.status == "pending" and e.next_attempt_at <= now]
+            pending = sorted(due, key=lambda e: e.next_attempt_at)[:limit]
+        self._call("get_pending_outbox", reads=max(1, len(pending)))
+        return pending
+
+    def mark_outbox_sent(self, entries: List[OutboxEntry]) -> None:
+        self._call("mark_outbox_sent", writes=len(entries))
+        with self._lock:
+            for entry in entries:
+                self.outbox[entry.dedupe_key] = entry.model_copy(update={"status": "sent"})
+
+    def mark_outbox_failed(self, entries: List[OutboxEntry]) -> None:
+        self._call("mark_outbox_failed", writes=len(entries))
+        with self._lock:
+            for entry in entries:
+                attempts = entry.attempts + 1
+                status = "failed" if attempts >= Config.OUTBOX_MAX_ATTEMPTS else "pending"
+                retry_at = datetime.utcnow() + timedelta(seconds=Config.OUTBOX_RETRY_BACKOFF_S * 2 ** (attempts - 1))
+                self.outbox[entry.dedupe_key] = entry.model_copy(
+                    update={"attempts": attempts, "status": status, "next_attempt_at": retry_at}
+                )
+
+    def get_job_fingerprints(self, company: str) -> NearDuplicateIndex:
+        self._call("get_job_fingerprints", reads=1)
+        fingerprints, last_seen = self.fingerprints.get(company, (b"", b""))
+        return NearDuplicateIndex.from_bytes(fingerprints, last_seen=last_seen)
+
+    def save_job_fingerprints(self, company: str, index: NearDuplicateIndex) -> None:
+        self._call("save_job_fingerprints", writes=1)
+        self.fingerprints[company] = (
+            index.to_bytes(limit=Config.NEAR_DUPLICATE_HISTORY),
+            index.last_seen_bytes(limit=Config.NEAR_DUPLICATE_HISTORY),
+        )
+
+    def get_job_snapshot(self, company: str) -> Optional[JobSnapshot]:
+        self._call("get_job_snapshot", reads=1)
+        data = self.snapshots.get(company)
+        return JobSnapshot.from_bytes(data) if data is not None else None
+
+    def save_job_snapshot(self, company: str, snapshot: JobSnapshot) -> None:
+        self._call("save_job_snapshot", writes=1)
+        self.snapshots[company] = snapshot.to_bytes()
+
+    def get_scan_cursor(self) -> ScanCursor:
+        self._call("get_scan_cursor", reads=1)
+        return self.cursor.model_copy(deep=True)
+
+    def save_scan_cursor(self, cursor: ScanCursor) -> None:
+        self._call("save_scan_cursor", writes=1)
+        self.cursor = cursor.model_copy(deep=True)
+
+
+class FakeSelectorLearner:
+    """
+    Answers like the LLM would for the synthetic layouts.
+
+    Recognizes a layout by its container markup in the HTML and returns its
+    selectors after ``latency_ms``, standing in for the Anthropic call.
+    """
+
+    def __init__(self, latency_ms: float = 2000.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def learn_selectors(self, company: str, career_url: str, html_content: str) -> ScraperConfig:
+        self.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        for layout in LAYOUTS.values():
+            tag, cls = layout["job_container_selector"].split(".")
+            if f'<{tag} class="{cls}"' in html_content:
+                return ScraperConfig(
+                    company=company,
+                    career_url=career_url,
+                    job_container_selector=layout["job_container_selector"],
+                    title_selector=layout["title_selector"],
+                    location_selector=layout["location_selector"],
+                    link_selector=layout["link_selector"],
+                )
+        raise ValueError(f"No job listings recognized for {company}")
+
+
+class FakeScraper:
+    """Returns ``jobs`` synthetic postings for any config after ``latency_ms``, without a browser."""
+
+    def __init__(self, jobs: int = 10, latency_ms: float = 0.0):
+        self.jobs = jobs
+        self.latency_ms = latency_ms
+
+    def scrape_company(self, config: ScraperConfig) -> JobList:
+        time.sleep(self.latency_ms / 1000)
+        jobs = JobList(JobRecord.assign_ids([
+            JobRecord(
+                company=config.company,
+                role=f"Software Engineer {i}",
+                location="Remote",
+                link=f"{config.career_url}/{i}",
+                source_url=config.career_url,
+            )
+            for i in range(self.jobs)
+        ]))
+        jobs.load_ms = self.latency_ms
+        return jobs
+
+    def fetch_html_for_learning(self, url: str, browser: Optional[str] = None) -> str:
+        time.sleep(self.latency_ms / 1000)
+        return "<html><body></body></html>"
+
+
+class FakePushClient:
+    """Accepts every message like Expo would, after ``latency_ms`` per request."""
+
+    def __init__(self, latency_ms: float = 150.0):
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self.messages = 0
+
+    def publish_multiple(self, push_messages) -> List[PushTicket]:
+        self.requests += 1
+        self.messages += len(push_messages)
+        time.sleep(self.latency_ms / 1000)
+        return [
+            PushTicket(push_message=m, status=PushTicket.SUCCESS_STATUS, message="", details=None, id=str(uuid.uuid4()))
+            for m in push_messages
+        ]
+
+    def check_receipts_multiple(self, tickets) -> List[PushReceipt]:
+        self.requests += 1
+        time.sleep(self.latency_ms / 1000)
+        return [PushReceipt(id=t.id, status=PushTicket.SUCCESS_STATUS, message="", details=None) for t in tickets]
+
+
+def make_notifier(latency_ms: float = 150.0) -> NotificationService:
+    """The real NotificationService (chunking, retries, threads) over a fake Expo."""
+    service = NotificationService()
+    service.client = FakePushClient(latency_ms)
+    return service
+
+
+FAKES_PATH_ENV = "BENCH_FAKES_PATH"
+
+
+def write_fakes_spec(path: str, configs: List[ScraperConfig], **options) -> None:
+    """
+    Describe the fakes for fan-out worker processes and point them at it.
+
+    Options: db_latency_ms, llm_latency_ms, concurrency, and scraper="fake"
+    with jobs and scrape_latency_ms to replace Playwright too.
+    """
+    with open(path, "w") as f:
+        json.dump({"configs": [c.model_dump(mode="json") for c in configs], **options}, f)
+    os.environ[FAKES_PATH_ENV] = path
+    Config.FANOUT_PROCESS_INITIALIZER = "benchmarks.fakes:install_fakes"
+
+
+def install_fakes() -> None:
+    """FANOUT_PROCESS_INITIALIZER hook: install the fakes written by ``write_fakes_spec``."""
+    with open(os.environ[FAKES_PATH_ENV]) as f:
+        spec = json.load(f)
+
+    if "concurrency" in spec:
+        Config.SCRAPER_CONCURRENCY = spec["concurrency"]
+    configs = [ScraperConfig(**config) for config in spec["configs"]]
+    clients.use("firestore", FakeFirestore([], configs, latency_ms=spec.get("db_latency_ms", 0.0)))
+    clients.use("learner", FakeSelectorLearner(spec.get("llm_latency_ms", 0.0)))
+    if spec.get("scraper") == "fake":
+        clients.use("scraper", FakeScraper(spec.get("jobs", 10), spec.get("scrape_latency_ms", 0.0)))
@@ -0,0 +1,161 @@
+"""
+Synthetic career sites for offline benchmarks.
+
+Serves one career page per company, listing all of its jobs, from a local
+HTTP server at ``/<slug>/careers``. Sites differ in markup (layout), job
+count and response latency, and ``churn`` replaces some of a site's oldest
+postings with new ones so later cycles find new jobs.
+"""
+import html
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+ROLES = ["Software Engineer", "Research Scientist", "Product Manager", "Data Engineer",
+         "ML Engineer", "Security Engineer", "Designer", "Recruiter", "Backend Engineer"]
+LEVELS = ["", "Senior ", "Staff ", "New Grad ", "Intern - "]
+LOCATIONS = ["Remote", "San Francisco, CA", "New York, NY", "London, UK", "Seattle, WA"]
+
+# Markup and the selectors that extract it (what the learner would find)
+LAYOUTS: Dict[str, Dict[str, str]] = {
+    "cards": {
+        "job_container_selector": "div.job-card",
+        "title_selector": "h3.job-title",
+        "location_selector": "span.job-location",
+        "link_selector": "a.apply",
+        "row": '<div class="job-card"><h3 class="job-title">{title}</h3>'
+               '<span class="job-location">{location}</span><a class="apply" href="{link}">Apply</a></div>',
+        "wrap": '<main class="jobs">{rows}</main>',
+    },
+    "table": {
+        "job_container_selector": "tr.job-row",
+        "title_selector": "td.title",
+        "location_selector": "td.loc",
+        "link_selector": "td a",
+        "row": '<tr class="job-row"><td class="title">{title}</td><td class="loc">{location}</td>'
+               '<td><a href="{link}">View</a></td></tr>',
+        "wrap": '<table class="openings"><tbody>{rows}</tbody></table>',
+    },
+    "list": {
+        "job_container_selector": "li.opening",
+        "title_selector": ".opening-name",
+        "location_selector": ".opening-place",
+        "link_selector": "a",
+        "row": '<li class="opening"><a href="{link}"><span class="opening-name">{title}</span></a>'
+               '<span class="opening-place">{location}</span></li>',
+        "wrap": '<ul class="openings-list">{rows}</ul>',
+    },
+}
+
+
+class SiteSpec:
+    """One synthetic company's career site."""
+
+    def __init__(self, company: str, layout: str, jobs: int, latency_ms: float):
+        self.company = company
+        self.slug = company.lower().replace(" ", "-")
+        self.layout = layout
+        self.jobs = jobs
+        self.latency_ms = latency_ms
+        self.first_job = 0  # Advanced by churn: older postings close, new ones open
+
+    def job(self, n: int) -> Dict[str, str]:
+        rng = random.Random(f"{self.slug}:{n}")
+        return {
+            "title": f"{rng.choice(LEVELS)}{rng.choice(ROLES)} ({n})",
+            "location": rng.choice(LOCATIONS),
+            "link": f"/{self.slug}/jobs/{n}",
+        }
+
+    def render(self) -> str:
+        layout = LAYOUTS[self.layout]
+        rows = "".join(
+            layout["row"].format(**{k: html.escape(v) for k, v in self.job(n).items()})
+            for n in range(self.first_job, self.first_job + self.jobs)
+        )
+        return (
+            f"<html><head><title>{html.escape(self.company)} Careers</title></head>"
+            f"<body><h1>Open roles</h1>{layout['wrap'].format(rows=rows)}</body></html>"
+        )
+
+
+def make_sites(
+    count: int,
+    rng: random.Random,
+    jobs: int = 25,
+    latency_ms: float = 50.0,
+) -> List[SiteSpec]:
+    """``count`` sites with a random layout and job counts around ``jobs``."""
+    return [
+        SiteSpec(
+            company=f"Synth {i:04d}",
+            layout=rng.choice(sorted(LAYOUTS)),
+            jobs=max(1, int(rng.gauss(jobs, jobs / 4))),
+            latency_ms=latency_ms * rng.uniform(0.5, 1.5),
+        )
+        for i in range(count)
+    ]
+
+
+def churn(sites: List[SiteSpec], fraction: float, rng: random.Random) -> int:
+    """Replace ``fraction`` of each site's postings with new ones; returns jobs added."""
+    added = 0
+    for site in sites:
+        replaced = sum(1 for _ in range(site.jobs) if rng.random() < fraction)
+        site.first_job += replaced
+        added += replaced
+    return added
+
+
+class SyntheticSites:
+    """Local HTTP server for a set of ``SiteSpec`` (use as a context manager)."""
+
+    def __init__(self, sites: List[SiteSpec], host: str = "127.0.0.1"):
+        self.sites = {site.slug: site for site in sites}
+        self.requests = 0
+        sites_by_slug = self.sites
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                slug = parsed.path.strip("/").split("/")[0]
+                site = sites_by_slug.get(slug)
+                if site is None:
+                    self.send_error(404)
+                    return
+                server.requests += 1
+                time.sleep(site.latency_ms / 1000)
+                body = site.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, site: SiteSpec) -> str:
+        return f"{self.base_url}/{site.slug}/careers"
+
+    def __enter__(self) -> "SyntheticSites":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -12,9 +12,24 @@ class Config:
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
+    # Metrics
+    METRICS_FORMAT: str = os.getenv("METRICS_FORMAT", "emf")  # "emf" (CloudWatch) or "json"
+    METRICS_NAMESPACE: str = os.getenv("METRICS_NAMESPACE", "CareerScraper")
+
+    # Profiling (off unless PROFILE_MODE is set; an event {"profile": ...} forces one run)
+    PROFILE_MODE: str = os.getenv("PROFILE_MODE", "off")  # "off", "cycle" or "stages"
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))  # Fraction of cycles profiled
+    PROFILE_STAGES: str = os.getenv("PROFILE_STAGES", "extraction,dispatch")  # Used in "stages" mode
+    PROFILE_ALLOCATIONS: bool = os.getenv("PROFILE_ALLOCATIONS", "true").lower() == "true"  # tracemalloc
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "/tmp/profiles")
+    PROFILE_S3_BUCKET: Optional[str] = os.getenv("PROFILE_S3_BUCKET")
+    PROFILE_S3_PREFIX: str = os.getenv("PROFILE_S3_PREFIX", "profiles/")
+
     # Firebase
     FIREBASE_PROJECT_ID: str = os.getenv("FIREBASE_PROJECT_ID", "")
     FIREBASE_CREDENTIALS_JSON: Optional[str] = os.getenv("FIREBASE_CREDENTIALS_JSON")
+    # Document reads per cycle above which the cycle logs a warning (0 = no budget)
+    FIRESTORE_READ_BUDGET: int = int(os.getenv("FIRESTORE_READ_BUDGET", "0"))
 
     # Anthropic
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
@@ -22,12 +37,104 @@ class Config:
 
     # Expo
     EXPO_ACCESS_TOKEN: Optional[str] = os.getenv("EXPO_ACCESS_TOKEN")
+    EXPO_PUSH_CHUNK_SIZE: int = 100  # Expo accepts at most 100 messages per request
+    EXPO_PUSH_CONCURRENCY: int = 4  # Chunks published in parallel over one session
+    EXPO_PUSH_MAX_RETRIES: int = 3  # Retries per chunk on 429/5xx/network errors
+    EXPO_PUSH_BACKOFF_BASE_S: float = 0.5
+    EXPO_PUSH_BACKOFF_MAX_S: float = 8.0
+    EXPO_RECEIPT_DELAY_S: int = 600  # Wait before polling a ticket's receipt
+    EXPO_RECEIPT_TTL_S: int = 24 * 3600  # Expo discards receipts after a day
+
+    # Notification outbox
+    # Set to false when a separate dispatcher function drains the outbox
+    OUTBOX_DRAIN_INLINE: bool = os.getenv("OUTBOX_DRAIN_INLINE", "true").lower() == "true"
+    OUTBOX_BATCH_SIZE: int = 500  # Deliveries read per drain batch
+    OUTBOX_MAX_ATTEMPTS: int = 5  # Give up on a delivery after this many failed sends
+    OUTBOX_RETRY_BACKOFF_S: int = int(os.getenv("OUTBOX_RETRY_BACKOFF_S", "60"))  # First retry delay, doubled per attempt
+    OUTBOX_RETENTION_DAYS: int = 7  # Sent deliveries are kept this long for dedupe
+
+    # Near-duplicate detection
+    NEAR_DUPLICATE_ENABLED: bool = True
+    NEAR_DUPLICATE_MAX_DISTANCE: int = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "3"))  # Simhash bits
+    NEAR_DUPLICATE_HISTORY: int = 5000  # Fingerprints kept per company
+
+    # Closed postings: jobs gone from a company's page are marked closed and
+    # stay in the seen set this long, so a re-listed job is not re-notified
+    SEEN_JOB_RETENTION_DAYS: int = int(os.getenv("SEEN_JOB_RETENTION_DAYS", "30"))
 
     # Scraper settings
-    SCRAPER_TIMEOUT_MS: int = 30000  # 30 seconds per company
+    SCRAPER_TIMEOUT_MS: int = 30000  # 30 seconds per company, until its load times are known
+    # Per-company page-load timeout: SCRAPER_TIMEOUT_HEADROOM x the p95 of its
+    # last SCRAPER_LOAD_SAMPLES load times, within these bounds
+    SCRAPER_MIN_TIMEOUT_MS: int = int(os.getenv("SCRAPER_MIN_TIMEOUT_MS", "5000"))
+    SCRAPER_MAX_TIMEOUT_MS: int = int(os.getenv("SCRAPER_MAX_TIMEOUT_MS", "60000"))
+    SCRAPER_TIMEOUT_HEADROOM: float = 2.0
+    SCRAPER_LOAD_SAMPLES: int = 20
+    SCRAPER_TIMEOUT_MIN_SAMPLES: int = 3  # Fewer samples use SCRAPER_TIMEOUT_MS
+    SCRAPER_CONCURRENCY: int = int(os.getenv("SCRAPER_CONCURRENCY", "2"))  # Companies scraped at once
+    PIPELINE_QUEUE_SIZE: int = 16  # Companies waiting on the notify stage before the diff stage blocks
     SCRAPER_HEADLESS: bool = True
+    # Engine for companies whose config does not pick one: "webkit", "chromium" or "firefox"
+    SCRAPER_BROWSER: str = os.getenv("SCRAPER_BROWSER", "webkit")
     SCRAPER_USER_AGENT: str = "Mozilla/5.0 (compatible; CareerScraperBot/1.0)"
 
+    # HAR capture: "record" saves each page load (with its network responses)
+    # to SCRAPER_HAR_DIR, "replay" serves page loads from those files offline
+    SCRAPER_HAR_MODE: str = os.getenv("SCRAPER_HAR_MODE", "off")  # "off", "record" or "replay"
+    SCRAPER_HAR_DIR: str = os.getenv("SCRAPER_HAR_DIR", "har")
+
+    # Guards against pathological pages (huge DOMs, megabytes of inline JSON)
+    SCRAPER_MAX_DOM_NODES: int = int(os.getenv("SCRAPER_MAX_DOM_NODES", "60000"))  # Larger pages are not scraped
+    SCRAPER_MAX_HTML_BYTES: int = int(os.getenv("SCRAPER_MAX_HTML_BYTES", "500000"))  # Markup sent for learning
+    SCRAPER_MAX_CONTAINERS: int = int(os.getenv("SCRAPER_MAX_CONTAINERS", "2000"))  # Job containers read per page
+    SCRAPER_EXTRACTION_TIMEOUT_MS: int = int(os.getenv("SCRAPER_EXTRACTION_TIMEOUT_MS", "20000"))
+    SCRAPER_EXTRACTION_CHUNK: int = 100  # Containers extracted between deadline and memory checks
+    SCRAPER_FIELD_TIMEOUT_MS: int = int(os.getenv("SCRAPER_FIELD_TIMEOUT_MS", "1000"))  # Wait per field read
+    # Abort a page once this process and its browsers use more (0 = no limit);
+    # defaults to 85% of the Lambda's memory
+    SCRAPER_MAX_MEMORY_MB: int = int(os.getenv(
+        "SCRAPER_MAX_MEMORY_MB",
+        str(int(int(os.getenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "0")) * 0.85)),
+    ))
+
+    # Company registry (canonical names, aliases and career URLs)
+    REGISTRY_CACHE_TTL_S: int = 3600  # Warm containers reload the registry this often
+
+    # Fan-out: split each cycle's companies into shards scraped by separate workers
+    FANOUT_SHARDS: int = int(os.getenv("FANOUT_SHARDS", "1"))  # 1 = scrape in this invocation
+    # "process" (local) or "lambda"; Lambda has no shared memory for process pools
+    FANOUT_BACKEND: str = os.getenv("FANOUT_BACKEND", "lambda" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "process")
+    # Function invoked per shard by the lambda backend (default: this function)
+    FANOUT_FUNCTION_NAME: str = os.getenv("FANOUT_FUNCTION_NAME", os.getenv("AWS_LAMBDA_FUNCTION_NAME", ""))
+    # "module:function" run once in each process-pool worker (e.g. to install fakes)
+    FANOUT_PROCESS_INITIALIZER: Optional[str] = os.getenv("FANOUT_PROCESS_INITIALIZER")
+
+    # Bulk onboarding (python -m src.onboarding companies.csv)
+    ONBOARDING_BROWSERS: int = int(os.getenv("ONBOARDING_BROWSERS", "4"))  # Pages loaded at once
+    ONBOARDING_LLM_CONCURRENCY: int = int(os.getenv("ONBOARDING_LLM_CONCURRENCY", "8"))  # Learning calls at once
+
+    # Scheduling
+    # Time kept back at the end of an invocation to drain the outbox and save the cursor
+    SCHEDULER_RESERVE_MS: int = int(os.getenv("SCHEDULER_RESERVE_MS", "20000"))
+    LAMBDA_TIMEOUT_MS: int = int(os.getenv("LAMBDA_TIMEOUT_MS", "180000"))  # Simulated for local runs
+    # Per-company scan interval adapts to its posting rate within these bounds
+    SCHEDULER_MIN_INTERVAL_S: int = 15 * 60  # One EventBridge tick
+    SCHEDULER_MAX_INTERVAL_S: int = int(os.getenv("SCHEDULER_MAX_INTERVAL_S", str(6 * 3600)))
+    SCHEDULER_TARGET_NEW_JOBS: float = 0.5  # Expected new jobs between two scans of a company
+    # Circuit breaker: after this many failed scans in a row a company is skipped,
+    # for a backoff that doubles with each further failure up to the maximum
+    SCHEDULER_BREAKER_THRESHOLD: int = 3
+    SCHEDULER_BREAKER_BASE_S: int = 30 * 60
+    SCHEDULER_BREAKER_MAX_S: int = 24 * 3600
+    # An empty listing may just have no openings, so selectors are relearned
+    # once a company's page comes back empty this many scans in a row
+    SCHEDULER_RELEARN_AFTER_EMPTY: int = int(os.getenv("SCHEDULER_RELEARN_AFTER_EMPTY", "3"))
+
+    # Long-running worker (python -m src.worker)
+    WORKER_MAX_SLEEP_S: int = int(os.getenv("WORKER_MAX_SLEEP_S", "60"))  # Longest idle wait between ticks
+    WORKER_USERS_REFRESH_S: int = 300  # Reload users and the registry, prune dead tokens
+    WORKER_SHUTDOWN_TIMEOUT_S: int = 60  # Wait for in-flight scrapes before giving up on SIGTERM
+
     @classmethod
     def validate(cls) -> None:
         """Validate required configuration."""
@@ -38,3 +145,5 @@ class Config:
         missing = [name for name, value in required if not value]
         if missing:
             raise ValueError(f"Missing required config: {', '.join(missing)}")
+        if cls.FANOUT_SHARDS > 1 and cls.FANOUT_BACKEND == "process" and os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+            raise ValueError("FANOUT_BACKEND=process does not work inside Lambda; use FANOUT_BACKEND=lambda")
@@ -0,0 +1,113 @@
+"""
+Service clients shared across warm Lambda invocations.
+
+Each client is created on first use and kept at module level, so a warm
+container reuses its Firestore connection and HTTP pools instead of
+rebuilding them every tick. Heavy SDKs are imported by the getter that
+needs them: Anthropic only once selectors must be learned, Playwright
+only when a company is due, the Expo SDK only when there is something to
+deliver or a receipt to check.
+
+Import and init times are recorded per client for the startup report.
+"""
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict
+
+if TYPE_CHECKING:
+    from src.database.firestore_client import FirestoreClient
+    from src.llm.selector_learner import SelectorLearner
+    from src.notifier.expo_push import NotificationService
+    from src.scraper.playwright_scraper import CareerPageScraper
+
+_clients: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+_cold_start = True
+_module_import_ms: Dict[str, float] = {}
+_report: Dict[str, Any] = {"cold_start": True, "import_ms": {}, "init_ms": {}}
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+def _get(name: str, load: Callable[[], type]) -> Any:
+    """Return the cached client ``name``, importing and constructing it on first use."""
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(name)
+        if client is None:
+            started = time.perf_counter()
+            cls = load()
+            imported = time.perf_counter()
+            client = cls()
+            _report["import_ms"][name] = _ms(imported - started)
+            _report["init_ms"][name] = _ms(time.perf_counter() - imported)
+            _clients[name] = client
+    return client
+
+def get_db() -> "FirestoreClient":
+    def load():
+        from src.database.firestore_client import FirestoreClient
+        return FirestoreClient
+    return _get("firestore", load)
+
+def get_scraper() -> "CareerPageScraper":
+    def load():
+        from src.scraper.playwright_scraper import CareerPageScraper
+        return CareerPageScraper
+    return _get("scraper", load)
+
+def get_learner() -> "SelectorLearner":
+    def load():
+        from src.llm.selector_learner import SelectorLearner
+        return SelectorLearner
+    return _get("learner", load)
+
+def get_notifier() -> "NotificationService":
+    def load():
+        from src.notifier.expo_push import NotificationService
+        return NotificationService
+    return _get("notifier", load)
+
+def use(name: str, client: Any) -> None:
+    """Install a prebuilt client under ``name`` (firestore, scraper, learner, notifier)."""
+    with _lock:
+        _clients[name] = client
+
+def record_module_import(module: str, seconds: float) -> None:
+    """Record how long an entry point module took to import (reported on cold start)."""
+    _module_import_ms[module] = _ms(seconds)
+
+def begin_invocation() -> None:
+    """Start a new startup report; the first invocation in a container is the cold one."""
+    global _cold_start, _report
+    _report = {
+        "cold_start": _cold_start,
+        "import_ms": dict(_module_import_ms) if _cold_start else {},
+        "init_ms": {},
+    }
+    _cold_start = False
+
+def startup_report() -> Dict[str, Any]:
+    """
+    Import and init times paid by the current invocation.
+
+    Clients reused from a warm container do not appear; a client first
+    needed mid-cycle (e.g. the learner) shows up in the invocation that
+    needed it.
+    """
+    return {
+        "cold_start": _report["cold_start"],
+        "import_ms": dict(_report["import_ms"]),
+        "init_ms": dict(_report["init_ms"]),
+    }
+
+def reset() -> None:
+    """Drop every cached client, as if the container were cold (for tests)."""
+    global _cold_start
+    with _lock:
+        _clients.clear()
+    _cold_start = True
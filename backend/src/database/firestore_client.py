@@ -1,14 +1,80 @@
 import json
-from typing import List, Optional, Set
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterator, List, Optional, Set, Tuple
 import firebase_admin
 from firebase_admin import credentials, firestore
 from google.cloud.firestore_v1 import FieldFilter
 
 from config import Config
-from src.models import JobPosting, UserProfile, UserFilters, ScraperConfig
+from src.models import JobPosting, UserProfile, UserFilters, ScraperConfig, PushTicketRecord, OutboxEntry, ScanCursor, CompanyHealth, CompanyEntry
+from src.diff.near_duplicates import NearDuplicateIndex
+from src.diff.snapshots import JobSnapshot
+from src.metrics.recorder import record_firestore
+
+# Field masks for hot-path reads: only what the models use is sent back,
+# whatever else user or config documents have accumulated
+USER_FIELDS = ["push_token", "filters", "active"]
+SCRAPER_CONFIG_FIELDS = [  # As written by ScraperConfig.to_dict
+    "company", "career_url", "job_container_selector", "title_selector", "location_selector", "link_selector",
+    "last_updated", "is_learned", "wait_for", "browser",
+]
+
+def stored_bytes(value: Any) -> int:
+    """Size of a field value by Firestore's storage size rules."""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, str):
+        return len(value.encode()) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(stored_bytes(str(key)) + stored_bytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(stored_bytes(item) for item in value)
+    return 8  # Numbers and timestamps
+
+class FirestoreCall:
+    """Document reads, writes and (estimated) bytes read by one FirestoreClient call."""
+
+    __slots__ = ("reads", "writes", "bytes_read")
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.bytes_read = 0
+
+    def _received(self, doc: Any) -> dict:
+        data = doc.to_dict() or {}
+        # Document name plus fields, plus Firestore's 32-byte overhead
+        self.bytes_read += stored_bytes(str(doc.id)) + 16 + stored_bytes(data) + 32
+        return data
+
+    def get(self, ref: Any, field_paths: Optional[List[str]] = None) -> Optional[dict]:
+        """Read one document (billed even if missing); its data, or None."""
+        doc = ref.get(field_paths=field_paths)
+        self.reads += 1
+        return self._received(doc) if doc.exists else None
+
+    def stream(self, query: Any) -> Iterator[Tuple[str, dict]]:
+        """Run a query, yielding (document ID, data); a query that matches nothing is billed one read."""
+        matched = 0
+        for doc in query.stream():
+            matched += 1
+            self.reads += 1
+            yield doc.id, self._received(doc)
+        if not matched:
+            self.reads += 1
 
 class FirestoreClient:
-    """Firestore database client for job tracking and user management."""
+    """
+    Firestore database client for job tracking and user management.
+
+    Every method records its document reads, writes, estimated bytes read
+    and latency into the running cycle's metrics (see ``_track``), so each
+    cycle reports what it cost.
+    """
 
     def __init__(self):
         """Initialize Firebase connection."""
@@ -27,59 +93,105 @@ class FirestoreClient:
 
         self.db = firestore.client()
 
+    @contextmanager
+    def _track(self, method: str) -> Iterator[FirestoreCall]:
+        """Account the enclosed Firestore operations to ``method``."""
+        call = FirestoreCall()
+        started = time.perf_counter()
+        try:
+            yield call
+        finally:
+            record_firestore(method, call.reads, call.writes, call.bytes_read, (time.perf_counter() - started) * 1000)
+
     def get_seen_jobs(self) -> Set[str]:
         """
         Fetch all previously seen job IDs.
         Returns a set of job hashes.
         """
-        docs = self.db.collection('seen_jobs').select([]).stream()
-        return {doc.id for doc in docs}
+        with self._track("get_seen_jobs") as call:
+            return {job_id for job_id, _ in call.stream(self.db.collection('seen_jobs').select([]))}
 
     def add_seen_jobs(self, job_ids: List[str]) -> None:
         """
         Mark jobs as seen in Firestore.
         Uses batched writes for efficiency (max 500 per batch).
         """
-        if not job_ids:
+        def mark_seen(batch, job_id: str) -> None:
+            ref = self.db.collection('seen_jobs').document(job_id)
+            batch.set(ref, {"seen_at": firestore.SERVER_TIMESTAMP, "status": "open"})
+
+        with self._track("add_seen_jobs") as call:
+            self._commit_in_batches(job_ids, mark_seen, call)
+
+    def update_job_status(self, job_ids: List[str], status: str) -> None:
+        """
+        Record seen jobs as "closed" (gone from their page) or "open" again.
+
+        Closed jobs get an ``expire_at`` SEEN_JOB_RETENTION_DAYS out, which a
+        TTL policy uses to drop them from the seen set; reopening clears it.
+        """
+        if status == "closed":
+            fields = {
+                "status": "closed",
+                "closed_at": firestore.SERVER_TIMESTAMP,
+                "expire_at": datetime.utcnow() + timedelta(days=Config.SEEN_JOB_RETENTION_DAYS),
+            }
+        else:
+            fields = {"status": "open", "closed_at": firestore.DELETE_FIELD, "expire_at": firestore.DELETE_FIELD}
+
+        def update(batch, job_id: str) -> None:
+            batch.set(self.db.collection('seen_jobs').document(job_id), fields, merge=True)
+
+        with self._track("update_job_status") as call:
+            self._commit_in_batches(job_ids, update, call)
+
+    def _commit_in_batches(self, items: List[Any], apply: Callable[[Any, Any], None], call: FirestoreCall) -> None:
+        """Apply one write per item using batched commits (max 500 per batch)."""
+        if not items:
             return
 
         # Firestore batch limit is 500 operations
-        for i in range(0, len(job_ids), 500):
-            chunk = job_ids[i:i+500]
+        for i in range(0, len(items), 500):
+            chunk = items[i:i+500]
             batch = self.db.batch()
 
-            for job_id in chunk:
-                ref = self.db.collection('seen_jobs').document(job_id)
-                batch.set(ref, {"seen_at": firestore.SERVER_TIMESTAMP})
+            for item in chunk:
+                apply(batch, item)
 
             batch.commit()
+            call.writes += len(chunk)
 
     def get_users(self) -> List[UserProfile]:
-        """Fetch all active users with their preferences."""
+        """Fetch all active users with their preferences (only the fields matching needs)."""
         users = []
-        docs = self.db.collection('users').where(
+        query = self.db.collection('users').where(
             filter=FieldFilter("active", "==", True)
-        ).stream()
+        ).select(USER_FIELDS)
+
+        with self._track("get_users") as call:
+            docs = list(call.stream(query))
 
-        for doc in docs:
+        for user_id, data in docs:
             try:
-                data = doc.to_dict()
                 filters_data = data.get('filters', {})
 
                 filters = UserFilters(
                     companies=filters_data.get('companies', []),
                     roles=filters_data.get('roles', []),
-                    keywords=filters_data.get('keywords', [])
+                    keywords=filters_data.get('keywords', []),
+                    exclude_keywords=filters_data.get('exclude_keywords', []),
+                    match_mode=filters_data.get('match_mode', 'substring'),
                 )
 
                 user = UserProfile(
                     push_token=data['push_token'],
                     filters=filters,
-                    active=data.get('active', True)
+                    active=data.get('active', True),
+                    user_id=user_id,
                 )
                 users.append(user)
             except Exception as e:
-                print(f"Skipping invalid user {doc.id}: {e}")
+                print(f"Skipping invalid user {user_id}: {e}")
 
         return users
 
@@ -88,20 +200,224 @@ class FirestoreClient:
         Fetch learned CSS selectors for a company.
         Returns None if company hasn't been learned yet.
         """
-        doc = self.db.collection('scraper_configs').document(company).get()
+        ref = self.db.collection('scraper_configs').document(company)
+        with self._track("get_scraper_config") as call:
+            data = call.get(ref, field_paths=SCRAPER_CONFIG_FIELDS)
 
-        if not doc.exists:
+        if data is None:
             return None
 
-        data = doc.to_dict()
         return ScraperConfig(**data)
 
     def save_scraper_config(self, config: ScraperConfig) -> None:
         """Save learned scraper configuration."""
         ref = self.db.collection('scraper_configs').document(config.company)
-        ref.set(config.to_dict())
+        with self._track("save_scraper_config") as call:
+            ref.set(config.to_dict())
+            call.writes += 1
 
     def mark_config_needs_relearning(self, company: str) -> None:
         """Mark a scraper config as needing re-learning (e.g., after parse failure)."""
         ref = self.db.collection('scraper_configs').document(company)
-        ref.update({"is_learned": False})
+        with self._track("mark_config_needs_relearning") as call:
+            ref.update({"is_learned": False})
+            call.writes += 1
+
+    def get_companies(self) -> List[CompanyEntry]:
+        """Fetch every entry of the company registry."""
+        with self._track("get_companies") as call:
+            return [CompanyEntry(**data) for _, data in call.stream(self.db.collection('companies'))]
+
+    def save_company(self, entry: CompanyEntry) -> None:
+        """Add or replace a company registry entry."""
+        ref = self.db.collection('companies').document(entry.name)
+        with self._track("save_company") as call:
+            ref.set(entry.to_dict())
+            call.writes += 1
+
+    def deactivate_users(self, user_ids: List[str]) -> None:
+        """Mark users inactive (e.g., their device is no longer registered)."""
+        def deactivate(batch, user_id: str) -> None:
+            ref = self.db.collection('users').document(user_id)
+            batch.update(ref, {"active": False})
+
+        with self._track("deactivate_users") as call:
+            self._commit_in_batches(sorted(set(user_ids)), deactivate, call)
+
+    def save_push_tickets(self, tickets: List[PushTicketRecord]) -> None:
+        """Persist push tickets so their receipts can be checked on a later cycle."""
+        def save(batch, ticket: PushTicketRecord) -> None:
+            ref = self.db.collection('push_tickets').document(ticket.ticket_id)
+            batch.set(ref, ticket.to_dict())
+
+        with self._track("save_push_tickets") as call:
+            self._commit_in_batches(tickets, save, call)
+
+    def get_push_tickets(self, created_before: datetime) -> List[PushTicketRecord]:
+        """Fetch push tickets created before the given time (receipts likely ready)."""
+        query = self.db.collection('push_tickets').where(
+            filter=FieldFilter("created_at", "<=", created_before)
+        )
+
+        with self._track("get_push_tickets") as call:
+            return [PushTicketRecord(ticket_id=ticket_id, **data) for ticket_id, data in call.stream(query)]
+
+    def delete_push_tickets(self, ticket_ids: List[str]) -> None:
+        """Remove push tickets whose receipts have been processed."""
+        def delete(batch, ticket_id: str) -> None:
+            batch.delete(self.db.collection('push_tickets').document(ticket_id))
+
+        with self._track("delete_push_tickets") as call:
+            self._commit_in_batches(ticket_ids, delete, call)
+
+    def enqueue_outbox(self, entries: List[OutboxEntry]) -> int:
+        """
+        Add deliveries to the notification outbox idempotently.
+
+        Entries are keyed by their dedupe key; deliveries that already exist
+        (pending or sent) are left untouched. Existence is checked with an
+        empty field mask, so no delivery payloads are sent back.
+
+        Returns:
+            Number of newly enqueued deliveries
+        """
+        collection = self.db.collection('notification_outbox')
+        unique = {entry.dedupe_key: entry for entry in entries}
+
+        def enqueue(batch, entry: OutboxEntry) -> None:
+            batch.set(collection.document(entry.dedupe_key), entry.to_dict())
+
+        with self._track("enqueue_outbox") as call:
+            existing = set()
+            keys = list(unique)
+            for i in range(0, len(keys), 500):
+                refs = [collection.document(key) for key in keys[i:i+500]]
+                existing.update(snap.id for snap in self.db.get_all(refs, field_paths=[]) if snap.exists)
+                call.reads += len(refs)
+
+            new_entries = [entry for key, entry in unique.items() if key not in existing]
+            self._commit_in_batches(new_entries, enqueue, call)
+        return len(new_entries)
+
+    def get_pending_outbox(self, limit: int) -> List[OutboxEntry]:
+        """Fetch up to ``limit`` deliveries due to be sent, oldest first."""
+        query = self.db.collection('notification_outbox').where(
+            filter=FieldFilter("status", "==", "pending")
+        ).where(
+            filter=FieldFilter("next_attempt_at", "<=", datetime.utcnow())
+        ).order_by("next_attempt_at").limit(limit)
+
+        with self._track("get_pending_outbox") as call:
+            return [OutboxEntry(**data) for _, data in call.stream(query)]
+
+    def mark_outbox_sent(self, entries: List[OutboxEntry]) -> None:
+        """Mark deliveries as sent; they expire after the retention period."""
+        expire_at = datetime.utcnow() + timedelta(days=Config.OUTBOX_RETENTION_DAYS)
+
+        def mark(batch, entry: OutboxEntry) -> None:
+            ref = self.db.collection('notification_outbox').document(entry.dedupe_key)
+            batch.update(ref, {
+                "status": "sent",
+                "sent_at": firestore.SERVER_TIMESTAMP,
+                "expire_at": expire_at,
+            })
+
+        with self._track("mark_outbox_sent") as call:
+            self._commit_in_batches(entries, mark, call)
+
+    def mark_outbox_failed(self, entries: List[OutboxEntry]) -> None:
+        """
+        Record a failed send. The delivery is retried after a backoff that
+        doubles per attempt, or marked failed once out of attempts.
+        """
+        now = datetime.utcnow()
+
+        def mark(batch, entry: OutboxEntry) -> None:
+            ref = self.db.collection('notification_outbox').document(entry.dedupe_key)
+            attempts = entry.attempts + 1
+            status = "failed" if attempts >= Config.OUTBOX_MAX_ATTEMPTS else "pending"
+            retry_at = now + timedelta(seconds=Config.OUTBOX_RETRY_BACKOFF_S * 2 ** (attempts - 1))
+            batch.update(ref, {"attempts": attempts, "status": status, "next_attempt_at": retry_at})
+
+        with self._track("mark_outbox_failed") as call:
+            self._commit_in_batches(entries, mark, call)
+
+    def get_job_fingerprints(self, company: str) -> NearDuplicateIndex:
+        """Fetch a company's near-duplicate fingerprint index (empty if none yet)."""
+        ref = self.db.collection('job_fingerprints').document(company)
+        with self._track("get_job_fingerprints") as call:
+            data = call.get(ref, field_paths=["fingerprints", "last_seen"])
+
+        if data is None:
+            return NearDuplicateIndex()
+
+        return NearDuplicateIndex.from_bytes(data.get('fingerprints', b''), last_seen=data.get('last_seen', b''))
+
+    def save_job_fingerprints(self, company: str, index: NearDuplicateIndex) -> None:
+        """Save a company's fingerprints and when each was last seen, keeping only the most recent ones."""
+        ref = self.db.collection('job_fingerprints').document(company)
+        with self._track("save_job_fingerprints") as call:
+            ref.set({
+                "fingerprints": index.to_bytes(limit=Config.NEAR_DUPLICATE_HISTORY),
+                "last_seen": index.last_seen_bytes(limit=Config.NEAR_DUPLICATE_HISTORY),
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            })
+            call.writes += 1
+
+    def get_job_snapshot(self, company: str) -> Optional[JobSnapshot]:
+        """Fetch the job IDs open at a company's last complete scan (None before the first)."""
+        ref = self.db.collection('job_snapshots').document(company)
+        with self._track("get_job_snapshot") as call:
+            data = call.get(ref, field_paths=["ids"])
+
+        if data is None:
+            return None
+
+        return JobSnapshot.from_bytes(data.get('ids', b''))
+
+    def save_job_snapshot(self, company: str, snapshot: JobSnapshot) -> None:
+        ref = self.db.collection('job_snapshots').document(company)
+        with self._track("save_job_snapshot") as call:
+            ref.set({
+                "ids": snapshot.to_bytes(),
+                "count": len(snapshot),
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            })
+            call.writes += 1
+
+    def get_scan_cursor(self) -> ScanCursor:
+        """Fetch the scan rotation cursor (empty on the first run)."""
+        ref = self.db.collection('scheduler_state').document('scan_cursor')
+        with self._track("get_scan_cursor") as call:
+            data = call.get(ref)
+
+        if data is None:
+            return ScanCursor()
+
+        # Firestore returns aware UTC timestamps; the cursor works in naive UTC
+        def naive(timestamps: dict) -> dict:
+            return {company: at.replace(tzinfo=None) for company, at in timestamps.items()}
+
+        health = {}
+        for company, record in data.get('health', {}).items():
+            if record.get('open_until') is not None:
+                record['open_until'] = record['open_until'].replace(tzinfo=None)
+            health[company] = CompanyHealth(**record)
+
+        return ScanCursor(
+            last_scanned=naive(data.get('last_scanned', {})),
+            cost_ms=data.get('cost_ms', {}),
+            change_rate=data.get('change_rate', {}),
+            next_due=naive(data.get('next_due', {})),
+            health=health,
+            load_ms=data.get('load_ms', {}),
+            browsers=data.get('browsers', {}),
+            empty_scans=data.get('empty_scans', {}),
+        )
+
+    def save_scan_cursor(self, cursor: ScanCursor) -> None:
+        """Save the scan rotation cursor."""
+        ref = self.db.collection('scheduler_state').document('scan_cursor')
+        with self._track("save_scan_cursor") as call:
+            ref.set(cursor.to_dict())
+            call.writes += 1
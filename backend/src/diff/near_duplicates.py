@@ -0,0 +1,238 @@
+import hashlib
+import re
+import struct
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+
+FINGERPRINT_BITS = 64
+
+# Requisition / posting numbers that sites append or change between renders
+_REQUISITION = re.compile(
+    r"(?:\b(?:req(?:uisition)?|job|id|jr|r)\s*[#:.-]?\s*\d{3,}\b)"  # "Req 12345", "JR-123456", "R0123"
+    r"|#\s*\d+"                                                    # "#4567"
+    r"|\b\d{5,}\b"                                                 # bare long numbers
+)
+_NON_WORD = re.compile(r"[^a-z0-9+]+")
+
+_ABBREVIATIONS = {
+    "sr": "senior",
+    "jr": "junior",
+    "mgr": "manager",
+    "engr": "engineer",
+    "eng": "engineer",
+    "usa": "us",
+}
+
+_PHRASES = (
+    ("united states of america", "us"),
+    ("united states", "us"),
+    ("u.s.", "us"),
+    ("&", " and "),
+)
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """
+    Normalize a role or location string into comparable tokens.
+
+    Lowercases, drops requisition numbers and punctuation, and expands
+    common abbreviations, so "Sr. Engineer - Remote, US (Req #123456)" and
+    "Senior Engineer Remote US" produce the same tokens.
+    """
+    text = text.lower()
+    for phrase, replacement in _PHRASES:
+        text = text.replace(phrase, replacement)
+    text = _REQUISITION.sub(" ", text)
+    return [_ABBREVIATIONS.get(token, token) for token in _NON_WORD.split(text) if token]
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def fingerprint(role: str, location: str) -> int:
+    """
+    64-bit simhash of a job's normalized role and location tokens.
+
+    Token order and repetition do not matter; role tokens weigh twice as
+    much as location tokens. Jobs whose normalized tokens are equal get
+    identical fingerprints, and similar token sets get nearby ones.
+    """
+    weights: Dict[str, int] = {}
+    for token in normalize_tokens(role):
+        weights[token] = 2
+    for token in normalize_tokens(location):
+        weights.setdefault(f"loc:{token}", 1)
+
+    vector = [0] * FINGERPRINT_BITS
+    for token, weight in weights.items():
+        h = _token_hash(token)
+        for bit in range(FINGERPRINT_BITS):
+            vector[bit] += weight if (h >> bit) & 1 else -weight
+
+    fp = 0
+    for bit, value in enumerate(vector):
+        if value > 0:
+            fp |= 1 << bit
+    return fp
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def today() -> int:
+    """Current UTC day as a proleptic Gregorian ordinal, the index's unit of age."""
+    return datetime.utcnow().toordinal()
+
+
+class NearDuplicateIndex:
+    """
+    Fingerprints of one company's known jobs, indexed for near-duplicate lookup.
+
+    The 64-bit fingerprint is split into ``max_distance + 1`` bands. Two
+    fingerprints within ``max_distance`` bits of each other must agree on at
+    least one whole band (pigeonhole), so lookups only compare against
+    fingerprints sharing a band instead of scanning the company's history.
+
+    Each fingerprint remembers the day its job was last seen on the page, so
+    ``expire`` can forget postings that closed long ago: a job re-listed
+    after its seen entry expired is new again, not a near-duplicate.
+    """
+
+    def __init__(
+        self,
+        fingerprints: Iterable[int] = (),
+        max_distance: Optional[int] = None,
+        last_seen: Iterable[int] = (),
+    ):
+        self.max_distance = Config.NEAR_DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+        self._bands = self._band_layout(self.max_distance + 1)
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        self.fingerprints: List[int] = []
+        self.last_seen: Dict[int, int] = {}  # fingerprint -> day last seen on the page
+        days = list(last_seen)
+        for i, fp in enumerate(fingerprints):
+            # Fingerprints stored before ages were kept count as seen today
+            self.add(fp, day=days[i] if i < len(days) else None)
+
+    @staticmethod
+    def _band_layout(count: int) -> List[Tuple[int, int]]:
+        """(shift, mask) for each band, splitting the bits as evenly as possible."""
+        count = max(1, min(count, FINGERPRINT_BITS))
+        layout = []
+        start = 0
+        for i in range(count):
+            width = FINGERPRINT_BITS // count + (1 if i < FINGERPRINT_BITS % count else 0)
+            layout.append((start, (1 << width) - 1))
+            start += width
+        return layout
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def add(self, fp: int, day: Optional[int] = None) -> None:
+        """Add ``fp``, or mark it seen again on ``day`` (default today) if known."""
+        day = today() if day is None else day
+        if fp in self.last_seen:
+            self.last_seen[fp] = max(self.last_seen[fp], day)
+            return
+        self.last_seen[fp] = day
+        self.fingerprints.append(fp)
+        self._bucket(fp)
+
+    def _bucket(self, fp: int) -> None:
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            buckets.setdefault((fp >> shift) & mask, []).append(fp)
+
+    def expire(self, before: int) -> int:
+        """Forget fingerprints last seen before day ``before``; returns how many."""
+        stale = {fp for fp, day in self.last_seen.items() if day < before}
+        if not stale:
+            return 0
+        for fp in stale:
+            del self.last_seen[fp]
+        self.fingerprints = [fp for fp in self.fingerprints if fp not in stale]
+        self._buckets = [{} for _ in self._bands]
+        for fp in self.fingerprints:
+            self._bucket(fp)
+        return len(stale)
+
+    def find(self, fp: int) -> Optional[int]:
+        """Return a known fingerprint within ``max_distance`` of ``fp``, if any."""
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            for candidate in buckets.get((fp >> shift) & mask, ()):
+                if hamming(fp, candidate) <= self.max_distance:
+                    return candidate
+        return None
+
+    def _recent(self, limit: Optional[int]) -> List[int]:
+        """Fingerprints ordered by the day last seen (then insertion), most recent ``limit``."""
+        ordered = sorted(self.fingerprints, key=lambda fp: self.last_seen[fp])
+        return ordered[-limit:] if limit else ordered
+
+    def to_bytes(self, limit: Optional[int] = None) -> bytes:
+        """Pack the most recently seen ``limit`` fingerprints as big-endian uint64s."""
+        recent = self._recent(limit)
+        return struct.pack(f">{len(recent)}Q", *recent)
+
+    def last_seen_bytes(self, limit: Optional[int] = None) -> bytes:
+        """Days last seen for ``to_bytes(limit)``, in the same order, as big-endian uint32s."""
+        recent = self._recent(limit)
+        return struct.pack(f">{len(recent)}I", *(self.last_seen[fp] for fp in recent))
+
+    @classmethod
+    def from_bytes(
+        cls,
+        data: bytes,
+        max_distance: Optional[int] = None,
+        last_seen: bytes = b"",
+    ) -> "NearDuplicateIndex":
+        count = len(data) // 8
+        days = len(last_seen) // 4
+        return cls(
+            struct.unpack(f">{count}Q", data[:count * 8]),
+            max_distance=max_distance,
+            last_seen=struct.unpack(f">{days}I", last_seen[:days * 4]),
+        )
+
+
+def drop_near_duplicates(
+    index: NearDuplicateIndex,
+    new_jobs: List,
+    known_jobs: Iterable = (),
+    day: Optional[int] = None,
+) -> List:
+    """
+    Filter out jobs that are near-duplicates of a company's known jobs.
+
+    Known jobs still on the page are marked seen ``day`` (default today);
+    fingerprints not seen for SEEN_JOB_RETENTION_DAYS are forgotten first,
+    like the seen entries of closed postings, so a posting re-listed after
+    that is notified again.
+
+    Args:
+        index: The company's fingerprint index; kept jobs are added to it
+        new_jobs: Jobs (anything with ``role`` and ``location``) not seen by exact ID
+        known_jobs: Already-seen jobs on the page
+        day: Day of the scan, as a date ordinal
+
+    Returns:
+        The jobs that are genuinely new, in their original order
+    """
+    day = today() if day is None else day
+    for job in known_jobs:
+        index.add(fingerprint(job.role, job.location), day=day)
+    index.expire(before=day - Config.SEEN_JOB_RETENTION_DAYS)
+
+    kept = []
+    for job in new_jobs:
+        fp = fingerprint(job.role, job.location)
+        if index.find(fp) is not None:
+            print(f"  Skipping near-duplicate: {job.role} ({job.location})")
+            continue
+        index.add(fp, day=day)
+        kept.append(job)
+    return kept
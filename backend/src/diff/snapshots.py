@@ -0,0 +1,60 @@
+from typing import Iterable, List, Tuple
+
+DIGEST_BYTES = 32  # Job IDs are hex sha256 digests
+
+
+class JobSnapshot:
+    """
+    The set of job IDs open on a company's page at its last complete scan.
+
+    Stored as the binary digests packed back to back in sorted order, half
+    the size of the hex IDs and cheap to (un)pack; two snapshots are diffed
+    with one merge pass over both.
+    """
+
+    def __init__(self, digests: Iterable[bytes] = ()):
+        self.digests: List[bytes] = sorted(set(digests))
+
+    @classmethod
+    def from_ids(cls, job_ids: Iterable[str]) -> "JobSnapshot":
+        return cls(bytes.fromhex(job_id) for job_id in job_ids)
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+    def ids(self) -> List[str]:
+        return [digest.hex() for digest in self.digests]
+
+    def to_bytes(self) -> bytes:
+        return b"".join(self.digests)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "JobSnapshot":
+        snapshot = cls()
+        # Written sorted and deduplicated, so no need to sort again
+        snapshot.digests = [data[i:i + DIGEST_BYTES] for i in range(0, len(data) - DIGEST_BYTES + 1, DIGEST_BYTES)]
+        return snapshot
+
+    def diff(self, current: "JobSnapshot") -> Tuple[List[str], List[str]]:
+        """
+        Job IDs added and removed going from this snapshot to ``current``.
+
+        A single merge over the two sorted arrays, linear in their sizes.
+        """
+        added: List[str] = []
+        removed: List[str] = []
+        old, new = self.digests, current.digests
+        i = j = 0
+        while i < len(old) and j < len(new):
+            if old[i] == new[j]:
+                i += 1
+                j += 1
+            elif old[i] < new[j]:
+                removed.append(old[i].hex())
+                i += 1
+            else:
+                added.append(new[j].hex())
+                j += 1
+        removed.extend(digest.hex() for digest in old[i:])
+        added.extend(digest.hex() for digest in new[j:])
+        return added, removed
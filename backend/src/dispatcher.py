@@ -0,0 +1,44 @@
+import json
+from typing import Any, Dict
+
+from config import Config
+from src import clients
+from src.notifier.outbox import NotificationOutbox
+
+def dispatch_handler(event: Any, context: Any) -> Dict[str, Any]:
+    """
+    AWS Lambda entry point for draining the notification outbox.
+
+    Runs independently of the scrape cycle (deploy with
+    OUTBOX_DRAIN_INLINE=false on the scraper), so slow Expo calls never
+    delay scraping and notification throughput scales on its own.
+
+    Args:
+        event: EventBridge event (optional "max_batches" limits the drain)
+        context: Lambda context (unused)
+
+    Returns:
+        Dict with status and delivery metrics
+    """
+    clients.begin_invocation()
+    try:
+        Config.validate()
+        db = clients.get_db()
+        notifier = clients.get_notifier()
+    except Exception as e:
+        print(f"Initialization error: {e}")
+        return {"status": "error", "message": str(e)}
+
+    outbox = NotificationOutbox(db, notifier)
+    pruned_tokens = outbox.prune_dead_tokens()
+
+    max_batches = event.get("max_batches") if isinstance(event, dict) else None
+    stats = outbox.drain(max_batches=max_batches)
+    stats["pruned_tokens"] += pruned_tokens
+
+    return {"status": "success", **stats, "startup": clients.startup_report()}
+
+# Local testing entry point
+if __name__ == "__main__":
+    result = dispatch_handler(None, None)
+    print(json.dumps(result, indent=2))
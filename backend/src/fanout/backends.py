@@ -0,0 +1,94 @@
+import importlib
+import json
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from config import Config
+
+class DispatchBackend:
+    """Runs shard payloads on workers; ``submit`` returns a future of ``scrape_shard``'s result."""
+
+    def submit(self, payload: Dict[str, Any]) -> "Future[Dict[str, Any]]":
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+def _run_shard(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Imported in the worker process, after its initializer ran
+    from src.fanout.shard import scrape_shard
+    return scrape_shard(payload)
+
+def _initialize_process(initializer: str) -> None:
+    module, _, function = initializer.partition(":")
+    getattr(importlib.import_module(module), function)()
+
+class ProcessPoolBackend(DispatchBackend):
+    """
+    Shards run in local worker processes (for containers, local runs and tests).
+
+    Processes are spawned, not forked, so they start clean of the parent's
+    threads; each creates its own clients. Not usable inside Lambda, which
+    lacks the shared memory multiprocessing needs.
+    """
+
+    def __init__(self, workers: int, initializer: Optional[str] = None):
+        initializer = initializer or Config.FANOUT_PROCESS_INITIALIZER
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialize_process if initializer else None,
+            initargs=(initializer,) if initializer else (),
+        )
+
+    def submit(self, payload: Dict[str, Any]) -> "Future[Dict[str, Any]]":
+        return self.pool.submit(_run_shard, payload)
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+class LambdaBackend(DispatchBackend):
+    """
+    Each shard is a synchronous invocation of FANOUT_FUNCTION_NAME with
+    ``{"shard": payload}``, which ``lambda_handler`` hands to ``scrape_shard``.
+    """
+
+    def __init__(self, workers: int, function_name: Optional[str] = None):
+        # boto3 is only needed by this backend; keep it off the cold-start path
+        import boto3
+        from botocore.config import Config as BotoConfig
+
+        self.function_name = function_name or Config.FANOUT_FUNCTION_NAME
+        if not self.function_name:
+            raise ValueError("FANOUT_FUNCTION_NAME is required for the lambda backend")
+        self.client = boto3.client("lambda", config=BotoConfig(
+            read_timeout=900,  # A shard may run up to the Lambda maximum
+            retries={"max_attempts": 0},  # A retried invocation would scrape the shard twice
+        ))
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fanout")
+
+    def submit(self, payload: Dict[str, Any]) -> "Future[Dict[str, Any]]":
+        return self.pool.submit(self._invoke, payload)
+
+    def _invoke(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.client.invoke(
+            FunctionName=self.function_name,
+            InvocationType="RequestResponse",
+            Payload=json.dumps({"shard": payload}).encode("utf-8"),
+        )
+        body = json.loads(response["Payload"].read())
+        if response.get("FunctionError") or body.get("status") == "error":
+            raise RuntimeError(f"Shard {payload['shard']} failed: {body}")
+        return body
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False)
+
+def make_backend(shards: int) -> DispatchBackend:
+    """The FANOUT_BACKEND backend, sized to run every shard at once."""
+    if Config.FANOUT_BACKEND == "lambda":
+        return LambdaBackend(shards)
+    if Config.FANOUT_BACKEND == "process":
+        return ProcessPoolBackend(shards)
+    raise ValueError(f"Unknown FANOUT_BACKEND: {Config.FANOUT_BACKEND}")
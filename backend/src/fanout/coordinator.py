@@ -0,0 +1,97 @@
+from concurrent.futures import TimeoutError as FutureTimeout, as_completed
+from typing import Iterator, List, Optional
+
+from config import Config
+from src.fanout.backends import DispatchBackend
+from src.fanout.sharding import ShardRing
+from src.metrics.recorder import CycleMetrics
+from src.models import ScanCursor
+from src.pipeline.cycle import CompanyResult
+from src.scheduling.budget import TimeBudget
+from src.scheduling.health import classify_failure
+
+class Coordinator:
+    """
+    Fans a cycle's scrape stage out to workers and gathers their results.
+
+    Companies are partitioned with a ``ShardRing`` and each shard is sent to
+    the backend at once. ``scrape`` yields results shard by shard as workers
+    finish, so it plugs into ``ScanCycle.consume`` in place of the local
+    scrape stage: diffing, the outbox and notifications still run once.
+    """
+
+    def __init__(self, backend: DispatchBackend, shards: int, metrics: Optional[CycleMetrics] = None):
+        self.backend = backend
+        self.ring = ShardRing(shards)
+        self.metrics = metrics or CycleMetrics()
+
+    def scrape(
+        self,
+        companies: List[str],
+        cursor: ScanCursor,
+        budget: Optional[TimeBudget] = None,
+        deferred: Optional[List[str]] = None,
+    ) -> Iterator[CompanyResult]:
+        """
+        Scrape ``companies`` across the shards, yielding each company's result.
+
+        Companies a worker had no time for, whose whole shard failed, or
+        whose shard had not answered before the budget ran out are appended
+        to ``deferred`` and stay due for the next cycle. A shard the backend
+        could not dispatch comes back as error results for its companies.
+        """
+        deferred = [] if deferred is None else deferred
+        budget_ms = None
+        wait_s = None
+        if budget is not None and budget.limited:
+            budget_ms = max(0, int(budget.remaining_ms() - budget.reserve_ms))
+            # Workers stop at budget_ms; half the reserve covers their replies,
+            # the other half is left for the notify stage and the cursor.
+            wait_s = max(0.0, budget.remaining_ms() - budget.reserve_ms / 2) / 1000
+
+        futures = {}
+        default_cost = float(Config.SCRAPER_TIMEOUT_MS)
+        shards = self.ring.partition(companies, cost=cursor.cost_ms, default_cost=default_cost)
+        for shard, names in enumerate(shards):
+            if not names:
+                continue
+            payload = {
+                "shard": shard,
+                "companies": names,
+                "cost_ms": {c: cursor.cost_ms[c] for c in names if c in cursor.cost_ms},
+                "load_ms": {c: cursor.load_ms[c] for c in names if c in cursor.load_ms},
+                "budget_ms": budget_ms,
+            }
+            try:
+                futures[self.backend.submit(payload)] = names
+            except Exception as e:
+                print(f"Could not dispatch shard {shard} of {len(names)} companies: {e}")
+                failure = classify_failure(e)
+                for name in names:
+                    yield CompanyResult(company=name, error=str(e), failure=failure)
+        print(f"Dispatched {len(companies)} companies to {len(futures)} shards")
+
+        pending = dict(futures)
+        try:
+            for future in as_completed(futures, timeout=wait_s):
+                names = pending.pop(future)
+                try:
+                    output = future.result()
+                except Exception as e:
+                    print(f"Shard of {len(names)} companies failed, deferring them: {e}")
+                    deferred.extend(names)
+                    continue
+
+                deferred.extend(output.get("deferred", []))
+                for stage, values in output.get("stages", {}).items():
+                    for elapsed_ms in values:
+                        self.metrics.add_timing(stage, elapsed_ms)
+                for method, usage in output.get("firestore", {}).items():
+                    self.metrics.merge_firestore(method, usage)
+                for data in output["results"]:
+                    yield CompanyResult.from_dict(data)
+        except FutureTimeout:
+            print(f"{len(pending)} shards did not answer within the budget, deferring them")
+            for future, names in pending.items():
+                future.cancel()
+                deferred.extend(names)
@@ -0,0 +1,61 @@
+from typing import Any, Dict
+
+from src import clients
+from src.metrics.recorder import CycleMetrics, recording
+from src.models import ScanCursor
+from src.pipeline.cycle import ScanCycle
+from src.registry.companies import load_registry
+from src.scheduling.budget import FakeLambdaContext, TimeBudget
+
+def scrape_shard(payload: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
+    """
+    Worker side of the fan-out: scrape one shard and return plain data.
+
+    Only the scrape stage runs here (config lookup, learning, page loads);
+    diffing and notifications happen once, in the coordinator, over every
+    shard's results.
+
+    Args:
+        payload: {"shard", "companies" (schedule order), "cost_ms" (expected
+            scrape times), "load_ms" (recent page-load times, for timeouts),
+            "budget_ms" (coordinator's time left, or None)}
+        context: Lambda context when invoked as a Lambda; the shard stops
+            starting companies at whichever comes first of its timeout and
+            ``budget_ms``
+
+    Returns:
+        Dict with the shard number, one ``CompanyResult.to_dict`` per
+        company scraped, the companies deferred, raw stage timings and
+        Firestore usage
+    """
+    # Bounded by both this worker's own timeout and the coordinator's
+    # deadline: a worker that outlives the coordinator's wait is wasted
+    budget_ms = payload.get("budget_ms")
+    if budget_ms is not None:
+        if hasattr(context, "get_remaining_time_in_millis"):
+            budget_ms = min(budget_ms, context.get_remaining_time_in_millis())
+        context = FakeLambdaContext(timeout_ms=budget_ms)
+
+    db = clients.get_db()
+    metrics = CycleMetrics()
+    with recording(metrics):
+        cycle = ScanCycle(
+            db, clients.get_scraper(), None, None,
+            learner_factory=clients.get_learner,
+            metrics=metrics,
+            registry=load_registry(db),
+        )
+        cursor = ScanCursor(cost_ms=payload.get("cost_ms", {}), load_ms=payload.get("load_ms", {}))
+        deferred = []
+        results = [
+            result.to_dict()
+            for result in cycle.scrape(payload["companies"], budget=TimeBudget(context), cursor=cursor, deferred=deferred)
+        ]
+    return {
+        "status": "success",
+        "shard": payload["shard"],
+        "results": results,
+        "deferred": deferred,
+        "stages": metrics.stages,
+        "firestore": metrics.firestore,
+    }
@@ -1,11 +1,23 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import json
-from typing import Any, Dict
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Dict, List, Set
 
 from config import Config
-from src.database.firestore_client import FirestoreClient
-from src.scraper.playwright_scraper import CareerPageScraper
-from src.llm.selector_learner import SelectorLearner
-from src.notifier.expo_push import NotificationService
+from src import clients
+from src.notifier.outbox import NotificationOutbox
+from src.metrics.profiling import CycleProfiler
+from src.metrics.recorder import CycleMetrics, recording
+from src.models import ScanCursor, UserProfile
+from src.pipeline.cycle import ScanCycle
+from src.fanout.backends import make_backend
+from src.fanout.coordinator import Coordinator
+from src.fanout.shard import scrape_shard
+from src.registry.companies import load_registry
+from src.scheduling.budget import FakeLambdaContext, TimeBudget, plan_companies
 
 def lambda_handler(event: Any, context: Any) -> Dict[str, Any]:
     """
@@ -15,17 +27,24 @@ def lambda_handler(event: Any, context: Any) -> Dict[str, Any]:
 
     Flow:
     1. Fetch list of companies to monitor from Firestore (from user subscriptions)
-    2. For each company:
+    2. For each company (several at once, see ScanCycle):
         a. Check if we have learned selectors
         b. If not, use LLM to learn them
         c. Scrape career page using selectors
-    3. Diff against seen jobs
-    4. Send notifications to matching users
-    5. Update seen jobs
+    3. As each company finishes, diff against seen jobs
+    4. Queue notifications for matching users in the durable outbox
+    5. Update seen jobs for that company
+    6. Drain the outbox (unless a separate dispatcher does it)
+
+    With FANOUT_SHARDS > 1 the scrape stage is split across workers (see
+    Coordinator); an event ``{"shard": ...}`` makes this invocation one of
+    those workers.
 
     Args:
-        event: EventBridge event (unused)
-        context: Lambda context (unused)
+        event: EventBridge event; ``{"profile": "cycle" | "stages"}`` profiles
+            this run regardless of PROFILE_MODE
+        context: Lambda context; its remaining time bounds how many companies
+            are started this run
 
     Returns:
         Dict with status and metrics
@@ -39,108 +58,180 @@ def lambda_handler(event: Any, context: Any) -> Dict[str, Any]:
         print(f"Configuration error: {e}")
         return {"status": "error", "message": str(e)}
 
-    # Initialize services
+    # Initialize services. Clients persist across warm invocations; the
+    # scraper, learner and notifier are only created once a stage needs them
     # We catch errors during init to be safe, especially DB init
+    clients.begin_invocation()
     try:
-        db = FirestoreClient()
-        scraper = CareerPageScraper()
-        learner = SelectorLearner()
-        notifier = NotificationService()
+        db = clients.get_db()
     except Exception as e:
         print(f"Initialization error: {e}")
         return {"status": "error", "message": str(e)}
 
-    # 1. Get state
-    seen_job_ids = db.get_seen_jobs()
-    print(f"Loaded {len(seen_job_ids)} previously seen jobs")
+    if isinstance(event, dict) and "shard" in event:
+        return scrape_shard(event["shard"], context)
+
+    profiler = CycleProfiler.from_config(event)
+    metrics = CycleMetrics(profiler=profiler)
+    # Firestore calls anywhere in the cycle are accounted to its metrics
+    with recording(metrics):
+        return _scan(db, context, metrics)
+
+def _scan(db: Any, context: Any, metrics: CycleMetrics) -> Dict[str, Any]:
+    """One scan cycle: load state, scrape what is due, diff, queue and deliver."""
+    outbox = NotificationOutbox(db, notifier_factory=clients.get_notifier)
+
+    # Deactivate dead devices before matching so no work is spent on them
+    with metrics.stage("prune_tokens"):
+        pruned_tokens = outbox.prune_dead_tokens()
 
-    users = db.get_users()
+    with metrics.stage("state_load"):
+        users = db.get_users()
     print(f"Found {len(users)} active users")
 
     if not users:
         print("No active users, skipping scrape")
-        return {"status": "success", "new_jobs": 0}
-
-    # 2. Determine companies to scrape (from user filters)
-    companies_to_scrape = set()
+        return _finish({"status": "success", "new_jobs": 0, "pruned_tokens": pruned_tokens}, metrics)
+
+    # 2. Determine companies to scrape (from user filters). Names are first
+    # resolved to canonical companies, so "google ", "Google" and "Alphabet"
+    # are one scrape. Only companies whose adaptive interval has elapsed are
+    # due; the most urgent go first so a run cut short resumes where the last
+    # one stopped
+    registry = load_registry(db)
+    users, registry_report = registry.canonicalize(users)
+    if registry_report["duplicate_scrapes_removed"]:
+        print(f"Resolved {registry_report['company_spellings']} company names to "
+              f"{registry_report['companies']} companies: {registry_report['merged']}")
+    metrics.incr("duplicate_scrapes_removed", registry_report["duplicate_scrapes_removed"])
+
+    subscribers: Dict[str, int] = {}
     for user in users:
-        companies_to_scrape.update(user.filters.companies)
+        for company in user.filters.companies:
+            subscribers[company] = subscribers.get(company, 0) + 1
+    companies_to_scrape = set(subscribers)
 
     print(f"Monitoring {len(companies_to_scrape)} companies: {companies_to_scrape}")
 
-    all_new_jobs = []
-
-    # 3. Scrape each company
-    for company in companies_to_scrape:
+    try:
+        with metrics.stage("state_load"):
+            cursor = db.get_scan_cursor()
+    except Exception as e:
+        print(f"Failed to load scan cursor, starting a fresh rotation: {e}")
+        cursor = ScanCursor()
+    budget = TimeBudget(context)
+    schedule = plan_companies(companies_to_scrape, cursor, priority=subscribers)
+    print(f"{len(schedule)} companies due this cycle")
+    open_breakers = [c for c, h in cursor.health.items() if h.state(datetime.utcnow()) == "open"]
+    if open_breakers:
+        print(f"Skipping {len(open_breakers)} companies with an open circuit breaker: {open_breakers}")
+        metrics.incr("breakers_open", len(open_breakers))
+
+    # 1. Get state (only needed, like the browser, when something is due).
+    # When fanning out, workers scrape and this invocation needs no browser
+    fan_out = Config.FANOUT_SHARDS > 1 and len(schedule) > 1
+    seen_job_ids = set()
+    scraper = None
+    if schedule:
+        with metrics.stage("state_load"):
+            seen_job_ids = db.get_seen_jobs()
+        print(f"Loaded {len(seen_job_ids)} previously seen jobs")
         try:
-            print(f"Processing {company}...")
-
-            # Check for learned selectors
-            config = db.get_scraper_config(company)
-
-            if not config or not config.is_learned:
-                print(f"  No learned config for {company}, learning now...")
-
-                # Fetch HTML for learning
-                # Note: In production, you'd want users to provide the career URL
-                # For MVP, we'll require it to be set during user registration or somehow known
-                # Since we don't have URL in UserFilters (only company name), we might miss it.
-                # The plan implies config might exist but !is_learned, OR we need to know the URL.
-                # If config doesn't exist at all, we can't scrape because we don't know the URL.
-                
-                if config and config.career_url:
-                    # Retry learning
-                     try:
-                        html = scraper.fetch_html_for_learning(config.career_url)
-                        new_config = learner.learn_selectors(company, config.career_url, html)
-                        db.save_scraper_config(new_config)
-                        config = new_config
-                     except Exception as learn_error:
-                         print(f"  Failed to learn selectors for {company}: {learn_error}")
-                         continue
-                else:
-                    print(f"  Skipping {company} - no config/URL found")
-                    continue
-
-            # Scrape using learned config
-            jobs = scraper.scrape_company(config)
-            print(f"  Found {len(jobs)} jobs on page")
-
-            # Filter for new jobs
-            for job in jobs:
-                if job.id not in seen_job_ids:
-                    all_new_jobs.append(job)
-                    seen_job_ids.add(job.id)
-
+            scraper = None if fan_out else clients.get_scraper()
         except Exception as e:
-            print(f"  Error scraping {company}: {e}")
+            print(f"Initialization error: {e}")
+            return {"status": "error", "message": str(e)}
+
+    # 3-6. Scrape, diff, queue and deliver, streaming company by company
+    cycle = ScanCycle(
+        db, scraper, None, outbox,
+        learner_factory=clients.get_learner,
+        metrics=metrics,
+        registry=registry,
+    )
+    profiler = metrics.profiler
+    # The scrape and notify threads do the cycle's work, so profile them too
+    whole_cycle = profiler.profile("cycle", threads=True) if profiler and profiler.mode == "cycle" else nullcontext()
+    with whole_cycle:
+        if fan_out:
+            stats = _fan_out(cycle, schedule, users, seen_job_ids, budget, cursor, metrics)
+        else:
+            stats = cycle.run(schedule, users, seen_job_ids, budget=budget, cursor=cursor)
+
+    cursor.prune(companies_to_scrape)
+    try:
+        with metrics.stage("persist"):
+            db.save_scan_cursor(cursor)
+    except Exception as e:
+        print(f"Failed to save scan cursor: {e}")
 
-            # Mark config for re-learning if scrape failed
-            if config:
-                db.mark_config_needs_relearning(company)
-            continue
+    delivery_stats = stats["notifications"]
+    pruned_tokens += delivery_stats.get("pruned_tokens", 0)
+    deferred = len(stats["deferred"])
 
-    if not all_new_jobs:
+    if not stats["new_jobs"]:
         print("No new jobs detected")
-        return {"status": "success", "new_jobs": 0}
-
-    print(f"Detected {len(all_new_jobs)} new jobs")
-
-    # 4. Send notifications
-    notifier.dispatch(all_new_jobs, users)
-
-    # 5. Update seen jobs
-    new_job_ids = [job.id for job in all_new_jobs]
-    db.add_seen_jobs(new_job_ids)
-
-    print(f"Cycle complete. Processed {len(new_job_ids)} new jobs")
-    return {
+        return _finish({
+            "status": "success",
+            "new_jobs": 0,
+            "pruned_tokens": pruned_tokens,
+            "companies_deferred": deferred,
+            "companies_not_due": len(companies_to_scrape) - len(schedule),
+            "registry": registry_report,
+        }, metrics)
+
+    print(f"Cycle complete. Processed {stats['new_jobs']} new jobs")
+    return _finish({
         "status": "success",
-        "new_jobs": len(new_job_ids),
-        "companies_scraped": len(companies_to_scrape)
-    }
+        "new_jobs": stats["new_jobs"],
+        "companies_scraped": len(schedule) - deferred,
+        "companies_deferred": deferred,
+        "companies_not_due": len(companies_to_scrape) - len(schedule),
+        "registry": registry_report,
+        "notifications_queued": stats["notifications_queued"],
+        "notifications": delivery_stats,
+        "pruned_tokens": pruned_tokens,
+        "first_notification_ms": delivery_stats.get("first_notification_ms"),
+        "cycle_ms": stats["cycle_ms"],
+    }, metrics)
+
+def _fan_out(
+    cycle: ScanCycle,
+    schedule: List[str],
+    users: List[UserProfile],
+    seen_job_ids: Set[str],
+    budget: TimeBudget,
+    cursor: ScanCursor,
+    metrics: CycleMetrics,
+) -> Dict[str, Any]:
+    """Scrape the schedule on FANOUT_SHARDS workers and consume their results here."""
+    backend = make_backend(Config.FANOUT_SHARDS)
+    try:
+        coordinator = Coordinator(backend, Config.FANOUT_SHARDS, metrics=metrics)
+        deferred: List[str] = []
+        results = coordinator.scrape(schedule, cursor, budget=budget, deferred=deferred)
+        return cycle.consume(results, users, seen_job_ids, cursor=cursor, deferred=deferred)
+    finally:
+        backend.close()
+
+def _finish(result: Dict[str, Any], metrics: CycleMetrics) -> Dict[str, Any]:
+    """Log the cycle's metrics and attach their summary, the startup report and any profiles."""
+    metrics.check_read_budget()
+    metrics.emit()
+    if metrics.profiler is not None:
+        try:
+            result["profiles"] = metrics.profiler.flush()
+        except Exception as e:
+            print(f"Failed to write profiles: {e}")
+    report = clients.startup_report()
+    print(f"Startup: {json.dumps(report)}")
+    result["startup"] = report
+    result["metrics"] = metrics.summary()
+    return result
+
+clients.record_module_import("handler", time.perf_counter() - _IMPORT_STARTED)
 
 # Local testing entry point
 if __name__ == "__main__":
-    result = lambda_handler(None, None)
+    result = lambda_handler(None, FakeLambdaContext())
     print(json.dumps(result, indent=2))
@@ -0,0 +1,81 @@
+import os
+import resource
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def process_tree_rss_mb() -> float:
+    """
+    Resident memory of this process and its descendants, in MB.
+
+    The descendants are the Playwright driver and the browsers it launched,
+    which hold most of a scrape's memory and are what pushes a Lambda out of
+    memory. Without /proc (macOS) only this process's peak RSS is known.
+    """
+    try:
+        entries = os.listdir("/proc")
+    except FileNotFoundError:
+        # Peak rather than current; ru_maxrss is in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20)
+
+    parents: Dict[int, int] = {}
+    pages: Dict[int, int] = {}
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue  # Exited while listing
+        # Fields after the parenthesised command name: state, ppid, ..., rss (24th overall)
+        fields = stat.rsplit(")", 1)[1].split()
+        parents[int(entry)] = int(fields[1])
+        pages[int(entry)] = int(fields[21])
+
+    tree = {os.getpid()}
+    grew = True
+    while grew:
+        children = {pid for pid, parent in parents.items() if parent in tree and pid not in tree}
+        tree |= children
+        grew = bool(children)
+    return sum(pages.get(pid, 0) for pid in tree) * PAGE_SIZE / (1 << 20)
+
+class MemoryWatch:
+    """Highest memory sampled while one company was being scanned."""
+
+    def __init__(self):
+        self.peak_mb = 0.0
+
+    def sample(self) -> float:
+        usage = process_tree_rss_mb()
+        self.peak_mb = max(self.peak_mb, usage)
+        return usage
+
+_local = threading.local()
+
+@contextmanager
+def watching_memory() -> Iterator[MemoryWatch]:
+    """
+    Track peak memory on this thread for the enclosed block.
+
+    Sampled on entry, on exit and wherever ``sample_memory`` is called in
+    between (the scraper does so between extraction chunks). Concurrent
+    scrapes share the process, so each sees the others' browsers too.
+    """
+    watch = MemoryWatch()
+    previous: Optional[MemoryWatch] = getattr(_local, "watch", None)
+    _local.watch = watch
+    watch.sample()
+    try:
+        yield watch
+    finally:
+        watch.sample()
+        _local.watch = previous
+
+def sample_memory() -> float:
+    """Current memory in MB, also recorded by this thread's active watch."""
+    watch: Optional[MemoryWatch] = getattr(_local, "watch", None)
+    return watch.sample() if watch is not None else process_tree_rss_mb()
@@ -0,0 +1,187 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+
+# Frames kept per allocation; enough to tell call sites apart, cheap to record
+TRACEMALLOC_FRAMES = 5
+TOP_ENTRIES = 30
+
+class CycleProfiler:
+    """
+    Opt-in cProfile and tracemalloc capture for one scan cycle.
+
+    In "cycle" mode the whole cycle is profiled, including the scrape and
+    notify threads it starts, so the profile shows their work rather than
+    the calling thread waiting on them; in "stages" mode each occurrence of
+    the selected stages (e.g. extraction, dispatch) is profiled on whichever
+    thread runs it. Profiles are merged per target. Allocations are measured as the tracemalloc snapshot
+    difference across each profiled block; other threads allocating at the
+    same time show up in it too.
+
+    ``flush()`` writes a pstats dump plus a short text summary per target to
+    PROFILE_DIR and, if PROFILE_S3_BUCKET is set, uploads them.
+    """
+
+    def __init__(self, mode: str, stages: Optional[List[str]] = None, trace_allocations: bool = True):
+        self.mode = mode
+        self.stages = set(stages or [])
+        self.trace_allocations = trace_allocations
+        self.run_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, List[cProfile.Profile]] = {}
+        self._allocations: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self._started_tracing = False
+
+    @classmethod
+    def from_config(cls, event: Optional[dict] = None) -> Optional["CycleProfiler"]:
+        """
+        Profiler for this invocation, or None when profiling is off or not sampled.
+
+        PROFILE_MODE turns profiling on at PROFILE_SAMPLE_RATE; an event with
+        ``{"profile": "cycle" | "stages"}`` forces it for one invocation.
+        """
+        forced = event.get("profile") if isinstance(event, dict) else None
+        mode = forced or Config.PROFILE_MODE
+        if mode not in ("cycle", "stages"):
+            return None
+        if not forced and random.random() >= Config.PROFILE_SAMPLE_RATE:
+            return None
+
+        stages = [s.strip() for s in Config.PROFILE_STAGES.split(",") if s.strip()]
+        print(f"Profiling this cycle (mode={mode}, stages={stages})")
+        return cls(mode, stages=stages, trace_allocations=Config.PROFILE_ALLOCATIONS)
+
+    def wants(self, stage: str) -> bool:
+        return self.mode == "stages" and stage in self.stages
+
+    @contextmanager
+    def profile(self, target: str, threads: bool = False) -> Iterator[None]:
+        """
+        Profile the enclosed block on the current thread and record it under
+        ``target``; with ``threads``, also every thread started meanwhile.
+        """
+        with self._lock:
+            if self.trace_allocations and not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._started_tracing = True
+        before = tracemalloc.take_snapshot() if self.trace_allocations else None
+
+        profile: Optional[cProfile.Profile] = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process; an
+            # overlapping occurrence on another thread only gets allocations
+            profile = None
+        # Before 3.12 cProfile only sees the thread that enabled it; from
+        # 3.12 one profiler already covers every thread
+        per_thread = threads and profile is not None and sys.version_info < (3, 12)
+        if per_thread:
+            threading.setprofile(self._thread_hook(target))
+        try:
+            yield
+        finally:
+            diff = None
+            if per_thread:
+                threading.setprofile(None)
+            if profile is not None:
+                profile.disable()
+            if before is not None:
+                diff = tracemalloc.take_snapshot().compare_to(before, "lineno")
+            with self._lock:
+                if profile is not None:
+                    self._profiles.setdefault(target, []).append(profile)
+                if diff:
+                    totals = self._allocations.setdefault(target, {})
+                    for stat in diff:
+                        if stat.size_diff <= 0:
+                            continue
+                        line = str(stat.traceback[0])
+                        size, count = totals.get(line, (0, 0))
+                        totals[line] = (size + stat.size_diff, count + stat.count_diff)
+
+    def _thread_hook(self, target: str):
+        """``threading.setprofile`` hook giving each new thread its own profiler under ``target``."""
+        def start(frame, event, arg):
+            sys.setprofile(None)
+            profile = cProfile.Profile()
+            profile.enable()
+            with self._lock:
+                self._profiles.setdefault(target, []).append(profile)
+        return start
+
+    def allocation_report(self, target: str, top: int = TOP_ENTRIES) -> List[Tuple[str, int, int]]:
+        """Largest net allocations recorded for ``target`` as (file:line, bytes, blocks)."""
+        with self._lock:
+            totals = dict(self._allocations.get(target, {}))
+        ranked = sorted(totals.items(), key=lambda item: -item[1][0])[:top]
+        return [(line, size, count) for line, (size, count) in ranked]
+
+    def flush(self) -> List[str]:
+        """Write (and upload) every capture; returns the written paths."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+        with self._lock:
+            profiles = {target: list(runs) for target, runs in self._profiles.items()}
+
+        paths = []
+        for target, runs in profiles.items():
+            stats = pstats.Stats(runs[0])
+            for run in runs[1:]:
+                stats.add(run)
+
+            base = os.path.join(Config.PROFILE_DIR, f"{self.run_id}-{target}")
+            stats.dump_stats(f"{base}.prof")
+            paths.append(f"{base}.prof")
+
+            with open(f"{base}.txt", "w") as f:
+                f.write(self._summary(target, stats, len(runs)))
+            paths.append(f"{base}.txt")
+
+        if Config.PROFILE_S3_BUCKET and paths:
+            self._upload(paths)
+        return paths
+
+    def _summary(self, target: str, stats: pstats.Stats, runs: int) -> str:
+        out = io.StringIO()
+        out.write(f"# {target}: {runs} profiled run(s), run {self.run_id}\n\n")
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(TOP_ENTRIES)
+
+        allocations = self.allocation_report(target)
+        if allocations:
+            out.write(f"\n# Top allocations ({target})\n")
+            for line, size, count in allocations:
+                out.write(f"{size / 1024:10.1f} KiB {count:8d} blocks  {line}\n")
+        return out.getvalue()
+
+    def _upload(self, paths: List[str]) -> None:
+        """Copy captures to S3; boto3 ships with the Lambda runtime but is optional locally."""
+        try:
+            import boto3
+        except ImportError:
+            print("boto3 not installed, keeping profiles in PROFILE_DIR only")
+            return
+
+        try:
+            s3 = boto3.client("s3")
+            for path in paths:
+                key = f"{Config.PROFILE_S3_PREFIX.rstrip('/')}/{os.path.basename(path)}"
+                s3.upload_file(path, Config.PROFILE_S3_BUCKET, key)
+            print(f"Uploaded {len(paths)} profile files to s3://{Config.PROFILE_S3_BUCKET}")
+        except Exception as e:
+            print(f"Failed to upload profiles: {e}")
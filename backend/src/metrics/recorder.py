@@ -0,0 +1,280 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from config import Config
+
+if TYPE_CHECKING:
+    from src.metrics.profiling import CycleProfiler
+
+# CloudWatch accepts at most 100 values per metric in one EMF record
+EMF_MAX_VALUES = 100
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (``q`` in [0, 100]); 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+class CycleMetrics:
+    """
+    Stage timers, per-company outcomes, counters and Firestore usage for one
+    scan cycle.
+
+    Safe to record into from the scrape workers and the notify thread.
+    ``summary()`` goes into the handler's response; ``emit()`` writes the
+    same data as CloudWatch Embedded Metric Format (or plain JSON) log lines.
+    With a ``profiler`` in "stages" mode, the stages it selects are also
+    profiled.
+    """
+
+    def __init__(self, profiler: Optional["CycleProfiler"] = None):
+        self.profiler = profiler
+        self._lock = threading.Lock()
+        self.stages: Dict[str, List[float]] = {}
+        self.companies: Dict[str, Dict[str, Any]] = {}
+        self.counters: Dict[str, int] = {}
+        # Per FirestoreClient method: reads, writes, bytes read and call latencies
+        self.firestore: Dict[str, Dict[str, Any]] = {}
+
+    def add_timing(self, stage: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.stages.setdefault(stage, []).append(elapsed_ms)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one occurrence of stage ``name``."""
+        started = time.perf_counter()
+        try:
+            if self.profiler is not None and self.profiler.wants(name):
+                with self.profiler.profile(name):
+                    yield
+            else:
+                yield
+        finally:
+            self.add_timing(name, (time.perf_counter() - started) * 1000)
+
+    def incr(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def record_firestore(self, method: str, reads: int, writes: int, bytes_read: int, elapsed_ms: float) -> None:
+        """Record one FirestoreClient call."""
+        self.merge_firestore(method, {
+            "reads": reads, "writes": writes, "bytes_read": bytes_read, "latency_ms": [elapsed_ms],
+        })
+
+    def merge_firestore(self, method: str, usage: Dict[str, Any]) -> None:
+        """Add usage recorded elsewhere (e.g. by a fan-out worker) for ``method``."""
+        with self._lock:
+            total = self.firestore.setdefault(method, {"reads": 0, "writes": 0, "bytes_read": 0, "latency_ms": []})
+            for key in ("reads", "writes", "bytes_read"):
+                total[key] += usage[key]
+            total["latency_ms"].extend(usage["latency_ms"])
+
+    def check_read_budget(self) -> bool:
+        """Warn (and count it) if the cycle read more documents than FIRESTORE_READ_BUDGET."""
+        usage = self.summary()["firestore"]
+        if not usage["over_budget"]:
+            return False
+        heaviest = {method: m["reads"] for method, m in list(usage["methods"].items())[:3]}
+        print(f"Warning: cycle used {usage['reads']} Firestore reads, over the budget of "
+              f"{usage['read_budget']} (most by {heaviest})")
+        self.incr("firestore_over_budget")
+        return True
+
+    def record_company(
+        self,
+        company: str,
+        outcome: str,
+        latency_ms: float,
+        jobs_found: int = 0,
+        new_jobs: int = 0,
+        peak_memory_mb: Optional[float] = None,
+    ) -> None:
+        """Record how one company's scan went (outcome: ok, error or no_config)."""
+        with self._lock:
+            self.companies[company] = {
+                "outcome": outcome,
+                "latency_ms": round(latency_ms, 1),
+                "jobs_found": jobs_found,
+                "new_jobs": new_jobs,
+                "peak_memory_mb": peak_memory_mb,
+            }
+
+    def summary(self, slowest: int = 5) -> Dict[str, Any]:
+        """Percentiles per stage and across companies, plus the slowest companies."""
+        with self._lock:
+            stages = {name: list(values) for name, values in self.stages.items()}
+            companies = dict(self.companies)
+            counters = dict(self.counters)
+            firestore = {method: {**usage, "latency_ms": list(usage["latency_ms"])}
+                         for method, usage in self.firestore.items()}
+
+        latencies = [c["latency_ms"] for c in companies.values()]
+        peaks = [c["peak_memory_mb"] for c in companies.values() if c["peak_memory_mb"] is not None]
+        outcomes: Dict[str, int] = {}
+        for c in companies.values():
+            outcomes[c["outcome"]] = outcomes.get(c["outcome"], 0) + 1
+
+        return {
+            "stages": {
+                name: {
+                    "count": len(values),
+                    "total_ms": round(sum(values), 1),
+                    "p50_ms": round(percentile(values, 50), 1),
+                    "p95_ms": round(percentile(values, 95), 1),
+                    "max_ms": round(max(values), 1),
+                }
+                for name, values in sorted(stages.items())
+            },
+            "companies": {
+                "count": len(companies),
+                "outcomes": outcomes,
+                "latency_p50_ms": round(percentile(latencies, 50), 1),
+                "latency_p95_ms": round(percentile(latencies, 95), 1),
+                "latency_max_ms": round(max(latencies, default=0.0), 1),
+                "peak_memory_max_mb": max(peaks, default=None),
+                "slowest": [
+                    {"company": name, **c}
+                    for name, c in sorted(companies.items(), key=lambda item: -item[1]["latency_ms"])[:slowest]
+                ],
+            },
+            "counters": counters,
+            "firestore": firestore_summary(firestore),
+        }
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        One log record per stage, per company and for the cycle counters.
+
+        In "emf" format each record carries the ``_aws`` metadata CloudWatch
+        uses to extract metrics (dimensions Stage and Outcome); in "json" format
+        the same fields are logged without it. Company is logged as a plain
+        property, not a dimension, so the metric count does not grow with the
+        number of companies.
+        """
+        with self._lock:
+            stages = {name: list(values) for name, values in self.stages.items()}
+            companies = dict(self.companies)
+            counters = dict(self.counters)
+            firestore = {method: {**usage, "latency_ms": list(usage["latency_ms"])}
+                         for method, usage in self.firestore.items()}
+
+        records = []
+        for name, values in sorted(stages.items()):
+            for start in range(0, len(values), EMF_MAX_VALUES):
+                records.append(self._record(
+                    {"Stage": name},
+                    {"DurationMs": ("Milliseconds", [round(v, 1) for v in values[start:start + EMF_MAX_VALUES]])},
+                ))
+        for name, c in sorted(companies.items()):
+            values = {
+                "LatencyMs": ("Milliseconds", c["latency_ms"]),
+                "JobsFound": ("Count", c["jobs_found"]),
+                "NewJobs": ("Count", c["new_jobs"]),
+            }
+            if c["peak_memory_mb"] is not None:
+                values["PeakMemoryMb"] = ("Megabytes", c["peak_memory_mb"])
+            records.append(self._record({"Outcome": c["outcome"]}, values, Company=name))
+        for method, usage in sorted(firestore.items()):
+            records.append(self._record({"FirestoreMethod": method}, {
+                "Reads": ("Count", usage["reads"]),
+                "Writes": ("Count", usage["writes"]),
+                "BytesRead": ("Bytes", usage["bytes_read"]),
+                "LatencyMs": ("Milliseconds", round(sum(usage["latency_ms"]), 1)),
+            }))
+        if counters:
+            records.append(self._record({}, {name: ("Count", value) for name, value in sorted(counters.items())}))
+        return records
+
+    def _record(self, dimensions: Dict[str, str], metrics: Dict[str, Any], **properties: Any) -> Dict[str, Any]:
+        record: Dict[str, Any] = {**dimensions, **properties}
+        for name, (_, value) in metrics.items():
+            record[name] = value
+
+        if Config.METRICS_FORMAT == "emf":
+            record["_aws"] = {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": Config.METRICS_NAMESPACE,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, (unit, _) in metrics.items()],
+                }],
+            }
+        return record
+
+    def emit(self) -> None:
+        """Print every record as a single-line JSON log entry."""
+        for record in self.records():
+            print(json.dumps(record))
+
+def firestore_summary(firestore: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Totals and per-method Firestore usage, checked against FIRESTORE_READ_BUDGET.
+
+    Firestore bills one read per document returned (and one for a query that
+    returns none), whatever its projection; projections only cut the bytes
+    sent, which ``bytes_read`` estimates.
+    """
+    reads = sum(usage["reads"] for usage in firestore.values())
+    budget = Config.FIRESTORE_READ_BUDGET
+    return {
+        "reads": reads,
+        "writes": sum(usage["writes"] for usage in firestore.values()),
+        "bytes_read": sum(usage["bytes_read"] for usage in firestore.values()),
+        "read_budget": budget or None,
+        "over_budget": bool(budget) and reads > budget,
+        "methods": {
+            method: {
+                "calls": len(usage["latency_ms"]),
+                "reads": usage["reads"],
+                "writes": usage["writes"],
+                "bytes_read": usage["bytes_read"],
+                "total_ms": round(sum(usage["latency_ms"]), 1),
+                "p95_ms": round(percentile(usage["latency_ms"], 95), 1),
+            }
+            for method, usage in sorted(firestore.items(), key=lambda item: -item[1]["reads"])
+        },
+    }
+
+# Metrics of the cycle currently running in this process; lets deep call
+# sites (the scraper, the learner) time themselves without extra arguments
+_active: Optional[CycleMetrics] = None
+
+@contextmanager
+def recording(metrics: CycleMetrics) -> Iterator[CycleMetrics]:
+    """Make ``metrics`` the target of ``timed`` for the enclosed block."""
+    global _active
+    previous, _active = _active, metrics
+    try:
+        yield metrics
+    finally:
+        _active = previous
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a stage into the active cycle's metrics; a no-op outside a cycle."""
+    metrics = _active
+    if metrics is None:
+        yield
+        return
+    with metrics.stage(stage):
+        yield
+
+def count(counter: str, amount: int = 1) -> None:
+    """Add to a counter of the active cycle's metrics; a no-op outside a cycle."""
+    metrics = _active
+    if metrics is not None:
+        metrics.incr(counter, amount)
+
+def record_firestore(method: str, reads: int, writes: int, bytes_read: int, elapsed_ms: float) -> None:
+    """Record a FirestoreClient call into the active cycle's metrics; a no-op outside a cycle."""
+    metrics = _active
+    if metrics is not None:
+        metrics.record_firestore(method, reads, writes, bytes_read, elapsed_ms)
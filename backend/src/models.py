@@ -1,6 +1,8 @@
 import hashlib
+import re
 from datetime import datetime
-from typing import List, Optional
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Literal, Optional, Pattern, Tuple
 from pydantic import BaseModel, Field, HttpUrl
 
 class JobPosting(BaseModel):
@@ -21,42 +23,217 @@ class JobPosting(BaseModel):
         return hashlib.sha256(raw.encode('utf-8')).hexdigest()
 
     def model_post_init(self, __context) -> None:
-        """Auto-generate hash if id not provided."""
+        """Auto-generate hash if id not provided, and normalize match fields."""
         if not self.id or self.id == "auto":
             self.id = self.generate_hash(self.company, self.role, self.location)
+        # Precompute the lowercased fields filters match against
+        self.company_normalized
+        self.role_normalized
+
+    # cached_property values live in the instance __dict__, so reads in the
+    # matching hot loop are plain attribute lookups
+    @cached_property
+    def company_normalized(self) -> str:
+        return self.company.lower()
+
+    @cached_property
+    def role_normalized(self) -> str:
+        return self.role.lower()
+
+class JobRecord:
+    """
+    Compact job representation for the scrape-and-diff hot path.
+
+    Pages can list thousands of jobs, nearly all already seen. Records skip
+    pydantic validation and timestamping; IDs are assigned in bulk with
+    ``assign_ids`` and full ``JobPosting`` models are only materialized
+    (via ``to_posting``) for the jobs that turn out to be new.
+    """
+
+    __slots__ = ("id", "company", "role", "location", "link", "source_url")
+
+    def __init__(
+        self,
+        company: str,
+        role: str,
+        location: str,
+        link: Optional[str] = None,
+        source_url: str = "",
+        id: str = "",
+    ):
+        self.id = id
+        self.company = company
+        self.role = role
+        self.location = location
+        self.link = link
+        self.source_url = source_url
+
+    def __repr__(self) -> str:
+        return f"JobRecord(id={self.id[:12]!r}, company={self.company!r}, role={self.role!r})"
+
+    @staticmethod
+    def assign_ids(records: List["JobRecord"]) -> List["JobRecord"]:
+        """
+        Set each record's ID to ``JobPosting.generate_hash`` of its fields.
+
+        The hash state for a company prefix is computed once and copied per
+        record, since every record on a career page shares its company.
+        """
+        primed: Dict[str, Any] = {}  # company -> sha256 state after the prefix
+        for record in records:
+            prefix = primed.get(record.company)
+            if prefix is None:
+                prefix = hashlib.sha256(f"{record.company.strip().lower()}|".encode('utf-8'))
+                primed[record.company] = prefix
+            digest = prefix.copy()
+            digest.update(f"{record.role.strip().lower()}|{record.location.strip().lower()}".encode('utf-8'))
+            record.id = digest.hexdigest()
+        return records
+
+    def to_posting(self) -> JobPosting:
+        """Materialize the full, validated model."""
+        return JobPosting(
+            id=self.id or "auto",
+            company=self.company,
+            role=self.role,
+            location=self.location,
+            link=self.link,
+            source_url=self.source_url,
+        )
+
+class JobList(List[JobRecord]):
+    """
+    The jobs scraped from one page.
+
+    ``complete`` is False when extraction stopped early (container cap or
+    deadline) or no container matched, so a job missing from the list may
+    still be open.
+    ``load_ms`` is how long the page took to be ready to extract.
+    """
+
+    complete: bool = True
+    load_ms: Optional[float] = None
+
+def normalize_terms(terms: List[str]) -> Tuple[str, ...]:
+    """Lowercase and trim filter terms, dropping blanks and duplicates (order kept)."""
+    normalized = (term.strip().lower() for term in terms)
+    return tuple(dict.fromkeys(term for term in normalized if term))
 
 class UserFilters(BaseModel):
-    """User preferences for job filtering."""
+    """
+    User preferences for job filtering.
+
+    Terms are normalized and compiled once on construction, so ``matches``
+    does no string work beyond the containment checks themselves. Treat
+    filters as immutable once built; the compiled terms are not refreshed.
+    """
 
     companies: List[str] = Field(default_factory=list)
     roles: List[str] = Field(default_factory=list)
     keywords: List[str] = Field(default_factory=list)  # e.g., ["new grad", "entry level"]
+    exclude_keywords: List[str] = Field(default_factory=list)  # e.g., ["senior", "staff"]
+    # How role/keyword/exclude terms match the job title:
+    # "substring" (default), "word" (whole words only) or "regex"
+    match_mode: Literal["substring", "word", "regex"] = "substring"
+
+    def model_post_init(self, __context) -> None:
+        """Compile terms up front so invalid patterns fail when the profile loads."""
+        self.company_terms
+        self.search_terms
+        self.exclude_terms
+        self.search_pattern
+        self.exclude_pattern
+
+    @cached_property
+    def company_terms(self) -> Tuple[str, ...]:
+        return normalize_terms(self.companies)
+
+    @cached_property
+    def search_terms(self) -> Tuple[str, ...]:
+        return normalize_terms(self.roles + self.keywords)
+
+    @cached_property
+    def exclude_terms(self) -> Tuple[str, ...]:
+        return normalize_terms(self.exclude_keywords)
+
+    @cached_property
+    def search_pattern(self) -> Optional[Pattern]:
+        """Compiled role/keyword pattern (word and regex modes only)."""
+        if self.match_mode == "word":
+            return self._compile_words(self.search_terms)
+        if self.match_mode == "regex":
+            return self._compile_regex(self.roles + self.keywords)
+        return None
+
+    @cached_property
+    def exclude_pattern(self) -> Optional[Pattern]:
+        """Compiled exclusion pattern (word and regex modes only)."""
+        if self.match_mode == "word":
+            return self._compile_words(self.exclude_terms)
+        if self.match_mode == "regex":
+            return self._compile_regex(self.exclude_keywords)
+        return None
+
+    @staticmethod
+    def _compile_words(terms: Tuple[str, ...]) -> Optional[Pattern]:
+        """Combine terms into one whole-word pattern."""
+        if not terms:
+            return None
+        alternatives = "|".join(re.escape(term) for term in terms)
+        return re.compile(rf"\b(?:{alternatives})\b")
+
+    @staticmethod
+    def _compile_regex(patterns: List[str]) -> Optional[Pattern]:
+        """Combine user patterns as written (not lowercased); ValueError if invalid."""
+        patterns = [p.strip() for p in patterns if p.strip()]
+        if not patterns:
+            return None
+        try:
+            return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Invalid filter pattern: {e}") from e
+
+    @property
+    def is_plain(self) -> bool:
+        """True if only substring terms are used (no exclusions or patterns)."""
+        return self.match_mode == "substring" and not self.exclude_terms
 
     def matches(self, job: JobPosting) -> bool:
         """Check if job matches user filters."""
-        # Empty filters = match all
-        if not self.companies and not self.roles and not self.keywords:
-            return True
-
-        # Check company (case-insensitive partial match)
-        if self.companies:
-            company_match = any(
-                comp.lower() in job.company.lower()
-                for comp in self.companies
-            )
-            if not company_match:
-                return False
+        role = job.role_normalized
+
+        # Exclusions veto the job regardless of the other filters
+        if self.exclude_terms:
+            exclude_pattern = self.exclude_pattern
+            if exclude_pattern is not None:
+                if exclude_pattern.search(role):
+                    return False
+            else:
+                for term in self.exclude_terms:
+                    if term in role:
+                        return False
 
-        # Check role keywords
-        if self.roles or self.keywords:
-            search_terms = self.roles + self.keywords
-            role_match = any(
-                term.lower() in job.role.lower()
-                for term in search_terms
-            )
-            if not role_match:
+        # Check company (case-insensitive partial match); empty = any company
+        company_terms = self.company_terms
+        if company_terms:
+            company = job.company_normalized
+            for term in company_terms:
+                if term in company:
+                    break
+            else:
                 return False
 
+        # Check role keywords; empty = any role
+        search_terms = self.search_terms
+        if search_terms:
+            search_pattern = self.search_pattern
+            if search_pattern is not None:
+                return search_pattern.search(role) is not None
+            for term in search_terms:
+                if term in role:
+                    return True
+            return False
+
         return True
 
 class UserProfile(BaseModel):
@@ -65,6 +242,7 @@ class UserProfile(BaseModel):
     push_token: str
     filters: UserFilters
     active: bool = True
+    user_id: Optional[str] = None  # Firestore document ID
 
 class ScraperConfig(BaseModel):
     """Learned CSS selectors for a company's career page."""
@@ -77,6 +255,11 @@ class ScraperConfig(BaseModel):
     link_selector: str
     last_updated: datetime = Field(default_factory=datetime.utcnow)
     is_learned: bool = True  # False if needs re-learning
+    # What a page load waits for: the job containers to exist, no network
+    # requests for 500 ms, or only the HTML to be parsed
+    wait_for: Literal["selector", "networkidle", "domcontentloaded"] = "selector"
+    browser: Optional[Literal["chromium", "webkit", "firefox"]] = None  # None: SCRAPER_BROWSER
+    timeout_ms: Optional[int] = None  # This scan's page-load timeout, from load history (not stored)
 
     def to_dict(self) -> dict:
         """Convert to Firestore-compatible dict."""
@@ -89,4 +272,179 @@ class ScraperConfig(BaseModel):
             "link_selector": self.link_selector,
             "last_updated": self.last_updated,
             "is_learned": self.is_learned,
+            "wait_for": self.wait_for,
+            "browser": self.browser,
+        }
+
+class CompanyEntry(BaseModel):
+    """A company in the registry: its canonical name, other names users type, and where its jobs are."""
+
+    name: str  # Canonical name, also the scraper_configs document ID
+    aliases: List[str] = Field(default_factory=list)  # e.g. ["Alphabet", "Google LLC"]
+    career_url: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """Convert to Firestore-compatible dict."""
+        return {
+            "name": self.name,
+            "aliases": self.aliases,
+            "career_url": self.career_url,
+        }
+
+class PushTicketRecord(BaseModel):
+    """Expo push ticket awaiting its delivery receipt."""
+
+    ticket_id: str
+    push_token: str
+    user_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        """Convert to Firestore-compatible dict."""
+        return {
+            "push_token": self.push_token,
+            "user_id": self.user_id,
+            "created_at": self.created_at,
+        }
+
+class OutboxEntry(BaseModel):
+    """A queued (user, job) notification delivery in the durable outbox."""
+
+    push_token: str
+    user_id: Optional[str] = None
+    job_id: str
+    company: str
+    role: str
+    location: str
+    link: Optional[str] = None
+    source_url: str = ""
+    status: str = "pending"  # pending -> sent | failed
+    attempts: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)  # Failed sends back off
+
+    @property
+    def recipient(self) -> str:
+        """Stable identity of the user this delivery is for."""
+        return self.user_id or self.push_token
+
+    @property
+    def dedupe_key(self) -> str:
+        """Deterministic document ID so re-enqueueing the same delivery is a no-op."""
+        raw = f"{self.recipient}|{self.job_id}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def for_job(cls, user: UserProfile, job: JobPosting) -> "OutboxEntry":
+        """Create a pending delivery of ``job`` to ``user``."""
+        return cls(
+            push_token=user.push_token,
+            user_id=user.user_id,
+            job_id=job.id,
+            company=job.company,
+            role=job.role,
+            location=job.location,
+            link=job.link,
+            source_url=job.source_url,
+        )
+
+    def to_job(self) -> JobPosting:
+        """Rebuild the job posting this delivery announces."""
+        return JobPosting(
+            id=self.job_id,
+            company=self.company,
+            role=self.role,
+            location=self.location,
+            link=self.link,
+            source_url=self.source_url,
+        )
+
+    def to_dict(self) -> dict:
+        """Convert to Firestore-compatible dict."""
+        return {
+            "push_token": self.push_token,
+            "user_id": self.user_id,
+            "job_id": self.job_id,
+            "company": self.company,
+            "role": self.role,
+            "location": self.location,
+            "link": self.link,
+            "source_url": self.source_url,
+            "status": self.status,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "next_attempt_at": self.next_attempt_at,
+        }
+
+class CompanyHealth(BaseModel):
+    """
+    Consecutive scan failures of one company and its circuit breaker.
+
+    The breaker opens after SCHEDULER_BREAKER_THRESHOLD failures in a row;
+    while ``open_until`` is in the future the company is not scanned, after
+    it one probe scan decides whether to close or reopen for longer.
+    """
+
+    consecutive_failures: int = 0
+    failures: Dict[str, int] = {}  # Consecutive failures by kind (see classify_failure)
+    last_error: Optional[str] = None
+    open_until: Optional[datetime] = None
+
+    def state(self, now: datetime) -> Literal["closed", "open", "half_open"]:
+        if self.open_until is None:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+class ScanCursor(BaseModel):
+    """
+    Where the scan rotation stands across invocations.
+
+    Records when each company was last scanned, how long its scrape usually
+    takes, how often it posts and when it is next due, so a cycle that runs
+    out of time resumes next invocation with the companies it did not reach
+    and quiet companies are scanned less often.
+    """
+
+    last_scanned: Dict[str, datetime] = {}
+    cost_ms: Dict[str, float] = {}  # Moving average of scrape time per company
+    change_rate: Dict[str, float] = {}  # Moving average of new jobs per hour
+    next_due: Dict[str, datetime] = {}
+    health: Dict[str, CompanyHealth] = {}  # Only companies whose last scan failed
+    load_ms: Dict[str, List[float]] = {}  # Recent page-load times, for per-company timeouts
+    browsers: Dict[str, str] = {}  # Companies scraped with another engine than SCRAPER_BROWSER
+    empty_scans: Dict[str, int] = {}  # Scans in a row that found an empty listing
+
+    def expected_cost_ms(self, company: str, default: float) -> float:
+        """Expected scrape time for a company, ``default`` if never measured."""
+        return self.cost_ms.get(company, default)
+
+    def record(self, company: str, elapsed_ms: float, scanned_at: Optional[datetime] = None, alpha: float = 0.3) -> None:
+        """Mark a company scanned and fold ``elapsed_ms`` into its average cost."""
+        self.last_scanned[company] = scanned_at or datetime.utcnow()
+        previous = self.cost_ms.get(company)
+        self.cost_ms[company] = elapsed_ms if previous is None else (1 - alpha) * previous + alpha * elapsed_ms
+
+    def prune(self, companies: Iterable[str]) -> None:
+        """Forget companies that are no longer monitored."""
+        keep = set(companies)
+        self.last_scanned = {c: t for c, t in self.last_scanned.items() if c in keep}
+        self.cost_ms = {c: ms for c, ms in self.cost_ms.items() if c in keep}
+        self.change_rate = {c: r for c, r in self.change_rate.items() if c in keep}
+        self.next_due = {c: t for c, t in self.next_due.items() if c in keep}
+        self.health = {c: h for c, h in self.health.items() if c in keep}
+        self.load_ms = {c: samples for c, samples in self.load_ms.items() if c in keep}
+        self.browsers = {c: engine for c, engine in self.browsers.items() if c in keep}
+        self.empty_scans = {c: n for c, n in self.empty_scans.items() if c in keep}
+
+    def to_dict(self) -> dict:
+        """Convert to Firestore-compatible dict."""
+        return {
+            "last_scanned": self.last_scanned,
+            "cost_ms": self.cost_ms,
+            "change_rate": self.change_rate,
+            "next_due": self.next_due,
+            "health": {company: health.model_dump() for company, health in self.health.items()},
+            "load_ms": self.load_ms,
+            "browsers": self.browsers,
+            "empty_scans": self.empty_scans,
         }
@@ -1,67 +1,86 @@
-from typing import List
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
 from exponent_server_sdk import (
     PushClient,
     PushMessage,
     PushServerError,
+    PushTicket,
     DeviceNotRegisteredError
 )
+from pydantic import BaseModel, Field
+
+from config import Config
+from src.models import JobPosting, UserProfile, PushTicketRecord
+from src.notifier.matcher import FilterIndex
+
+# Hard limit enforced by the Expo push API
+EXPO_MAX_MESSAGES_PER_REQUEST = 100
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
 
-from src.models import JobPosting, UserProfile
+class DispatchResult(BaseModel):
+    """Outcome of a dispatch: send metrics plus follow-up work for the caller."""
+
+    stats: Dict[str, Any] = Field(default_factory=dict)
+    tickets: List[PushTicketRecord] = Field(default_factory=list)  # Awaiting receipts
+    unregistered_user_ids: List[str] = Field(default_factory=list)
+    failed_tokens: List[str] = Field(default_factory=list)  # In chunks that never got through
 
 class NotificationService:
     """Handles push notification dispatch via Expo."""
 
     def __init__(self):
-        self.client = PushClient()
+        self.chunk_size = max(1, min(Config.EXPO_PUSH_CHUNK_SIZE, EXPO_MAX_MESSAGES_PER_REQUEST))
+        self.concurrency = max(1, Config.EXPO_PUSH_CONCURRENCY)
+        self.max_retries = Config.EXPO_PUSH_MAX_RETRIES
+        self.client = PushClient(session=self._build_session())
+
+    def _build_session(self) -> requests.Session:
+        """Create an HTTP session whose connection pool fits all concurrent chunks."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "accept": "application/json",
+            "accept-encoding": "gzip, deflate",
+            "content-type": "application/json",
+        })
+        if Config.EXPO_ACCESS_TOKEN:
+            session.headers["Authorization"] = f"Bearer {Config.EXPO_ACCESS_TOKEN}"
+        return session
 
-    def dispatch(self, new_jobs: List[JobPosting], users: List[UserProfile]) -> None:
+    def dispatch(self, new_jobs: List[JobPosting], users: List[UserProfile]) -> DispatchResult:
         """
         Send notifications to users based on their filters.
 
         Args:
             new_jobs: List of newly discovered jobs
             users: List of user profiles with filters
+
+        Returns:
+            DispatchResult with send metrics, tickets to poll receipts for,
+            and users whose device is no longer registered
         """
         messages = []
+        recipients = []
 
-        for user in users:
-            # Find jobs matching this user's filters
-            relevant_jobs = [
-                job for job in new_jobs
-                if user.filters.matches(job)
-            ]
+        # Match every job against all users at once instead of per (user, job)
+        matches = FilterIndex(users).match_all(new_jobs)
+
+        for i, user in enumerate(users):
+            relevant_jobs = matches.get(i)
 
             if not relevant_jobs:
                 continue
 
             try:
-                if len(relevant_jobs) == 1:
-                    # Single job notification (detailed)
-                    job = relevant_jobs[0]
-                    msg = PushMessage(
-                        to=user.push_token,
-                        title=f"New Job at {job.company}",
-                        body=f"{job.role} in {job.location}",
-                        data={"url": job.link, "job_id": job.id},
-                        sound="default",
-                        priority="high",
-                    )
-                else:
-                    # Multiple jobs notification (summary)
-                    companies = ", ".join(set(j.company for j in relevant_jobs[:3]))
-                    remaining = len(relevant_jobs) - 3
-                    suffix = f" +{remaining} more" if remaining > 0 else ""
-
-                    msg = PushMessage(
-                        to=user.push_token,
-                        title=f"{len(relevant_jobs)} New Jobs Found",
-                        body=f"{companies}{suffix}",
-                        data={"count": len(relevant_jobs)},
-                        sound="default",
-                        priority="high",
-                    )
-
-                messages.append(msg)
+                messages.append(self.build_message(user.push_token, relevant_jobs))
+                recipients.append(user)
 
             except Exception as e:
                 print(f"Error building notification for {user.push_token}: {e}")
@@ -69,20 +88,223 @@ class NotificationService:
         # Send batch
         if not messages:
             print("No notifications to send")
-            return
+            return DispatchResult(stats={"messages": 0, "chunks": 0, "failed_chunks": 0})
 
-        try:
-            responses = self.client.publish_multiple(messages)
-
-            # Validate responses and handle errors
-            for response in responses:
-                try:
-                    response.validate_response()
-                except DeviceNotRegisteredError:
-                    print(f"Invalid token (device unregistered): {response.push_message.to}")
-                    # TODO: Mark user as inactive in database
-                except PushServerError as e:
-                    print(f"Push server error: {e.errors}")
+        return self.publish(messages, recipients)
+
+    @staticmethod
+    def build_message(push_token: str, relevant_jobs: List[JobPosting]) -> PushMessage:
+        """Build one notification for a user covering all of their matching jobs."""
+        if len(relevant_jobs) == 1:
+            # Single job notification (detailed)
+            job = relevant_jobs[0]
+            return PushMessage(
+                to=push_token,
+                title=f"New Job at {job.company}",
+                body=f"{job.role} in {job.location}",
+                data={"url": job.link, "job_id": job.id},
+                sound="default",
+                priority="high",
+            )
+
+        # Multiple jobs notification (summary)
+        companies = ", ".join(set(j.company for j in relevant_jobs[:3]))
+        remaining = len(relevant_jobs) - 3
+        suffix = f" +{remaining} more" if remaining > 0 else ""
+
+        return PushMessage(
+            to=push_token,
+            title=f"{len(relevant_jobs)} New Jobs Found",
+            body=f"{companies}{suffix}",
+            data={"count": len(relevant_jobs)},
+            sound="default",
+            priority="high",
+        )
+
+    def publish(
+        self,
+        messages: List[PushMessage],
+        recipients: Optional[List[UserProfile]] = None
+    ) -> DispatchResult:
+        """
+        Publish messages in chunks of at most 100, several chunks at a time.
+
+        A chunk that still fails after its retries is reported and skipped;
+        it does not affect the other chunks.
+
+        Args:
+            messages: Messages to send
+            recipients: Users the messages are addressed to, aligned with
+                ``messages``; used to attribute tickets and dead tokens
+
+        Returns:
+            DispatchResult with send metrics and per-ticket follow-up
+        """
+        chunks = [
+            messages[i:i + self.chunk_size]
+            for i in range(0, len(messages), self.chunk_size)
+        ]
 
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(chunks))) as pool:
+            results = list(pool.map(self._publish_chunk, range(len(chunks)), chunks))
+
+        user_ids = {}
+        for user in recipients or []:
+            if user.user_id:
+                user_ids[user.push_token] = user.user_id
+
+        result = DispatchResult()
+        for chunk, (tickets, metrics) in zip(chunks, results):
+            self._validate_tickets(tickets, user_ids, result)
+            if not metrics["ok"]:
+                result.failed_tokens.extend(msg.to for msg in chunk)
+
+        chunk_metrics = [metrics for _, metrics in results]
+        failed = [m for m in chunk_metrics if not m["ok"]]
+        latencies = sorted(m["latency_ms"] for m in chunk_metrics)
+        result.stats = {
+            "messages": len(messages),
+            "chunks": len(chunks),
+            "failed_chunks": len(failed),
+            "messages_failed": sum(m["size"] for m in failed),
+            "retries": sum(m["attempts"] - 1 for m in chunk_metrics),
+            "chunk_latency_ms_p50": latencies[len(latencies) // 2],
+            "chunk_latency_ms_max": latencies[-1],
+            "unregistered": len(result.unregistered_user_ids),
+        }
+        print(f"Published {len(messages)} notifications in {len(chunks)} chunks "
+              f"({len(failed)} failed)")
+        return result
+
+    def _publish_chunk(
+        self,
+        index: int,
+        chunk: List[PushMessage]
+    ) -> Tuple[List[PushTicket], Dict[str, Any]]:
+        """Publish one chunk, retrying transient failures with jittered backoff."""
+        start = time.perf_counter()
+        attempt = 0
+        error: Optional[str] = None
+        tickets: List[PushTicket] = []
+
+        while True:
+            attempt += 1
+            try:
+                tickets = self.client.publish_multiple(chunk)
+                error = None
+                break
+            except Exception as e:
+                error = str(e)
+                if attempt > self.max_retries or not self._is_retryable(e):
+                    print(f"Chunk {index} failed after {attempt} attempt(s): {e}")
+                    break
+                time.sleep(self._backoff_delay(attempt, e))
+
+        metrics = {
+            "chunk": index,
+            "size": len(chunk),
+            "attempts": attempt,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "ok": error is None,
+            "error": error,
+        }
+        return tickets, metrics
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Rate limiting, server errors and network failures are worth retrying."""
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+        return status in RETRYABLE_STATUS_CODES
+
+    @staticmethod
+    def _backoff_delay(attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when present."""
+        ceiling = min(Config.EXPO_PUSH_BACKOFF_MAX_S, Config.EXPO_PUSH_BACKOFF_BASE_S * 2 ** (attempt - 1))
+        delay = random.uniform(0, ceiling)
+
+        response = getattr(error, "response", None)
+        retry_after = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+        if retry_after and str(retry_after).isdigit():
+            delay = max(delay, min(float(retry_after), Config.EXPO_PUSH_BACKOFF_MAX_S))
+        return delay
+
+    def _validate_tickets(
+        self,
+        tickets: List[PushTicket],
+        user_ids: Dict[str, str],
+        result: DispatchResult
+    ) -> None:
+        """Validate responses, recording tickets to poll and dead tokens."""
+        for response in tickets:
+            token = response.push_message.to
+            try:
+                response.validate_response()
+                if response.id:
+                    result.tickets.append(PushTicketRecord(
+                        ticket_id=response.id,
+                        push_token=token,
+                        user_id=user_ids.get(token),
+                    ))
+            except DeviceNotRegisteredError:
+                print(f"Invalid token (device unregistered): {token}")
+                if token in user_ids:
+                    result.unregistered_user_ids.append(user_ids[token])
+            except PushServerError as e:
+                print(f"Push server error: {e.errors}")
+            except Exception as e:
+                print(f"Push ticket error for {token}: {e}")
+
+    def check_receipts(self, tickets: List[PushTicketRecord]) -> Tuple[List[str], List[str]]:
+        """
+        Fetch delivery receipts for previously sent tickets in bulk.
+
+        Args:
+            tickets: Tickets persisted by earlier dispatches
+
+        Returns:
+            Tuple of (ticket IDs that are resolved and can be forgotten,
+            user IDs whose device is no longer registered). Tickets whose
+            receipt is not ready yet are left out unless they have expired.
+        """
+        if not tickets:
+            return [], []
+
+        by_id = {ticket.ticket_id: ticket for ticket in tickets}
+        lookups = [
+            PushTicket(push_message=None, status=PushTicket.SUCCESS_STATUS,
+                       message="", details=None, id=ticket_id)
+            for ticket_id in by_id
+        ]
+
+        try:
+            receipts = self.client.check_receipts_multiple(lookups)
         except Exception as e:
-            print(f"Fatal error dispatching notifications: {e}")
+            print(f"Error fetching push receipts: {e}")
+            return [], []
+
+        resolved = []
+        unregistered = []
+        for receipt in receipts:
+            ticket = by_id.get(receipt.id)
+            if ticket is None:
+                continue
+            resolved.append(receipt.id)
+            try:
+                receipt.validate_response()
+            except DeviceNotRegisteredError:
+                if ticket.user_id:
+                    unregistered.append(ticket.user_id)
+            except Exception as e:
+                print(f"Push receipt error for {ticket.push_token}: {e}")
+
+        # Receipts are only kept for a day; stop asking for ones that never arrived
+        expiry = datetime.utcnow() - timedelta(seconds=Config.EXPO_RECEIPT_TTL_S)
+        seen = set(resolved)
+        for ticket in tickets:
+            if ticket.ticket_id not in seen and ticket.created_at.replace(tzinfo=None) < expiry:
+                resolved.append(ticket.ticket_id)
+
+        return resolved, unregistered
@@ -0,0 +1,156 @@
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+from src.models import JobPosting, UserProfile
+
+
+class TermAutomaton:
+    """Aho-Corasick automaton over normalized filter terms.
+
+    Scanning a normalized text once yields the ids of every term that occurs
+    in it as a substring, which is exactly what ``term in text`` checks term
+    by term in ``UserFilters.matches``.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for term in terms:
+            self._add(term)
+        self._build_links()
+
+    def _add(self, term: str) -> None:
+        node = 0
+        for char in term:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self.terms))
+        self.terms.append(term)
+
+    def _build_links(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def search(self, text: str) -> Set[int]:
+        """Return the ids of all terms occurring in ``text``."""
+        found: Set[int] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class FilterIndex:
+    """
+    Precompiled index over every user's filters, built once per cycle.
+
+    Company terms and role/keyword terms each go into a ``TermAutomaton``
+    whose terms map to the set of users that listed them, so every job is
+    scanned once and yields its matching users directly. Filters using
+    word/regex mode or exclusions are evaluated with ``matches`` instead.
+    Results are identical to calling ``UserFilters.matches`` for each
+    (user, job) pair.
+    """
+
+    def __init__(self, users: List[UserProfile]):
+        self.users = users
+
+        company_users: Dict[str, Set[int]] = {}
+        role_users: Dict[str, Set[int]] = {}
+        # Users without a company (or role) filter pass that check for any job
+        any_company: Set[int] = set()
+        any_role: Set[int] = set()
+        # Word/regex/exclusion filters are checked directly with matches()
+        self._direct: List[int] = []
+
+        for i, user in enumerate(users):
+            filters = user.filters
+            if not filters.is_plain:
+                self._direct.append(i)
+                continue
+
+            if filters.company_terms:
+                for term in filters.company_terms:
+                    company_users.setdefault(term, set()).add(i)
+            else:
+                any_company.add(i)
+
+            if filters.search_terms:
+                for term in filters.search_terms:
+                    role_users.setdefault(term, set()).add(i)
+            else:
+                any_role.add(i)
+
+        self._any_company = frozenset(any_company)
+        self._any_role = frozenset(any_role)
+        self._companies = TermAutomaton(company_users)
+        self._company_sets = [company_users[t] for t in self._companies.terms]
+        self._roles = TermAutomaton(role_users)
+        self._role_sets = [role_users[t] for t in self._roles.terms]
+
+        # Jobs in one cycle come from few companies, so cache per company name
+        self._company_cache: Dict[str, FrozenSet[int]] = {}
+
+    def _users_for_company(self, company: str) -> FrozenSet[int]:
+        cached = self._company_cache.get(company)
+        if cached is None:
+            matched = set(self._any_company)
+            for term_id in self._companies.search(company):
+                matched |= self._company_sets[term_id]
+            cached = frozenset(matched)
+            self._company_cache[company] = cached
+        return cached
+
+    def _users_for_role(self, role: str) -> Set[int]:
+        matched = set(self._any_role)
+        for term_id in self._roles.search(role):
+            matched |= self._role_sets[term_id]
+        return matched
+
+    def match(self, job: JobPosting) -> Set[int]:
+        """Return indices (into ``users``) of the users matching ``job``."""
+        company_ok = self._users_for_company(job.company_normalized)
+        matched = self._users_for_role(job.role_normalized).intersection(company_ok) if company_ok else set()
+
+        for i in self._direct:
+            if self.users[i].filters.matches(job):
+                matched.add(i)
+        return matched
+
+    def match_all(self, jobs: List[JobPosting]) -> Dict[int, List[JobPosting]]:
+        """
+        Group jobs by matching user.
+
+        Returns:
+            Mapping of user index to the jobs matching that user, in the
+            order the jobs were given
+        """
+        matches: Dict[int, List[JobPosting]] = {}
+        for job in jobs:
+            for i in self.match(job):
+                matches.setdefault(i, []).append(job)
+        return matches
@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from src.models import JobPosting, OutboxEntry, UserProfile, UserFilters
+from src.notifier.matcher import FilterIndex
+
+if TYPE_CHECKING:
+    # The Expo SDK loads only once there is something to send or check
+    from src.database.firestore_client import FirestoreClient
+    from src.notifier.expo_push import DispatchResult, NotificationService
+
+class NotificationOutbox:
+    """
+    Durable queue of notification deliveries stored in Firestore.
+
+    The scrape stage enqueues one entry per matching (user, job) pair before
+    the jobs are marked seen, and a dispatcher drains pending entries in
+    batches. Entries are keyed by a dedupe key, so a cycle that is retried
+    after a crash re-enqueues nothing it already queued, and an entry is only
+    marked sent after Expo accepted it (at-least-once delivery).
+    """
+
+    def __init__(
+        self,
+        db: "FirestoreClient",
+        notifier: Optional["NotificationService"] = None,
+        notifier_factory: Optional[Callable[[], "NotificationService"]] = None
+    ):
+        self.db = db
+        self._notifier = notifier
+        self.notifier_factory = notifier_factory
+
+    @property
+    def notifier(self) -> "NotificationService":
+        """The push service, created through ``notifier_factory`` on first use."""
+        if self._notifier is None:
+            self._notifier = self.notifier_factory()
+        return self._notifier
+
+    def enqueue(
+        self,
+        new_jobs: List[JobPosting],
+        users: List[UserProfile],
+        index: Optional[FilterIndex] = None
+    ) -> int:
+        """
+        Queue deliveries of new jobs to every user whose filters match.
+
+        Args:
+            new_jobs: Newly discovered jobs
+            users: Active users
+            index: Prebuilt FilterIndex over ``users``, to reuse across calls
+
+        Returns:
+            Number of deliveries newly added to the outbox
+        """
+        matches = (index or FilterIndex(users)).match_all(new_jobs)
+        entries = [
+            OutboxEntry.for_job(users[i], job)
+            for i, jobs in matches.items()
+            for job in jobs
+        ]
+        if not entries:
+            return 0
+
+        queued = self.db.enqueue_outbox(entries)
+        print(f"Queued {queued} notification deliveries ({len(entries) - queued} already queued)")
+        return queued
+
+    def drain(self, batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Send pending deliveries in batches until the outbox is empty.
+
+        Each batch groups deliveries per user into one notification. Entries
+        whose chunk failed stay pending but back off (OUTBOX_RETRY_BACKOFF_S,
+        doubled per attempt), so they are retried by a later drain rather
+        than refetched by this one; a batch where nothing got through stops
+        the drain early.
+
+        Returns:
+            Dict with delivery counts for this drain
+        """
+        batch_size = batch_size or Config.OUTBOX_BATCH_SIZE
+        stats = {"batches": 0, "delivered": 0, "failed": 0, "notifications": 0, "pruned_tokens": 0}
+
+        while max_batches is None or stats["batches"] < max_batches:
+            entries = self.db.get_pending_outbox(batch_size)
+            if not entries:
+                break
+
+            stats["batches"] += 1
+            sent, failed, result = self._send_batch(entries)
+            stats["delivered"] += len(sent)
+            stats["failed"] += len(failed)
+            stats["notifications"] += result.stats.get("messages", 0)
+            stats["pruned_tokens"] += len(set(result.unregistered_user_ids))
+
+            if not sent:
+                break
+
+        print(f"Outbox drained: {stats['delivered']} delivered, {stats['failed']} to retry")
+        return stats
+
+    def _send_batch(
+        self,
+        entries: List[OutboxEntry]
+    ) -> Tuple[List[OutboxEntry], List[OutboxEntry], "DispatchResult"]:
+        """Send one batch of deliveries and record the outcome for each entry."""
+        grouped: Dict[str, List[OutboxEntry]] = {}
+        for entry in entries:
+            grouped.setdefault(entry.recipient, []).append(entry)
+
+        messages = []
+        recipients = []
+        for group in grouped.values():
+            first = group[0]
+            jobs = [entry.to_job() for entry in group]
+            messages.append(self.notifier.build_message(first.push_token, jobs))
+            recipients.append(UserProfile(
+                push_token=first.push_token,
+                filters=UserFilters(),
+                user_id=first.user_id,
+            ))
+
+        result = self.notifier.publish(messages, recipients)
+
+        failed_tokens = set(result.failed_tokens)
+        sent = [entry for entry in entries if entry.push_token not in failed_tokens]
+        failed = [entry for entry in entries if entry.push_token in failed_tokens]
+
+        self.db.save_push_tickets(result.tickets)
+        if result.unregistered_user_ids:
+            self.db.deactivate_users(result.unregistered_user_ids)
+        self.db.mark_outbox_sent(sent)
+        self.db.mark_outbox_failed(failed)
+
+        return sent, failed, result
+
+    def prune_dead_tokens(self) -> int:
+        """
+        Poll receipts for tickets sent on earlier cycles and deactivate users
+        whose device is no longer registered, in one batched update.
+
+        Returns:
+            Number of users deactivated
+        """
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=Config.EXPO_RECEIPT_DELAY_S)
+            tickets = self.db.get_push_tickets(created_before=cutoff)
+            if not tickets:
+                return 0
+            resolved, unregistered = self.notifier.check_receipts(tickets)
+
+            if unregistered:
+                self.db.deactivate_users(unregistered)
+            self.db.delete_push_tickets(resolved)
+
+            pruned = len(set(unregistered))
+            print(f"Checked {len(tickets)} push receipts, pruned {pruned} dead tokens")
+            return pruned
+        except Exception as e:
+            print(f"Error processing push receipts: {e}")
+            return 0
@@ -0,0 +1,307 @@
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from config import Config
+from src import clients
+from src.metrics.recorder import CycleMetrics, recording
+from src.models import CompanyEntry, ScraperConfig
+from src.scheduling.health import classify_failure
+from src.scraper.errors import LearningError, SelectorError
+
+if TYPE_CHECKING:
+    from src.database.firestore_client import FirestoreClient
+    from src.llm.selector_learner import SelectorLearner
+    from src.scraper.playwright_scraper import CareerPageScraper
+
+ENGINES = ("chromium", "webkit", "firefox")
+
+class OnboardingTarget:
+    """One company to onboard and where it is in the pipeline."""
+
+    __slots__ = ("entry", "browser", "html", "config", "jobs", "stage", "failure", "error", "started")
+
+    def __init__(self, entry: CompanyEntry, browser: Optional[str] = None):
+        self.entry = entry
+        self.browser = browser  # Engine to load the page with, None for SCRAPER_BROWSER
+        self.html: Optional[str] = None  # Held only between the fetch and learn stages
+        self.config: Optional[ScraperConfig] = None
+        self.jobs = 0
+        self.stage = "fetch"  # Stage running or, once failed, the stage that failed
+        self.failure: Optional[str] = None  # Kind of error, see classify_failure
+        self.error: Optional[str] = None
+        self.started = time.perf_counter()
+
+def read_companies(path: str) -> List[OnboardingTarget]:
+    """
+    Companies listed in a CSV file.
+
+    Needs ``company`` and ``career_url`` columns; optional ``aliases``
+    (separated by ";") and ``browser`` columns are kept with them. A company
+    listed twice keeps its last row.
+    """
+    targets: Dict[str, OnboardingTarget] = {}
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        missing = {"company", "career_url"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(sorted(missing))}")
+        for line, row in enumerate(reader, start=2):
+            name = (row["company"] or "").strip()
+            career_url = (row["career_url"] or "").strip()
+            if not name or not career_url:
+                print(f"  Skipping line {line}: needs a company and a career_url")
+                continue
+            browser = (row.get("browser") or "").strip().lower() or None
+            if browser is not None and browser not in ENGINES:
+                raise ValueError(f"{path} line {line}: unknown browser {browser!r} (use {', '.join(ENGINES)})")
+            aliases = [alias.strip() for alias in (row.get("aliases") or "").split(";") if alias.strip()]
+            targets[name] = OnboardingTarget(CompanyEntry(name=name, aliases=aliases, career_url=career_url), browser)
+    return list(targets.values())
+
+class Onboarding:
+    """
+    Learns scraper configs for a list of companies in parallel.
+
+    Each company goes through three stages: its career page is fetched
+    (pruned to layout markup inside the browser), selectors are learned
+    from it, and the learned selectors are validated by scraping the page
+    with them. Browser stages run on ``browsers`` threads, each keeping one
+    warm browser, and learning runs on ``llm_calls`` threads, so a slow
+    stage never oversubscribes the other's resource. Validations go ahead
+    of new fetches, so configs are saved steadily rather than at the end.
+
+    A config is saved, with the company's registry entry, only once it
+    finds jobs. Companies that already have a learned config are skipped,
+    so an interrupted run resumes by running it again.
+    """
+
+    def __init__(
+        self,
+        db: "FirestoreClient",
+        scraper: "CareerPageScraper",
+        learner: "SelectorLearner",
+        browsers: Optional[int] = None,
+        llm_calls: Optional[int] = None,
+        relearn: bool = False,
+    ):
+        self.db = db
+        self.scraper = scraper
+        self.learner = learner
+        self.browsers = max(1, browsers or Config.ONBOARDING_BROWSERS)
+        self.llm_calls = max(1, llm_calls or Config.ONBOARDING_LLM_CONCURRENCY)
+        self.relearn = relearn  # Learn companies again even if they have a learned config
+        self.metrics = CycleMetrics()
+        self.failed: List[OnboardingTarget] = []
+
+    def run(self, targets: List[OnboardingTarget]) -> Dict[str, Any]:
+        """Onboard every target; returns the throughput and failure report."""
+        started = time.perf_counter()
+        registry = {entry.name: entry for entry in self.db.get_companies()}
+        fetches: Deque[OnboardingTarget] = deque()
+        for target in targets:
+            if not self.relearn and self._is_learned(target.entry.name):
+                self.metrics.record_company(target.entry.name, "skipped", 0.0)
+            else:
+                fetches.append(target)
+        print(f"Onboarding {len(fetches)} companies ({len(targets) - len(fetches)} already learned), "
+              f"{self.browsers} browsers, {self.llm_calls} concurrent LLM calls")
+
+        self.scraper.keep_browser = True
+        browser_pool = ThreadPoolExecutor(max_workers=self.browsers, thread_name_prefix="onboard-browser")
+        llm_pool = ThreadPoolExecutor(max_workers=self.llm_calls, thread_name_prefix="onboard-llm")
+        validations: Deque[OnboardingTarget] = deque()
+        learning: Deque[OnboardingTarget] = deque()
+        running: Dict[Future, Tuple[str, OnboardingTarget]] = {}
+
+        def submit(pool: ThreadPoolExecutor, kind: str, target: OnboardingTarget, stage: str, work: Callable) -> None:
+            target.stage = stage
+            running[pool.submit(self._timed, stage, work)] = (kind, target)
+
+        def in_flight(kind: str) -> int:
+            return sum(1 for running_kind, _ in running.values() if running_kind == kind)
+
+        try:
+            with recording(self.metrics):
+                while fetches or validations or learning or running:
+                    while in_flight("browser") < self.browsers and (validations or fetches):
+                        # Fetched pages wait in memory for the learner, so stop
+                        # fetching while it has a backlog
+                        if not validations and len(learning) >= 2 * self.llm_calls:
+                            break
+                        if validations:
+                            target = validations.popleft()
+                            submit(browser_pool, "browser", target, "validate", self._validation(target))
+                        else:
+                            target = fetches.popleft()
+                            submit(browser_pool, "browser", target, "fetch", self._fetch(target))
+                    while in_flight("llm") < self.llm_calls and learning:
+                        target = learning.popleft()
+                        submit(llm_pool, "llm", target, "learn", self._learning(target))
+
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _, target = running.pop(future)
+                        try:
+                            value = future.result()
+                        except Exception as e:
+                            self._fail(target, e)
+                            continue
+                        if target.stage == "fetch":
+                            target.html = value
+                            learning.append(target)
+                        elif target.stage == "learn":
+                            target.html = None
+                            target.config = value
+                            validations.append(target)
+                        else:
+                            self._save(target, value, registry)
+        finally:
+            self._close_browsers(browser_pool)
+            browser_pool.shutdown(wait=False, cancel_futures=True)
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+
+        return self.report(time.perf_counter() - started)
+
+    def _is_learned(self, company: str) -> bool:
+        try:
+            config = self.db.get_scraper_config(company)
+        except Exception as e:
+            print(f"  Failed to read config for {company}, learning it: {e}")
+            return False
+        return config is not None and config.is_learned
+
+    def _timed(self, stage: str, work: Callable[[], Any]) -> Any:
+        with self.metrics.stage(stage):
+            return work()
+
+    def _fetch(self, target: OnboardingTarget) -> Callable[[], str]:
+        return lambda: self.scraper.fetch_html_for_learning(target.entry.career_url, browser=target.browser)
+
+    def _learning(self, target: OnboardingTarget) -> Callable[[], ScraperConfig]:
+        html = target.html
+
+        def learn() -> ScraperConfig:
+            try:
+                config = self.learner.learn_selectors(target.entry.name, target.entry.career_url, html)
+            except Exception as e:
+                raise LearningError(str(e)) from e
+            return config.model_copy(update={"browser": target.browser})
+
+        return learn
+
+    def _validation(self, target: OnboardingTarget) -> Callable[[], int]:
+        def validate() -> int:
+            jobs = self.scraper.scrape_company(target.config)
+            if not jobs:
+                raise SelectorError(f"Learned selectors for {target.entry.name} extract no jobs")
+            return len(jobs)
+
+        return validate
+
+    def _save(self, target: OnboardingTarget, jobs: int, registry: Dict[str, CompanyEntry]) -> None:
+        """Save a validated config and register the company's career URL and aliases."""
+        target.stage = "save"
+        entry = target.entry
+        known = registry.get(entry.name)
+        if known is not None:
+            entry = entry.model_copy(update={"aliases": list(dict.fromkeys([*known.aliases, *entry.aliases]))})
+        try:
+            self.db.save_scraper_config(target.config)
+            self.db.save_company(entry)
+        except Exception as e:
+            self._fail(target, e)
+            return
+        target.jobs = jobs
+        self.metrics.record_company(
+            entry.name, "learned", (time.perf_counter() - target.started) * 1000, jobs_found=jobs,
+        )
+        print(f"  Learned {entry.name}: {jobs} jobs")
+
+    def _fail(self, target: OnboardingTarget, error: Exception) -> None:
+        target.html = None
+        target.failure = classify_failure(error)
+        target.error = str(error)
+        self.failed.append(target)
+        self.metrics.record_company(target.entry.name, "failed", (time.perf_counter() - target.started) * 1000)
+        print(f"  Failed to onboard {target.entry.name} at {target.stage} ({target.failure}): {error}")
+
+    def _close_browsers(self, pool: ThreadPoolExecutor) -> None:
+        """Close the warm browser of every pool thread, on that thread."""
+        barrier = threading.Barrier(self.browsers)
+
+        def close() -> None:
+            try:
+                barrier.wait(timeout=Config.WORKER_SHUTDOWN_TIMEOUT_S)
+            except threading.BrokenBarrierError:
+                pass
+            self.scraper.close_thread_browser()
+
+        for future in [pool.submit(close) for _ in range(self.browsers)]:
+            try:
+                future.result(timeout=Config.WORKER_SHUTDOWN_TIMEOUT_S)
+            except Exception as e:
+                print(f"Failed to close browser: {e}")
+
+    def report(self, elapsed_s: float) -> Dict[str, Any]:
+        """Counts, throughput, stage timings and every failure with its stage and kind."""
+        summary = self.metrics.summary()
+        outcomes = summary["companies"]["outcomes"]
+        failures: Dict[str, int] = {}
+        for target in self.failed:
+            key = f"{target.stage}:{target.failure}"
+            failures[key] = failures.get(key, 0) + 1
+        learned = outcomes.get("learned", 0)
+        return {
+            "learned": learned,
+            "skipped": outcomes.get("skipped", 0),
+            "failed": outcomes.get("failed", 0),
+            "elapsed_s": round(elapsed_s, 1),
+            "learned_per_minute": round(learned / elapsed_s * 60, 1) if elapsed_s > 0 else 0.0,
+            "stages": summary["stages"],
+            "failures": failures,
+            "failed_companies": [
+                {"company": t.entry.name, "stage": t.stage, "failure": t.failure, "error": t.error}
+                for t in self.failed
+            ],
+        }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Learn scraper configs for the companies in a CSV file.")
+    parser.add_argument("csv", help="CSV with company and career_url columns (optional: aliases, browser)")
+    parser.add_argument("--browsers", type=int, default=Config.ONBOARDING_BROWSERS,
+                        help="Pages loaded at once")
+    parser.add_argument("--llm-calls", type=int, default=Config.ONBOARDING_LLM_CONCURRENCY,
+                        help="Selector-learning calls at once")
+    parser.add_argument("--relearn", action="store_true", help="Also learn companies that have a learned config")
+    parser.add_argument("--report", help="Also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    Config.validate()
+    targets = read_companies(args.csv)
+    onboarding = Onboarding(
+        clients.get_db(), clients.get_scraper(), clients.get_learner(),
+        browsers=args.browsers, llm_calls=args.llm_calls, relearn=args.relearn,
+    )
+    report = onboarding.run(targets)
+
+    print(f"\nLearned {report['learned']}, skipped {report['skipped']}, failed {report['failed']} "
+          f"in {report['elapsed_s']}s ({report['learned_per_minute']} companies/min)")
+    for stage, timing in report["stages"].items():
+        print(f"  {stage:>10}: {timing['count']:4d} x  p50 {timing['p50_ms']:8.1f}ms  p95 {timing['p95_ms']:8.1f}ms")
+    for kind, failed in sorted(report["failures"].items(), key=lambda item: -item[1]):
+        print(f"  {failed:4d} failed at {kind}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failed"] else 0
+
+# Bulk onboarding entry point: python -m src.onboarding companies.csv
+if __name__ == "__main__":
+    sys.exit(main())
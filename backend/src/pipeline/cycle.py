@@ -0,0 +1,596 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from config import Config
+from src.diff.near_duplicates import drop_near_duplicates
+from src.diff.snapshots import JobSnapshot
+from src.metrics.memory import watching_memory
+from src.metrics.recorder import CycleMetrics, recording
+from src.models import JobRecord, ScanCursor, ScraperConfig, UserProfile
+from src.notifier.matcher import FilterIndex
+from src.notifier.outbox import NotificationOutbox
+from src.registry.companies import CompanyRegistry
+from src.scheduling.budget import TimeBudget
+from src.scheduling.frequency import observe_scan
+from src.scheduling.health import classify_failure, needs_relearning, observe_health, observe_listing, relearn_pending
+from src.scheduling.timeouts import observe_load, page_timeout_ms
+from src.scraper.errors import LearningError, PageTooLargeError
+
+if TYPE_CHECKING:
+    # Imported for annotations only; the SDKs behind them load on first use
+    from src.database.firestore_client import FirestoreClient
+    from src.llm.selector_learner import SelectorLearner
+    from src.scraper.playwright_scraper import CareerPageScraper
+
+_DONE = object()  # End-of-stream marker for the notify stage
+
+class CompanyResult:
+    """Output of the scrape stage for one company."""
+
+    __slots__ = (
+        "company", "config", "jobs", "complete", "error", "failure", "elapsed_ms", "load_ms", "peak_memory_mb",
+        "new_jobs",
+    )
+
+    def __init__(
+        self,
+        company: str,
+        config: Optional[ScraperConfig] = None,
+        jobs: Optional[List[JobRecord]] = None,
+        error: Optional[str] = None,
+        failure: Optional[str] = None,
+        elapsed_ms: float = 0.0,
+        load_ms: Optional[float] = None,
+        peak_memory_mb: Optional[float] = None,
+        complete: bool = True,
+    ):
+        self.company = company
+        self.config = config
+        self.jobs = jobs or []
+        self.complete = complete  # False if the scraper stopped before the end of the page
+        self.error = error
+        self.failure = failure  # Kind of error, see classify_failure
+        self.elapsed_ms = elapsed_ms
+        self.load_ms = load_ms  # Page-load time (the timeout if the load timed out)
+        self.peak_memory_mb = peak_memory_mb  # Highest memory sampled while scraping
+        self.new_jobs: Optional[int] = None  # Set by the persist stage
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Plain-data form, for results sent back by fan-out workers.
+
+        Jobs are [id, role, location, link] rows; their company and source
+        URL come from the config, which keeps Lambda responses (6 MB max)
+        small.
+        """
+        return {
+            "company": self.company,
+            "config": self.config.model_dump(mode="json") if self.config else None,
+            "jobs": [[job.id, job.role, job.location, job.link] for job in self.jobs],
+            "complete": self.complete,
+            "error": self.error,
+            "failure": self.failure,
+            "elapsed_ms": self.elapsed_ms,
+            "load_ms": self.load_ms,
+            "peak_memory_mb": self.peak_memory_mb,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompanyResult":
+        config = ScraperConfig(**data["config"]) if data.get("config") else None
+        jobs = [
+            JobRecord(company=config.company, role=role, location=location, link=link,
+                      source_url=config.career_url, id=job_id)
+            for job_id, role, location, link in data.get("jobs", [])
+        ] if config else []
+        return cls(
+            company=data["company"],
+            config=config,
+            jobs=jobs,
+            error=data.get("error"),
+            failure=data.get("failure"),
+            elapsed_ms=data.get("elapsed_ms", 0.0),
+            load_ms=data.get("load_ms"),
+            peak_memory_mb=data.get("peak_memory_mb"),
+            complete=data.get("complete", True),
+        )
+
+class ScanCycle:
+    """
+    One scan over a set of companies, run as a streaming pipeline.
+
+    Stages, connected by bounded queues:
+    1. Scrape: up to SCRAPER_CONCURRENCY companies load in worker threads
+    2. Diff and persist (caller's thread): as each company finishes, its
+       jobs are diffed against the seen set, queued in the outbox and
+       checkpointed to seen jobs
+    3. Notify (background thread): drains the outbox whenever a company
+       produced new deliveries
+
+    A slow company therefore no longer delays alerts for the others: the
+    first notification goes out as soon as the fastest company is diffed.
+    """
+
+    def __init__(
+        self,
+        db: "FirestoreClient",
+        scraper: "CareerPageScraper",
+        learner: Optional["SelectorLearner"],
+        outbox: NotificationOutbox,
+        learner_factory: Optional[Callable[[], "SelectorLearner"]] = None,
+        metrics: Optional[CycleMetrics] = None,
+        registry: Optional[CompanyRegistry] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        self.db = db
+        self.scraper = scraper
+        self.learner = learner
+        self.learner_factory = learner_factory  # Used when learning is first needed
+        self.outbox = outbox
+        self.metrics = metrics or CycleMetrics()
+        self.registry = registry  # Career URLs for companies without a config yet
+        self.concurrency = max(1, Config.SCRAPER_CONCURRENCY)
+        # A long-lived pool keeps scrape threads (and their warm browsers)
+        # across runs; without one each run starts and stops its own
+        self.executor = executor
+        self._index: Optional[FilterIndex] = None
+
+    def run(
+        self,
+        companies: Iterable[str],
+        users: List[UserProfile],
+        seen_job_ids: Set[str],
+        budget: Optional[TimeBudget] = None,
+        cursor: Optional[ScanCursor] = None,
+    ) -> Dict[str, Any]:
+        """
+        Scrape, diff, persist and notify for the given companies.
+
+        With a budget, no company is started once its expected scrape time
+        (from the cursor) no longer fits; it and the rest are deferred.
+
+        Args:
+            companies: Company names to scrape, in the order to start them
+            users: Active users to match new jobs against
+            seen_job_ids: Previously seen job IDs; updated in place
+            budget: Time left in this invocation
+            cursor: Scan cursor; every finished company is recorded in it, its
+                next scan scheduled and its circuit breaker updated
+
+        Returns:
+            Dict with cycle metrics
+        """
+        deferred: List[str] = []
+        results = self.scrape(companies, budget=budget, cursor=cursor, deferred=deferred)
+        return self.consume(results, users, seen_job_ids, cursor=cursor, deferred=deferred)
+
+    def scrape(
+        self,
+        companies: Iterable[str],
+        budget: Optional[TimeBudget] = None,
+        cursor: Optional[ScanCursor] = None,
+        deferred: Optional[List[str]] = None,
+    ) -> Iterator[CompanyResult]:
+        """
+        Scrape stage alone: yield each company's result as soon as it finishes.
+
+        Companies the budget no longer fits are appended to ``deferred``.
+        Used by ``run`` and, on its own, by fan-out workers whose results are
+        consumed in another process.
+        """
+        pending = iter(companies)
+        deferred = [] if deferred is None else deferred
+        scraped: "queue.Queue[CompanyResult]" = queue.Queue(maxsize=self.concurrency)
+        in_flight = 0
+
+        executor = (
+            nullcontext(self.executor) if self.executor is not None
+            else ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="scrape")
+        )
+        with recording(self.metrics), executor as pool:
+            def start_next() -> bool:
+                company = None if deferred else next(pending, None)
+                if company is None:
+                    return False
+                if budget is not None and budget.limited and cursor is not None:
+                    expected_ms = cursor.expected_cost_ms(company, Config.SCRAPER_TIMEOUT_MS)
+                    if not budget.can_start(expected_ms):
+                        deferred.append(company)
+                        deferred.extend(pending)
+                        print(f"Time budget reached, deferring {len(deferred)} companies to the next run")
+                        return False
+                timeout_ms = page_timeout_ms(cursor, company) if cursor is not None else None
+                pool.submit(lambda: scraped.put(self._scrape_stage(company, timeout_ms)))
+                return True
+
+            for _ in range(self.concurrency):
+                if start_next():
+                    in_flight += 1
+
+            while in_flight:
+                result = scraped.get()
+                in_flight -= 1
+                if start_next():
+                    in_flight += 1
+                yield result
+
+    def consume(
+        self,
+        results: Iterable[CompanyResult],
+        users: List[UserProfile],
+        seen_job_ids: Set[str],
+        cursor: Optional[ScanCursor] = None,
+        deferred: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Diff, persist and notify stages over scrape results from any source.
+
+        ``results`` may be the local scrape stage or results gathered from
+        fan-out workers; either way each company is diffed and queued as it
+        arrives while the notify thread delivers.
+        """
+        start = time.perf_counter()
+        self._index = None
+
+        stats: Dict[str, Any] = {
+            "new_jobs": 0,
+            "companies_scraped": 0,
+            "companies_failed": 0,
+            "notifications_queued": 0,
+        }
+
+        notify_queue: "queue.Queue[Any]" = queue.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+        notify_stats: Dict[str, Any] = {}
+        notifier_thread = None
+        if Config.OUTBOX_DRAIN_INLINE:
+            notifier_thread = threading.Thread(
+                target=self._notify_stage,
+                args=(notify_queue, notify_stats, start),
+                name="notify-stage",
+                daemon=True,
+            )
+            notifier_thread.start()
+
+        try:
+            for result in results:
+                try:
+                    queued = self._persist_stage(result, users, seen_job_ids, stats)
+                except Exception as e:
+                    # The company's new jobs are re-detected on its next scan;
+                    # the outbox dedupes anything already queued
+                    print(f"  Failed to persist {result.company}: {e}")
+                    stats["companies_scraped"] -= 1
+                    stats["companies_failed"] += 1
+                    self.metrics.incr("persist_failed")
+                    result.new_jobs = 0
+                    queued = 0
+                self._record_company(result)
+                if cursor is not None:
+                    relearn = result.error is None and observe_listing(cursor, result.company, len(result.jobs))
+                    empty = result.error is None and not result.jobs
+                    if empty and (relearn or relearn_pending(cursor, result.company)):
+                        # Possibly broken selectors: check back soon rather than
+                        # letting the empty scans decay the company's interval
+                        observe_scan(cursor, result.company, result.elapsed_ms, None)
+                    else:
+                        observe_scan(cursor, result.company, result.elapsed_ms, result.new_jobs, hold_rate=empty)
+                    if result.load_ms is not None:
+                        observe_load(cursor, result.company, result.load_ms)
+                    if result.config is not None:
+                        engine = result.config.browser or Config.SCRAPER_BROWSER
+                        if engine == Config.SCRAPER_BROWSER:
+                            cursor.browsers.pop(result.company, None)
+                        else:
+                            cursor.browsers[result.company] = engine
+                    if result.error != "no config":
+                        observe_health(cursor, result.company, result.failure, result.error)
+                    if relearn:
+                        print(f"  {result.company} listed no jobs {cursor.empty_scans[result.company]} scans in a row")
+                        self._mark_relearning(result.company)
+                if queued and notifier_thread is not None:
+                    notify_queue.put(result.company)
+        finally:
+            # Let the notify stage finish deliveries already queued
+            if notifier_thread is not None:
+                notify_queue.put(_DONE)
+                notifier_thread.join()
+
+        stats["deferred"] = deferred if deferred is not None else []
+        stats["notifications"] = notify_stats
+        stats["cycle_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return stats
+
+    def _scrape_stage(self, company: str, timeout_ms: Optional[int] = None) -> CompanyResult:
+        """
+        Scrape one company, recording the peak memory seen meanwhile.
+
+        Never raises: the scrape stage waits for one result per company, so
+        a failure outside ``_scan_company`` (e.g. in the memory watcher) still
+        becomes an error result.
+        """
+        try:
+            with watching_memory() as memory:
+                result = self._scan_company(company, timeout_ms)
+            result.peak_memory_mb = round(memory.peak_mb, 1)
+            return result
+        except Exception as e:
+            failure = classify_failure(e)
+            print(f"  Error scraping {company} ({failure}): {e}")
+            return CompanyResult(company=company, error=str(e), failure=failure)
+
+    def _scan_company(self, company: str, timeout_ms: Optional[int] = None) -> CompanyResult:
+        """Resolve (or learn) a company's config and scrape its jobs within ``timeout_ms`` (None: default)."""
+        started = time.perf_counter()
+        print(f"Processing {company}...")
+        config = None
+        try:
+            config = self._resolve_config(company)
+            if config is None:
+                return CompanyResult(
+                    company=company,
+                    error="no config",
+                    elapsed_ms=(time.perf_counter() - started) * 1000,
+                )
+
+            if timeout_ms is not None:
+                config = config.model_copy(update={"timeout_ms": timeout_ms})
+            jobs = self.scraper.scrape_company(config)
+            print(f"  Found {len(jobs)} jobs on {company} page")
+            return CompanyResult(
+                company=company,
+                config=config,
+                jobs=jobs,
+                complete=getattr(jobs, "complete", True),
+                load_ms=getattr(jobs, "load_ms", None),
+                elapsed_ms=(time.perf_counter() - started) * 1000,
+            )
+
+        except Exception as e:
+            failure = classify_failure(e)
+            print(f"  Error scraping {company} ({failure}): {e}")
+
+            # Only broken selectors are fixed by re-learning; a site that is
+            # down or blocking us is left to the circuit breaker
+            if config and needs_relearning(failure):
+                self._mark_relearning(company)
+            return CompanyResult(
+                company=company,
+                config=config,
+                error=str(e),
+                failure=failure,
+                elapsed_ms=(time.perf_counter() - started) * 1000,
+                # A timed-out load took at least the timeout, so the next one gets longer
+                load_ms=(config.timeout_ms or Config.SCRAPER_TIMEOUT_MS) if config and failure == "timeout" else None,
+            )
+
+    def _mark_relearning(self, company: str) -> None:
+        """Flag a company's config so its next scan learns new selectors."""
+        try:
+            self.db.mark_config_needs_relearning(company)
+        except Exception as e:
+            print(f"  Failed to mark {company} for re-learning: {e}")
+
+    def _resolve_config(self, company: str) -> Optional[ScraperConfig]:
+        """
+        Return learned selectors for a company, learning them if needed.
+
+        The career URL comes from an existing config or, for a company
+        never scraped, from the registry; without one we do not know where
+        to scrape.
+
+        Raises:
+            LearningError: If selectors had to be learned and could not be
+        """
+        with self.metrics.stage("config_fetch"):
+            config = self.db.get_scraper_config(company)
+        if config and config.is_learned:
+            return config
+
+        print(f"  No learned config for {company}, learning now...")
+        career_url = config.career_url if config else None
+        if not career_url and self.registry is not None:
+            career_url = self.registry.career_url(company)
+        if not career_url:
+            print(f"  Skipping {company} - no config/URL found")
+            return None
+
+        try:
+            with self.metrics.stage("learning"):
+                html = self.scraper.fetch_html_for_learning(career_url, browser=config.browser if config else None)
+                learner = self.learner or self.learner_factory()
+                new_config = learner.learn_selectors(company, career_url, html)
+                if config is not None:
+                    # How the page loads is set per company, not learned
+                    new_config = new_config.model_copy(update={"wait_for": config.wait_for, "browser": config.browser})
+                self.db.save_scraper_config(new_config)
+            return new_config
+        except PageTooLargeError:
+            raise  # The page, not the learner, is the problem
+        except Exception as learn_error:
+            print(f"  Failed to learn selectors for {company}: {learn_error}")
+            raise LearningError(str(learn_error)) from learn_error
+
+    def _persist_stage(
+        self,
+        result: CompanyResult,
+        users: List[UserProfile],
+        seen_job_ids: Set[str],
+        stats: Dict[str, Any],
+    ) -> int:
+        """
+        Diff one company's jobs, queue notifications and checkpoint seen jobs.
+
+        Deliveries are queued before the jobs are marked seen, so a crash in
+        between re-detects the jobs and re-enqueues nothing already queued.
+
+        Returns:
+            Number of deliveries queued for this company
+        """
+        if result.error is not None:
+            stats["companies_failed"] += 1
+            return 0
+        stats["companies_scraped"] += 1
+        result.new_jobs = 0
+        self._track_closures(result, seen_job_ids)
+
+        with self.metrics.stage("diff"):
+            # Filter for new jobs; only these become full JobPosting models
+            new_records = [job for job in result.jobs if job.id not in seen_job_ids]
+            duplicate_ids: List[str] = []
+            if new_records and Config.NEAR_DUPLICATE_ENABLED:
+                kept = self._drop_near_duplicates(result, new_records, seen_job_ids)
+                kept_ids = {job.id for job in kept}
+                duplicate_ids = [job.id for job in new_records if job.id not in kept_ids]
+                new_records = kept
+
+            new_jobs = []
+            for job in new_records:
+                if job.id not in seen_job_ids:
+                    new_jobs.append(job.to_posting())
+                    seen_job_ids.add(job.id)
+            # Marked seen too, so they are not diffed (and fingerprinted) again
+            seen_job_ids.update(duplicate_ids)
+
+        result.new_jobs = len(new_jobs)
+        if not new_jobs and not duplicate_ids:
+            return 0
+
+        queued = 0
+        with self.metrics.stage("persist"):
+            try:
+                if new_jobs:
+                    print(f"  Detected {len(new_jobs)} new jobs at {result.company}")
+                    # Built once, on the first company with new jobs
+                    if self._index is None:
+                        self._index = FilterIndex(users)
+                    queued = self.outbox.enqueue(new_jobs, users, index=self._index)
+                self.db.add_seen_jobs([job.id for job in new_jobs] + duplicate_ids)
+            except Exception:
+                # Not checkpointed, so a warm worker must detect them again too
+                seen_job_ids.difference_update(job.id for job in new_jobs)
+                seen_job_ids.difference_update(duplicate_ids)
+                raise
+
+        stats["new_jobs"] += len(new_jobs)
+        stats["notifications_queued"] += queued
+        self.metrics.incr("notifications_queued", queued)
+        return queued
+
+    def _record_company(self, result: CompanyResult) -> None:
+        """Per-company latency, outcome and job counts."""
+        if result.error is None:
+            outcome = "ok"
+        elif result.error == "no config":
+            outcome = "no_config"
+        else:
+            outcome = "error"
+        self.metrics.record_company(
+            result.company,
+            outcome,
+            result.elapsed_ms,
+            jobs_found=len(result.jobs),
+            new_jobs=result.new_jobs or 0,
+            peak_memory_mb=result.peak_memory_mb,
+        )
+        if result.failure is not None:
+            self.metrics.incr(f"failed_{result.failure}")
+        self.metrics.incr("jobs_found", len(result.jobs))
+        self.metrics.incr("new_jobs", result.new_jobs or 0)
+
+    def _drop_near_duplicates(
+        self,
+        result: CompanyResult,
+        new_jobs: List[JobRecord],
+        seen_job_ids: Set[str]
+    ) -> List[JobRecord]:
+        """
+        Drop jobs that are only trivially edited versions of known postings.
+
+        Failures here fall back to exact-ID diffing rather than losing new jobs.
+        """
+        company = result.config.company
+        try:
+            index = self.db.get_job_fingerprints(company)
+            known = [job for job in result.jobs if job.id in seen_job_ids]
+            kept = drop_near_duplicates(index, new_jobs, known)
+            self.db.save_job_fingerprints(company, index)
+            return kept
+        except Exception as e:
+            print(f"  Near-duplicate check failed for {company}: {e}")
+            return new_jobs
+
+    def _track_closures(self, result: CompanyResult, seen_job_ids: Set[str]) -> None:
+        """
+        Diff the page against the company's last snapshot to find closed postings.
+
+        Jobs gone since the last scan are marked closed (they later expire
+        from the seen set) and seen jobs back on the page are reopened. An
+        incomplete page only adds to the snapshot, since jobs missing from
+        it may still be open. Failures leave the snapshot as it was.
+        """
+        company = result.config.company
+        try:
+            with self.metrics.stage("snapshot"):
+                current = JobSnapshot.from_ids(job.id for job in result.jobs)
+                previous = self.db.get_job_snapshot(company)
+                if previous is None:
+                    self.db.save_job_snapshot(company, current)
+                    return
+
+                added, removed = previous.diff(current)
+                if not result.complete:
+                    removed = []
+                    current = JobSnapshot(previous.digests + current.digests)
+                if not added and not removed:
+                    return
+
+                # Seen jobs back on the page (new ones are left to the diff stage)
+                reopened = [job_id for job_id in added if job_id in seen_job_ids]
+                if removed:
+                    self.db.update_job_status(removed, "closed")
+                if reopened:
+                    self.db.update_job_status(reopened, "open")
+                self.db.save_job_snapshot(company, current)
+        except Exception as e:
+            print(f"  Closed-posting check failed for {company}: {e}")
+            return
+
+        if removed:
+            print(f"  {len(removed)} postings closed at {company}")
+        self.metrics.incr("jobs_closed", len(removed))
+        self.metrics.incr("jobs_reopened", len(reopened))
+
+    def _notify_stage(self, notify_queue: "queue.Queue[Any]", stats: Dict[str, Any], start: float) -> None:
+        """Drain the outbox each time companies report new deliveries."""
+        done = False
+        while not done:
+            item = notify_queue.get()
+            if item is _DONE:
+                break
+
+            # Coalesce companies that finished while the last drain ran
+            while True:
+                try:
+                    item = notify_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+
+            try:
+                with self.metrics.stage("dispatch"):
+                    drained = self.outbox.drain()
+            except Exception as e:
+                print(f"Error draining outbox: {e}")
+                continue
+
+            self.metrics.incr("notifications", drained.get("notifications", 0))
+            if drained.get("notifications") and "first_notification_ms" not in stats:
+                stats["first_notification_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            for key, value in drained.items():
+                stats[key] = stats.get(key, 0) + value
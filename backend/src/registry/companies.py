@@ -0,0 +1,143 @@
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from src.models import CompanyEntry, UserFilters, UserProfile
+
+if TYPE_CHECKING:
+    from src.database.firestore_client import FirestoreClient
+
+# Legal-form suffixes dropped when comparing names ("Stripe, Inc." == "stripe")
+_SUFFIXES = {"inc", "llc", "ltd", "corp", "corporation", "co", "company", "gmbh", "plc", "sa", "ag"}
+_PUNCTUATION = re.compile(r"[^\w\s&+]")
+
+def normalize_company(name: str) -> str:
+    """Comparison key for a company name: lowercase, no punctuation or legal suffix."""
+    words = _PUNCTUATION.sub(" ", name.lower()).split()
+    while len(words) > 1 and words[-1] in _SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+class CompanyRegistry:
+    """
+    Canonical companies and the aliases that resolve to them.
+
+    Every name and alias is indexed by its ``normalize_company`` key, so a
+    lookup is one normalization (memoized per spelling) and one dict hit.
+    Names not in the registry still collapse by their key: "google " and
+    "Google" are one company even before anyone registers it.
+    """
+
+    def __init__(self, entries: Iterable[CompanyEntry] = ()):
+        self.entries: Dict[str, CompanyEntry] = {}
+        self._index: Dict[str, CompanyEntry] = {}
+        self._keys: Dict[str, str] = {}  # Spelling -> normalized key
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: CompanyEntry) -> None:
+        self.entries[entry.name] = entry
+        for name in [entry.name, *entry.aliases]:
+            key = self.key(name)
+            if key:
+                self._index[key] = entry
+
+    def key(self, name: str) -> str:
+        key = self._keys.get(name)
+        if key is None:
+            key = normalize_company(name)
+            self._keys[name] = key
+        return key
+
+    def lookup(self, name: str) -> Optional[CompanyEntry]:
+        """Registry entry for a name or alias, or None if unregistered."""
+        return self._index.get(self.key(name))
+
+    def career_url(self, company: str) -> Optional[str]:
+        entry = self.lookup(company)
+        return entry.career_url if entry else None
+
+    def canonicalize(self, users: List[UserProfile]) -> Tuple[List[UserProfile], Dict[str, Any]]:
+        """
+        Rewrite users' company filters to canonical names.
+
+        Registered names resolve to their entry; unregistered spellings that
+        share a key resolve to the spelling most users typed. Spellings with
+        no key (only punctuation or spaces) are kept as typed, so the filter
+        never empties into "any company". Users whose filters change get
+        rebuilt filters; the rest are returned as is.
+
+        Returns:
+            (users, report) where the report counts the distinct spellings,
+            the companies they resolve to, and the duplicate scrapes removed
+        """
+        counts: Dict[str, int] = {}
+        for user in users:
+            for name in user.filters.companies:
+                counts[name] = counts.get(name, 0) + 1
+
+        groups: Dict[str, List[str]] = {}
+        for name in counts:
+            key = self.key(name)
+            if key:
+                groups.setdefault(key, []).append(name)
+
+        canonical: Dict[str, str] = {}
+        merged: Dict[str, List[str]] = {}
+        for key, spellings in groups.items():
+            entry = self._index.get(key)
+            if entry is not None:
+                name = entry.name
+            else:
+                name = min(spellings, key=lambda s: (-counts[s], s)).strip()
+            for spelling in spellings:
+                canonical[spelling] = name
+            merged.setdefault(name, []).extend(spellings)
+
+        resolved = []
+        for user in users:
+            companies = list(dict.fromkeys(canonical.get(n, n) for n in user.filters.companies))
+            if companies == user.filters.companies:
+                resolved.append(user)
+                continue
+            filters = UserFilters(**{**user.filters.model_dump(), "companies": companies})
+            resolved.append(user.model_copy(update={"filters": filters}))
+
+        spellings = sum(1 for name in counts if name in canonical)
+        report = {
+            "company_spellings": spellings,
+            "companies": len(merged),
+            "duplicate_scrapes_removed": spellings - len(merged),
+            "merged": {name: sorted(names) for name, names in sorted(merged.items()) if len(names) > 1},
+        }
+        return resolved, report
+
+_cached: Optional[CompanyRegistry] = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+def load_registry(db: "FirestoreClient") -> CompanyRegistry:
+    """
+    The company registry, cached across warm invocations for REGISTRY_CACHE_TTL_S.
+
+    If it cannot be read, names are still collapsed by normalization.
+    """
+    global _cached, _loaded_at
+    with _lock:
+        if _cached is not None and time.monotonic() - _loaded_at < Config.REGISTRY_CACHE_TTL_S:
+            return _cached
+        try:
+            _cached = CompanyRegistry(db.get_companies())
+            _loaded_at = time.monotonic()
+        except Exception as e:
+            print(f"Failed to load company registry, matching names only: {e}")
+            return _cached or CompanyRegistry()
+        return _cached
+
+def reset() -> None:
+    """Forget the cached registry (for tests)."""
+    global _cached
+    with _lock:
+        _cached = None
@@ -0,0 +1,104 @@
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import Config
+from src.models import ScanCursor
+from src.scheduling.frequency import is_due, urgency
+
+class TimeBudget:
+    """
+    Wall-clock budget of one invocation, read from the Lambda context.
+
+    Keeps ``reserve_ms`` back for the work that must still happen after the
+    last company starts (draining the outbox, saving the cursor). Without a
+    context (local runs) the budget is unlimited.
+    """
+
+    def __init__(self, context: Any = None, reserve_ms: Optional[int] = None):
+        self.context = context if hasattr(context, "get_remaining_time_in_millis") else None
+        self.reserve_ms = Config.SCHEDULER_RESERVE_MS if reserve_ms is None else reserve_ms
+
+    @property
+    def limited(self) -> bool:
+        return self.context is not None
+
+    def remaining_ms(self) -> float:
+        """Milliseconds left before the invocation is killed."""
+        if self.context is None:
+            return float("inf")
+        return float(self.context.get_remaining_time_in_millis())
+
+    def can_start(self, expected_ms: float) -> bool:
+        """Whether work expected to take ``expected_ms`` still fits before the reserve."""
+        return self.remaining_ms() - self.reserve_ms >= expected_ms
+
+class FakeLambdaContext:
+    """
+    Stand-in for the Lambda context when running the handler locally.
+
+    Counts down from ``timeout_ms`` (default LAMBDA_TIMEOUT_MS) in real
+    time, like the deployed function. Tests can pass their own ``clock``
+    (seconds) to advance time deterministically.
+    """
+
+    def __init__(
+        self,
+        timeout_ms: Optional[int] = None,
+        function_name: str = "local",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.function_name = function_name
+        self.timeout_ms = Config.LAMBDA_TIMEOUT_MS if timeout_ms is None else timeout_ms
+        self._clock = clock
+        self._deadline = clock() + self.timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - self._clock()) * 1000))
+
+def plan_companies(
+    companies: Iterable[str],
+    cursor: ScanCursor,
+    priority: Optional[Dict[str, int]] = None,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Pick and order the companies to scan this invocation.
+
+    Only companies that are due (see ``observe_scan``) are returned. They are
+    ordered by ``urgency``: never-scanned companies first, then by staleness
+    relative to their interval, weighted by ``priority`` (subscriber count).
+    A company deferred by the time budget keeps growing more urgent, so it
+    leads a later invocation; ties go to the cheaper expected scrape.
+
+    Companies are then grouped by browser engine (see ``group_by_browser``).
+    """
+    priority = priority or {}
+    now = now or datetime.utcnow()
+    default_cost = Config.SCRAPER_TIMEOUT_MS
+
+    due = [company for company in set(companies) if is_due(cursor, company, now)]
+
+    def key(company: str):
+        subscribers = priority.get(company, 0)
+        return (
+            -urgency(cursor, company, subscribers, now),
+            -subscribers,
+            cursor.expected_cost_ms(company, default_cost),
+            company,
+        )
+
+    return group_by_browser(sorted(due, key=key), cursor)
+
+def group_by_browser(companies: List[str], cursor: ScanCursor) -> List[str]:
+    """
+    Reorder companies so those sharing a browser engine are scanned together.
+
+    Engines come in the order of their most urgent company and each group
+    keeps its urgency order, so a warm scrape thread switches engines (and
+    relaunches its browser) at most once per engine per cycle.
+    """
+    groups: Dict[str, List[str]] = {}
+    for company in companies:
+        groups.setdefault(cursor.browsers.get(company, Config.SCRAPER_BROWSER), []).append(company)
+    return [company for group in groups.values() for company in group]
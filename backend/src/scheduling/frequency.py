@@ -0,0 +1,82 @@
+import math
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config import Config
+from src.models import ScanCursor
+
+RATE_SMOOTHING = 0.3  # Weight of the latest observation in the posting-rate average
+
+def scan_interval(change_rate: Optional[float]) -> timedelta:
+    """
+    How long to wait before scanning a company again.
+
+    Aims for SCHEDULER_TARGET_NEW_JOBS new postings per scan, clamped to
+    [SCHEDULER_MIN_INTERVAL_S, SCHEDULER_MAX_INTERVAL_S]. A company whose
+    rate is not known yet is scanned as often as possible.
+    """
+    if change_rate is None:
+        seconds = Config.SCHEDULER_MIN_INTERVAL_S
+    elif change_rate <= 0:
+        seconds = Config.SCHEDULER_MAX_INTERVAL_S
+    else:
+        seconds = Config.SCHEDULER_TARGET_NEW_JOBS / change_rate * 3600
+    seconds = min(max(seconds, Config.SCHEDULER_MIN_INTERVAL_S), Config.SCHEDULER_MAX_INTERVAL_S)
+    return timedelta(seconds=seconds)
+
+def observe_scan(
+    cursor: ScanCursor,
+    company: str,
+    elapsed_ms: float,
+    new_jobs: Optional[int],
+    scanned_at: Optional[datetime] = None,
+    hold_rate: bool = False,
+) -> None:
+    """
+    Record a finished scan and schedule the company's next one.
+
+    ``new_jobs`` is None when the scrape failed; the posting rate is then
+    left alone and the company is retried after the minimum interval.
+    ``hold_rate`` leaves the rate alone too but keeps the usual interval,
+    for scans that say nothing about how often the company posts.
+    """
+    scanned_at = scanned_at or datetime.utcnow()
+    previous_scan = cursor.last_scanned.get(company)
+
+    if new_jobs is not None and previous_scan is not None and not hold_rate:
+        hours = (scanned_at - previous_scan).total_seconds() / 3600
+        if hours > 0:
+            observed = new_jobs / hours
+            rate = cursor.change_rate.get(company)
+            cursor.change_rate[company] = (
+                observed if rate is None else (1 - RATE_SMOOTHING) * rate + RATE_SMOOTHING * observed
+            )
+
+    if new_jobs is None:
+        interval = timedelta(seconds=Config.SCHEDULER_MIN_INTERVAL_S)
+    else:
+        interval = scan_interval(cursor.change_rate.get(company))
+
+    cursor.record(company, elapsed_ms, scanned_at=scanned_at)
+    cursor.next_due[company] = scanned_at + interval
+
+def is_due(cursor: ScanCursor, company: str, now: datetime) -> bool:
+    due = cursor.next_due.get(company)
+    return due is None or due <= now
+
+def urgency(cursor: ScanCursor, company: str, subscribers: int, now: datetime) -> float:
+    """
+    How badly a due company needs scanning.
+
+    Time since the last scan relative to the company's interval, so busy
+    employers (short intervals) climb fastest, weighted by the log of its
+    subscriber count. Never-scanned companies are infinitely urgent.
+    """
+    last = cursor.last_scanned.get(company)
+    if last is None:
+        return math.inf
+
+    due = cursor.next_due.get(company)
+    interval = (due - last).total_seconds() if due else Config.SCHEDULER_MIN_INTERVAL_S
+    staleness = (now - last).total_seconds() / max(interval, 1.0)
+    return staleness * (1 + math.log2(1 + subscribers))
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config import Config
+from src.models import CompanyHealth, ScanCursor
+from src.scraper.errors import LearningError, PageTooLargeError, SelectorError, SiteUnavailableError
+
+# HTTP statuses that mean the site is refusing us rather than broken
+BLOCKED_STATUSES = {401, 403, 429}
+
+# Relearning an empty listing backs off: after 1, 2 and 4 runs of
+# SCHEDULER_RELEARN_AFTER_EMPTY empty scans, then every 8 runs
+EMPTY_RELEARN_BACKOFF = (1, 2, 4)
+EMPTY_RELEARN_MAX_BACKOFF = 8
+
+def classify_failure(error: Exception) -> str:
+    """
+    Kind of a company's scan failure.
+
+    selector: containers matched but no job could be read from them (re-learn);
+    learning: the learner could not produce selectors; too_large: the page
+    tripped a size or memory guard; blocked/unavailable: the site answered
+    with an HTTP error; timeout and network: the page did not load; error:
+    anything else.
+    """
+    if isinstance(error, SelectorError):
+        return "selector"
+    if isinstance(error, PageTooLargeError):
+        return "too_large"
+    if isinstance(error, LearningError):
+        return "learning"
+    if isinstance(error, SiteUnavailableError):
+        return "blocked" if error.status in BLOCKED_STATUSES else "unavailable"
+    # Playwright's TimeoutError is not a builtin TimeoutError subclass
+    if isinstance(error, TimeoutError) or type(error).__name__ == "TimeoutError":
+        return "timeout"
+    if isinstance(error, ConnectionError) or "net::" in str(error):
+        return "network"
+    return "error"
+
+def needs_relearning(kind: str) -> bool:
+    """Only selector breakage is fixed by learning new selectors."""
+    return kind == "selector"
+
+def observe_listing(cursor: ScanCursor, company: str, jobs_found: int) -> bool:
+    """
+    Count a company's scans in a row whose listing came back empty.
+
+    An empty page has either no openings or a container selector that no
+    longer matches, so it is not a failure. Returns True when the streak
+    reaches a multiple of SCHEDULER_RELEARN_AFTER_EMPTY, backing off (see
+    EMPTY_RELEARN_BACKOFF), so a relearned selector that is still wrong is
+    relearned again without spending an LLM call on every scan.
+    """
+    if jobs_found:
+        cursor.empty_scans.pop(company, None)
+        return False
+    misses = cursor.empty_scans.get(company, 0) + 1
+    cursor.empty_scans[company] = misses
+    every = max(1, Config.SCHEDULER_RELEARN_AFTER_EMPTY)
+    if misses % every:
+        return False
+    runs = misses // every
+    return runs in EMPTY_RELEARN_BACKOFF or runs % EMPTY_RELEARN_MAX_BACKOFF == 0
+
+def relearn_pending(cursor: ScanCursor, company: str) -> bool:
+    """Whether a company's empty streak has not reached its first relearn yet."""
+    return 0 < cursor.empty_scans.get(company, 0) < Config.SCHEDULER_RELEARN_AFTER_EMPTY
+
+def breaker_backoff(consecutive_failures: int) -> timedelta:
+    """How long the breaker stays open after ``consecutive_failures`` failures."""
+    exponent = max(0, consecutive_failures - Config.SCHEDULER_BREAKER_THRESHOLD)
+    seconds = min(Config.SCHEDULER_BREAKER_BASE_S * 2 ** min(exponent, 16), Config.SCHEDULER_BREAKER_MAX_S)
+    return timedelta(seconds=seconds)
+
+def observe_health(
+    cursor: ScanCursor,
+    company: str,
+    failure: Optional[str],
+    error: Optional[str] = None,
+    scanned_at: Optional[datetime] = None,
+) -> None:
+    """
+    Update a company's breaker after a scan (``failure`` is None on success).
+
+    Call after ``observe_scan``: while the breaker is open it pushes the
+    company's next scan out to the end of the backoff. A success, including
+    a half-open probe, closes the breaker and forgets the failures.
+    """
+    scanned_at = scanned_at or datetime.utcnow()
+
+    if failure is None:
+        health = cursor.health.pop(company, None)
+        if health is not None and health.open_until is not None:
+            print(f"  {company} recovered after {health.consecutive_failures} failed scans, closing breaker")
+        return
+
+    health = cursor.health.setdefault(company, CompanyHealth())
+    health.consecutive_failures += 1
+    health.failures[failure] = health.failures.get(failure, 0) + 1
+    health.last_error = error
+
+    if health.consecutive_failures >= Config.SCHEDULER_BREAKER_THRESHOLD:
+        backoff = breaker_backoff(health.consecutive_failures)
+        health.open_until = scanned_at + backoff
+        cursor.next_due[company] = max(cursor.next_due.get(company, scanned_at), health.open_until)
+        print(f"  Breaker open for {company} after {health.consecutive_failures} failures "
+              f"({failure}), next probe in {backoff}")
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from config import Config
+from src.metrics.recorder import percentile
+from src.models import ScanCursor
+
+def observe_load(cursor: ScanCursor, company: str, load_ms: float) -> None:
+    """Keep a company's last SCRAPER_LOAD_SAMPLES page-load times."""
+    samples = cursor.load_ms.setdefault(company, [])
+    samples.append(round(load_ms, 1))
+    del samples[:-Config.SCRAPER_LOAD_SAMPLES]
+
+def page_timeout_ms(cursor: ScanCursor, company: str) -> Optional[int]:
+    """
+    Page-load timeout for a company's next scan, or None for the default.
+
+    SCRAPER_TIMEOUT_HEADROOM times the p95 of its recent load times,
+    clamped to [SCRAPER_MIN_TIMEOUT_MS, SCRAPER_MAX_TIMEOUT_MS]: a site that
+    always renders in 800 ms fails after 5 s instead of 30 s, one that
+    needs 25 s gets 50 s. Loads that timed out count as taking the whole
+    timeout, so a site that slowed down is given more time on each scan;
+    loads whose job list never appeared are not sampled, so an empty or
+    broken listing cannot push the timeout up.
+    """
+    samples = cursor.load_ms.get(company, [])
+    if len(samples) < Config.SCRAPER_TIMEOUT_MIN_SAMPLES:
+        return None
+    timeout = percentile(samples, 95) * Config.SCRAPER_TIMEOUT_HEADROOM
+    return int(min(max(timeout, Config.SCRAPER_MIN_TIMEOUT_MS), Config.SCRAPER_MAX_TIMEOUT_MS))
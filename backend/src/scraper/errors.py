@@ -0,0 +1,21 @@
+from typing import Optional
+
+class ScrapeError(Exception):
+    """A company's scan failed in a way the scheduler should know the cause of."""
+
+class SelectorError(ScrapeError):
+    """The page loaded but the learned selectors no longer match any jobs."""
+
+class SiteUnavailableError(ScrapeError):
+    """The career page answered with an HTTP error (site down, moved or blocking us)."""
+
+    def __init__(self, url: str, status: Optional[int] = None):
+        super().__init__(f"{url} returned HTTP {status}")
+        self.url = url
+        self.status = status
+
+class PageTooLargeError(ScrapeError):
+    """The page exceeded a size or memory guard (see SCRAPER_MAX_DOM_NODES, SCRAPER_MAX_MEMORY_MB)."""
+
+class LearningError(ScrapeError):
+    """Selectors could not be learned for a company."""
@@ -0,0 +1,20 @@
+import hashlib
+import os
+import re
+from urllib.parse import urlparse
+
+from config import Config
+
+HAR_MODES = ("record", "replay")
+
+def har_path(url: str) -> str:
+    """
+    Archive a page load of ``url`` is recorded to and replayed from.
+
+    Named after the host and path, plus a digest of the full URL so query
+    strings (e.g. ``?page=2``) get their own archive.
+    """
+    parsed = urlparse(url)
+    slug = re.sub(r"[^a-z0-9]+", "-", f"{parsed.netloc}{parsed.path}".lower()).strip("-")[:80]
+    digest = hashlib.sha1(url.encode()).hexdigest()[:8]
+    return os.path.join(Config.SCRAPER_HAR_DIR, f"{slug}-{digest}.har")
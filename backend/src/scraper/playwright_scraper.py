@@ -1,56 +1,245 @@
-from typing import List
-from playwright.sync_api import sync_playwright, Page, TimeoutError as PlaywrightTimeout
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Generator, Iterator, List, Optional
+from urllib.parse import urljoin
+from playwright.sync_api import sync_playwright, Browser, Locator, Page, TimeoutError as PlaywrightTimeout
 
 from config import Config
-from src.models import ScraperConfig, JobPosting
+from src.models import ScraperConfig, JobList, JobRecord
+from src.metrics.memory import sample_memory
+from src.metrics.recorder import count, timed
+from src.scraper.errors import PageTooLargeError, SelectorError, SiteUnavailableError
+from src.scraper.har import HAR_MODES, har_path
+
+# Lambda optimizations; Chromium flags, so WebKit and Firefox launch without them
+CHROMIUM_ARGS = ["--disable-gpu", "--single-process"]
+
+COUNT_NODES_JS = "() => document.getElementsByTagName('*').length"
+
+# Serializes the page for learning without scripts, styles and other
+# non-layout markup, stopping at maxBytes of UTF-8 inside the browser, so
+# a page with megabytes of inline JSON never crosses into Python whole.
+# Text and attribute values are re-escaped, as the DOM holds them decoded
+LEARNING_HTML_JS = """
+(maxBytes) => {
+    const skip = new Set(["script", "style", "noscript", "svg", "template", "iframe", "link", "meta"]);
+    const encoder = new TextEncoder();
+    const escape = (text) => text.replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+    const out = [];
+    let size = 0;
+    const push = (text) => {
+        const bytes = encoder.encode(text).length;
+        if (size + bytes > maxBytes) return false;
+        out.push(text);
+        size += bytes;
+        return true;
+    };
+    const walk = (node) => {
+        if (node.nodeType === Node.TEXT_NODE) {
+            const text = node.textContent.replace(/\\s+/g, " ");
+            return text.trim() ? push(escape(text)) : true;
+        }
+        if (node.nodeType !== Node.ELEMENT_NODE) return true;
+        const tag = node.tagName.toLowerCase();
+        if (skip.has(tag)) return true;
+        let attrs = "";
+        for (const attr of node.attributes) {
+            if (attr.value.length <= 200) attrs += ` ${attr.name}="${escape(attr.value).replace(/"/g, "&quot;")}"`;
+        }
+        if (!push(`<${tag}${attrs}>`)) return false;
+        for (const child of node.childNodes) {
+            if (!walk(child)) return false;
+        }
+        return push(`</${tag}>`);
+    };
+    walk(document.documentElement);
+    return out.join("");
+}
+"""
 
 class CareerPageScraper:
-    """Scrapes career pages using Playwright and learned CSS selectors."""
+    """
+    Scrapes career pages using Playwright and learned CSS selectors.
+
+    By default every scrape launches and closes its own browser, which suits
+    a Lambda tick. With ``keep_browser`` each thread keeps one browser open
+    across scrapes (Playwright's sync API is bound to the thread that
+    started it) and every scrape gets a fresh page; call
+    ``close_thread_browser`` from each thread when done.
 
-    def __init__(self):
+    Each company is scraped with the engine its config names (Chromium,
+    WebKit or Firefox), SCRAPER_BROWSER by default. A warm thread keeps one
+    engine at a time and relaunches when the next company needs another;
+    ``plan_companies`` groups companies by engine so that is rare.
+
+    With SCRAPER_HAR_MODE set, each page gets its own browser context that
+    records its load (network responses included) to a HAR archive, or
+    replays a recorded one offline; requests missing from the archive are
+    aborted, so a replay never reaches the network.
+    """
+
+    def __init__(self, keep_browser: bool = False):
         self.timeout = Config.SCRAPER_TIMEOUT_MS
         self.headless = Config.SCRAPER_HEADLESS
         self.user_agent = Config.SCRAPER_USER_AGENT
+        self.keep_browser = keep_browser
+        self._local = threading.local()
+
+    def _launch(self, playwright, engine: str) -> Browser:
+        return getattr(playwright, engine).launch(
+            headless=self.headless,
+            args=CHROMIUM_ARGS if engine == "chromium" else [],
+        )
+
+    @contextmanager
+    def _browser(self, engine: Optional[str] = None) -> Iterator[Browser]:
+        """This thread's warm ``engine`` browser, or one for this call only."""
+        engine = engine or Config.SCRAPER_BROWSER
+        if not self.keep_browser:
+            with sync_playwright() as p:
+                browser = self._launch(p, engine)
+                try:
+                    yield browser
+                finally:
+                    browser.close()
+            return
+
+        browser = getattr(self._local, "browser", None)
+        if browser is None or not browser.is_connected() or getattr(self._local, "engine", None) != engine:
+            self.close_thread_browser()
+            self._local.playwright = sync_playwright().start()
+            browser = self._local.browser = self._launch(self._local.playwright, engine)
+            self._local.engine = engine
+        yield browser
+
+    @contextmanager
+    def _page(self, browser: Browser, url: str, **options) -> Iterator[Page]:
+        """A fresh page for loading ``url``, closed (and its HAR written) on exit."""
+        mode = Config.SCRAPER_HAR_MODE
+        if mode not in HAR_MODES:
+            page = browser.new_page(**options)
+            context = None
+        else:
+            path = har_path(url)
+            if mode == "record":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                context = browser.new_context(record_har_path=path, record_har_content="embed", **options)
+            else:
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"No HAR recorded for {url} (expected {path})")
+                context = browser.new_context(**options)
+                context.route_from_har(path, not_found="abort")
+            page = context.new_page()
+
+        requests = 0
+
+        def on_request(_request) -> None:
+            nonlocal requests
+            requests += 1
+
+        page.on("request", on_request)
+        try:
+            yield page
+        finally:
+            count("page_requests", requests)
+            page.close()
+            if context is not None:
+                context.close()  # Writes the HAR when recording
+
+    def close_thread_browser(self) -> None:
+        """Close the calling thread's warm browser, if it has one."""
+        browser = getattr(self._local, "browser", None)
+        playwright = getattr(self._local, "playwright", None)
+        self._local.browser = self._local.playwright = None
+        try:
+            if browser is not None and browser.is_connected():
+                browser.close()
+        finally:
+            if playwright is not None:
+                playwright.stop()
 
-    def scrape_company(self, config: ScraperConfig) -> List[JobPosting]:
+    def scrape_company(self, config: ScraperConfig) -> JobList:
         """
         Scrape a company's career page using learned selectors.
 
+        The load waits for ``config.wait_for``: by default until a job
+        container exists, so client-rendered lists are not read before they
+        render and static pages are read as soon as they parse. It is bounded
+        by ``config.timeout_ms`` (learned per company) or SCRAPER_TIMEOUT_MS.
+
         Args:
             config: ScraperConfig with CSS selectors
 
         Returns:
-            List of JobPosting objects
+            JobRecord objects with IDs assigned; ``complete`` is False if
+            extraction stopped early, ``load_ms`` is the page-load time
+
+        A page with no job container is returned empty and incomplete: it may
+        have no openings, or its list may not have rendered in time. Its
+        ``load_ms`` is None, so it does not count towards the learned timeout.
 
         Raises:
             TimeoutError: If page load exceeds timeout
+            SiteUnavailableError: If the page answers with an HTTP error
+            SelectorError: If containers match but no job can be read from them
+            PageTooLargeError: If the page exceeds the DOM-size or memory guards
             Exception: If scraping fails
         """
-        with sync_playwright() as p:
-            # Use webkit for lighter resource usage
-            browser = p.webkit.launch(
-                headless=self.headless,
-                args=["--disable-gpu", "--single-process"]  # Lambda optimizations
-            )
+        with self._browser(config.browser) as browser, \
+                self._page(browser, config.career_url, user_agent=self.user_agent) as page:
+            timeout = config.timeout_ms or self.timeout
+            page.set_default_timeout(timeout)
 
-            try:
-                page = browser.new_page(user_agent=self.user_agent)
-                page.set_default_timeout(self.timeout)
-
-                # Navigate with minimal waiting (domcontentloaded is faster than full load)
-                page.goto(config.career_url, wait_until="domcontentloaded")
+            started = time.perf_counter()
+            with timed("page_load"):
+                rendered = self._load(page, config, timeout)
+            # A list that never appeared (no openings or a broken selector)
+            # says nothing about load time, so it must not stretch the timeout
+            load_ms = (time.perf_counter() - started) * 1000 if rendered else None
+            self._check_dom_size(page, config.career_url)
 
+            with timed("extraction"):
                 jobs = self._extract_jobs_from_page(page, config)
-                return jobs
+            jobs.load_ms = load_ms
+            return jobs
 
-            finally:
-                browser.close()
+    def _load(self, page: Page, config: ScraperConfig, timeout: float) -> bool:
+        """
+        Navigate to the career page and wait until it is ready to extract.
+
+        Returns False if no job container appeared within the timeout.
+        """
+        started = time.monotonic()
+        wait_until = "networkidle" if config.wait_for == "networkidle" else "domcontentloaded"
+        response = page.goto(config.career_url, wait_until=wait_until, timeout=timeout)
+        if response is not None and response.status >= 400:
+            raise SiteUnavailableError(config.career_url, response.status)
+        if config.wait_for != "selector":
+            return True
+
+        remaining = max(1.0, timeout - (time.monotonic() - started) * 1000)
+        try:
+            page.wait_for_selector(config.job_container_selector, state="attached", timeout=remaining)
+        except PlaywrightTimeout:
+            # An empty listing looks the same as a slow one, so read what is
+            # there rather than fail (or relearn) on every scan
+            print(f"  {config.company}: no element matched {config.job_container_selector!r} within {timeout:.0f} ms")
+            return False
+        return True
+
+    def _check_dom_size(self, page: Page, url: str) -> None:
+        """Refuse pages whose DOM is too large to extract from safely."""
+        nodes = page.evaluate(COUNT_NODES_JS)
+        if isinstance(nodes, int) and nodes > Config.SCRAPER_MAX_DOM_NODES:
+            raise PageTooLargeError(f"{url} has {nodes} DOM nodes (limit {Config.SCRAPER_MAX_DOM_NODES})")
 
     def _extract_jobs_from_page(
         self,
         page: Page,
         config: ScraperConfig
-    ) -> List[JobPosting]:
+    ) -> JobList:
         """
         Extract jobs from page using CSS selectors.
 
@@ -59,65 +248,151 @@ class CareerPageScraper:
             config: ScraperConfig with selectors
 
         Returns:
-            List of JobPosting objects
-        """
-        jobs = []
+            JobRecord objects with IDs assigned, marked incomplete if
+            extraction stopped early or no container matched
 
-        # Find all job containers
+        Raises:
+            SelectorError: If containers match but none yields a job
+            PageTooLargeError: If memory passes SCRAPER_MAX_MEMORY_MB
+        """
+        jobs = JobList()
         containers = page.locator(config.job_container_selector).all()
+        if not containers:
+            # No openings, or a container selector that broke; the cycle
+            # tells them apart by how many scans in a row come back empty
+            jobs.complete = False
+            return jobs
 
-        for container in containers:
+        chunks = self.iter_jobs(page, config, containers)
+        while True:
             try:
-                # Extract fields using relative selectors
-                title_elem = container.locator(config.title_selector).first
-                location_elem = container.locator(config.location_selector).first
-                link_elem = container.locator(config.link_selector).first
-
-                title = title_elem.text_content() or ""
-                location = location_elem.text_content() or ""
-                link_href = link_elem.get_attribute("href") or ""
-
-                # Normalize relative URLs
-                if link_href.startswith("/"):
-                    from urllib.parse import urljoin
-                    link_href = urljoin(config.career_url, link_href)
-
-                # Create JobPosting (hash auto-generated in model)
-                job = JobPosting(
-                    id="auto",  # Will be generated in model_post_init
-                    company=config.company,
-                    role=title.strip(),
-                    location=location.strip(),
-                    link=link_href,
-                    source_url=config.career_url,
+                jobs.extend(next(chunks))
+            except StopIteration as done:
+                jobs.complete = bool(done.value)
+                break
+
+        if not jobs:
+            raise SelectorError(f"No job could be extracted from {config.job_container_selector!r}")
+        return jobs
+
+    def iter_jobs(
+        self,
+        page: Page,
+        config: ScraperConfig,
+        containers: Optional[List[Locator]] = None
+    ) -> Generator[List[JobRecord], None, bool]:
+        """
+        Extract jobs chunk by chunk, yielding each chunk with IDs assigned.
+
+        ``containers`` are the page's job containers if already located.
+
+        At most SCRAPER_MAX_CONTAINERS containers are read. Between chunks
+        memory is sampled for the company's peak, and extraction stops
+        early (keeping the jobs found so far) at SCRAPER_EXTRACTION_TIMEOUT_MS.
+        Returns whether every container on the page yielded a job.
+
+        Raises:
+            SelectorError: If no container matches
+            PageTooLargeError: If memory passes SCRAPER_MAX_MEMORY_MB
+        """
+        # Find all job containers
+        if containers is None:
+            containers = page.locator(config.job_container_selector).all()
+        if not containers:
+            raise SelectorError(f"No elements match {config.job_container_selector!r}")
+        total = len(containers)
+        if total > Config.SCRAPER_MAX_CONTAINERS:
+            print(f"  {config.company}: {total} containers, reading the first {Config.SCRAPER_MAX_CONTAINERS}")
+            containers = containers[:Config.SCRAPER_MAX_CONTAINERS]
+
+        read = 0
+        unreadable = 0
+        deadline = time.monotonic() + Config.SCRAPER_EXTRACTION_TIMEOUT_MS / 1000
+        chunk_size = max(1, Config.SCRAPER_EXTRACTION_CHUNK)
+        for start in range(0, len(containers), chunk_size):
+            used_mb = sample_memory()
+            if Config.SCRAPER_MAX_MEMORY_MB and used_mb > Config.SCRAPER_MAX_MEMORY_MB:
+                raise PageTooLargeError(
+                    f"{config.career_url}: memory at {used_mb:.0f} MB (limit {Config.SCRAPER_MAX_MEMORY_MB} MB)"
                 )
 
-                jobs.append(job)
+            chunk = []
+            for container in containers[start:start + chunk_size]:
+                # Containers are already on the page, so a missing field
+                # waits SCRAPER_FIELD_TIMEOUT_MS, not the rest of the deadline
+                remaining_ms = (deadline - time.monotonic()) * 1000
+                if remaining_ms <= 0:
+                    break
+                job = self._extract_job(container, config, min(Config.SCRAPER_FIELD_TIMEOUT_MS, remaining_ms))
+                read += 1
+                if job is not None:
+                    chunk.append(job)
+                else:
+                    unreadable += 1
 
-            except Exception as e:
-                print(f"Error extracting job from container: {e}")
-                continue
+            # Hash each chunk at once (IDs match JobPosting.generate_hash)
+            if chunk:
+                yield JobRecord.assign_ids(chunk)
+            if time.monotonic() >= deadline:
+                break
 
-        return jobs
+        if read < len(containers):
+            print(f"  {config.company}: extraction deadline reached after {read} of {len(containers)} containers")
+        if unreadable:
+            print(f"  {config.company}: {unreadable} containers could not be read")
+        # A posting in an unreadable container may still be open
+        return read == total and not unreadable
 
-    def fetch_html_for_learning(self, url: str) -> str:
+    def _extract_job(self, container, config: ScraperConfig, timeout_ms: float):
+        """One container's job, or None if its fields could not be read."""
+        try:
+            # Extract fields using relative selectors
+            title_elem = container.locator(config.title_selector).first
+            location_elem = container.locator(config.location_selector).first
+            link_elem = container.locator(config.link_selector).first
+
+            title = title_elem.text_content(timeout=timeout_ms) or ""
+            link_href = link_elem.get_attribute("href", timeout=timeout_ms) or ""
+            try:
+                location = location_elem.text_content(timeout=timeout_ms) or ""
+            except PlaywrightTimeout:
+                location = ""  # Not every posting lists one
+
+            # Normalize relative URLs
+            if link_href.startswith("/"):
+                link_href = urljoin(config.career_url, link_href)
+
+            return JobRecord(
+                company=config.company,
+                role=title.strip(),
+                location=location.strip(),
+                link=link_href,
+                source_url=config.career_url,
+            )
+
+        except Exception as e:
+            print(f"Error extracting job from container: {e}")
+            return None
+
+    def fetch_html_for_learning(self, url: str, browser: Optional[str] = None) -> str:
         """
-        Fetch raw HTML for LLM selector learning.
+        Fetch HTML for LLM selector learning.
+
+        Scripts, styles and similar markup are dropped and the result is cut
+        at SCRAPER_MAX_HTML_BYTES bytes of UTF-8, inside the browser.
 
         Args:
             url: Career page URL
+            browser: Engine to load it with (default SCRAPER_BROWSER)
 
         Returns:
-            Raw HTML content
-        """
-        with sync_playwright() as p:
-            browser = p.webkit.launch(headless=True)
-
-            try:
-                page = browser.new_page()
-                page.goto(url, wait_until="domcontentloaded", timeout=self.timeout)
-                html = page.content()
-                return html
+            HTML content of the page's layout
 
-            finally:
-                browser.close()
+        Raises:
+            PageTooLargeError: If the page exceeds SCRAPER_MAX_DOM_NODES
+        """
+        with self._browser(browser) as engine, self._page(engine, url) as page:
+            page.goto(url, wait_until="domcontentloaded", timeout=self.timeout)
+            self._check_dom_size(page, url)
+            html = page.evaluate(LEARNING_HTML_JS, Config.SCRAPER_MAX_HTML_BYTES)
+            return html
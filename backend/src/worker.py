@@ -0,0 +1,200 @@
+import json
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from config import Config
+from src import clients
+from src.metrics.recorder import CycleMetrics, recording
+from src.models import ScanCursor, UserProfile
+from src.notifier.outbox import NotificationOutbox
+from src.pipeline.cycle import ScanCycle
+from src.registry.companies import CompanyRegistry, load_registry
+from src.scheduling.budget import TimeBudget, plan_companies
+
+class StopContext:
+    """
+    Lambda-style context for a worker tick: unlimited time until shutdown.
+
+    Lets ``TimeBudget`` stop a tick from starting companies once SIGTERM
+    arrives, exactly as a Lambda stops near its deadline.
+    """
+
+    def __init__(self, stop: threading.Event):
+        self._stop = stop
+
+    def get_remaining_time_in_millis(self) -> float:
+        return 0.0 if self._stop.is_set() else float("inf")
+
+class ScanWorker:
+    """
+    Runs the scan pipeline continuously in one process, outside Lambda.
+
+    Unlike a Lambda tick, the worker keeps everything warm between scans:
+    the Firestore client, one browser per scrape thread, the seen set, the
+    registry and the scan cursor. Each company is scanned when its own
+    ``next_due`` passes; between ticks the worker sleeps until the next
+    company is due (at most WORKER_MAX_SLEEP_S). Users, the registry and
+    the seen set are reloaded every WORKER_USERS_REFRESH_S, so the seen set
+    follows retention expiry and writes by other scanners instead of only
+    growing.
+
+    SIGTERM/SIGINT stop new companies from starting; in-flight scrapes and
+    deliveries finish, then the cursor is saved and the browsers closed.
+    """
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.db = None
+        self.scraper = None
+        self.outbox: Optional[NotificationOutbox] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.cursor = ScanCursor()
+        self.seen_job_ids: Set[str] = set()
+        self.users: List[UserProfile] = []
+        self.subscribers: Dict[str, int] = {}
+        self.registry = CompanyRegistry()
+        self._users_loaded_at: Optional[float] = None
+        self.ticks = 0
+
+    def start(self) -> None:
+        """Create clients and load the state kept in memory from then on."""
+        Config.validate()
+        clients.begin_invocation()
+        self.db = clients.get_db()
+        self.scraper = clients.get_scraper()
+        self.scraper.keep_browser = True  # Browsers live as long as the worker
+        self.outbox = NotificationOutbox(self.db, notifier_factory=clients.get_notifier)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, Config.SCRAPER_CONCURRENCY),
+            thread_name_prefix="scrape",
+        )
+
+        try:
+            self.cursor = self.db.get_scan_cursor()
+        except Exception as e:
+            print(f"Failed to load scan cursor, starting a fresh rotation: {e}")
+        print(f"Startup: {json.dumps(clients.startup_report())}")
+
+    def stop(self, *_: Any) -> None:
+        """Ask the worker to finish in-flight work and exit (signal handler)."""
+        if not self.stop_event.is_set():
+            print("Shutdown requested, finishing in-flight scrapes...")
+        self.stop_event.set()
+
+    def run(self) -> None:
+        """Start, tick until stopped, then shut down cleanly."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        self.start()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.tick()
+                except Exception as e:
+                    print(f"Worker tick failed: {e}")
+                self.stop_event.wait(self.sleep_seconds())
+        finally:
+            self.shutdown()
+
+    def refresh_users(self) -> None:
+        """Reload users, the registry and the seen set and prune dead tokens, if they are stale."""
+        now = time.monotonic()
+        if self._users_loaded_at is not None and now - self._users_loaded_at < Config.WORKER_USERS_REFRESH_S:
+            return
+        self._users_loaded_at = now
+
+        self.outbox.prune_dead_tokens()
+        self.registry = load_registry(self.db)
+        self.users, report = self.registry.canonicalize(self.db.get_users())
+
+        self.subscribers = {}
+        for user in self.users:
+            for company in user.filters.companies:
+                self.subscribers[company] = self.subscribers.get(company, 0) + 1
+        self.cursor.prune(self.subscribers)
+
+        try:
+            self.seen_job_ids = self.db.get_seen_jobs()
+        except Exception as e:
+            print(f"Failed to reload seen jobs, keeping {len(self.seen_job_ids)} in memory: {e}")
+        print(f"Loaded {len(self.users)} users following {len(self.subscribers)} companies "
+              f"({report['duplicate_scrapes_removed']} duplicate names merged), "
+              f"{len(self.seen_job_ids)} seen jobs")
+
+    def tick(self) -> Dict[str, Any]:
+        """Scan every company that is due now."""
+        self.refresh_users()
+        schedule = plan_companies(self.subscribers, self.cursor, priority=self.subscribers)
+        if not schedule:
+            return {}
+
+        self.ticks += 1
+        metrics = CycleMetrics()
+        cycle = ScanCycle(
+            self.db, self.scraper, None, self.outbox,
+            learner_factory=clients.get_learner,
+            metrics=metrics,
+            registry=self.registry,
+            executor=self.executor,
+        )
+        budget = TimeBudget(StopContext(self.stop_event), reserve_ms=0)
+        with recording(metrics):
+            stats = cycle.run(schedule, self.users, self.seen_job_ids, budget=budget, cursor=self.cursor)
+            self.save_cursor()
+
+        metrics.check_read_budget()
+        metrics.emit()
+        print(f"Tick {self.ticks}: scanned {len(schedule) - len(stats['deferred'])} companies, "
+              f"{stats['new_jobs']} new jobs")
+        return stats
+
+    def sleep_seconds(self) -> float:
+        """Seconds until the next company is due, capped at WORKER_MAX_SLEEP_S."""
+        if not self.subscribers:
+            return Config.WORKER_MAX_SLEEP_S
+        due = [self.cursor.next_due[c] for c in self.subscribers if c in self.cursor.next_due]
+        if len(due) < len(self.subscribers):
+            return 1.0  # A company was never scanned (or just deferred)
+        wait = (min(due) - datetime.utcnow()).total_seconds()
+        return min(max(wait, 1.0), Config.WORKER_MAX_SLEEP_S)
+
+    def save_cursor(self) -> None:
+        try:
+            self.db.save_scan_cursor(self.cursor)
+        except Exception as e:
+            print(f"Failed to save scan cursor: {e}")
+
+    def shutdown(self) -> None:
+        """Flush state and close the warm browsers on their own threads."""
+        if self.db is not None:
+            self.save_cursor()
+
+        if self.executor is not None:
+            workers = max(1, Config.SCRAPER_CONCURRENCY)
+            # Occupy every pool thread at once so each closes its own browser
+            barrier = threading.Barrier(workers)
+
+            def close() -> None:
+                try:
+                    barrier.wait(timeout=Config.WORKER_SHUTDOWN_TIMEOUT_S)
+                except threading.BrokenBarrierError:
+                    pass
+                self.scraper.close_thread_browser()
+
+            for future in [self.executor.submit(close) for _ in range(workers)]:
+                try:
+                    future.result(timeout=Config.WORKER_SHUTDOWN_TIMEOUT_S)
+                except Exception as e:
+                    print(f"Failed to close browser: {e}")
+            self.executor.shutdown(wait=False)
+        print("Worker stopped")
+
+# Container entry point: python -m src.worker
+if __name__ == "__main__":
+    ScanWorker().run()
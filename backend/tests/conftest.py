@@ -1,6 +1,17 @@
 import pytest
 from unittest.mock import Mock
 from playwright.sync_api import Page, Browser
+from src import clients
+from src.registry import companies as registry
+
+@pytest.fixture(autouse=True)
+def cold_clients():
+    """Give every test a cold container, so patched client classes and registries take effect."""
+    clients.reset()
+    registry.reset()
+    yield
+    clients.reset()
+    registry.reset()
 
 @pytest.fixture
 def mock_firestore():
@@ -1,11 +1,14 @@
 import pytest
 from unittest.mock import Mock, patch
 from src.handler import lambda_handler
+from src.notifier.expo_push import DispatchResult
+from src.models import JobRecord, ScanCursor, UserProfile, UserFilters
+from src.diff.near_duplicates import NearDuplicateIndex
 
-@patch('src.handler.FirestoreClient')
-@patch('src.handler.SelectorLearner')
-@patch('src.handler.CareerPageScraper')
-@patch('src.handler.NotificationService')
+@patch('src.database.firestore_client.FirestoreClient')
+@patch('src.llm.selector_learner.SelectorLearner')
+@patch('src.scraper.playwright_scraper.CareerPageScraper')
+@patch('src.notifier.expo_push.NotificationService')
 @patch('src.handler.Config.validate')
 def test_end_to_end_flow(
     mock_validate, mock_notifier, mock_scraper_cls, mock_learner_cls, mock_db_cls
@@ -19,8 +22,9 @@ def test_end_to_end_flow(
     3. System learns selectors via LLM
     4. System scrapes TechCorp
     5. System finds new job
-    6. System sends notification
+    6. System queues the notification in the outbox
     7. System updates seen jobs
+    8. System drains the outbox and sends the notification
     """
     
     # Setup Mocks
@@ -28,20 +32,33 @@ def test_end_to_end_flow(
     mock_scraper = mock_scraper_cls.return_value
     mock_learner = mock_learner_cls.return_value
     mock_notify = mock_notifier.return_value
+    mock_notify.check_receipts.return_value = ([], [])
+    mock_notify.build_message.side_effect = lambda token, jobs: (token, [j.id for j in jobs])
+    mock_notify.publish.return_value = DispatchResult()
     
     # 1. DB State: One user, TechCorp, no seen jobs
     mock_db.get_seen_jobs.return_value = set()
+    mock_db.get_job_fingerprints.return_value = NearDuplicateIndex()
+    mock_db.get_job_snapshot.return_value = None
+    mock_db.get_scan_cursor.return_value = ScanCursor()
     mock_db.get_users.return_value = [
-        Mock(
+        UserProfile(
             push_token="token123",
-            filters=Mock(companies=["TechCorp"], matches=Mock(return_value=True))
+            filters=UserFilters(companies=["TechCorp"]),
+            user_id="user1",
         )
     ]
+
+    # Outbox: deliveries enqueued by the scrape stage are read back by the drain
+    outbox = []
+    mock_db.enqueue_outbox.side_effect = lambda entries: outbox.extend(entries) or len(entries)
+    mock_db.get_pending_outbox.side_effect = lambda limit: [outbox.pop() for _ in range(len(outbox))]
     
     # Config: Exists but not learned, or just missing. 
     # Handler logic: if not config or not config.is_learned -> learn.
     # Let's say config exists but needs learning, and has URL.
-    mock_config = Mock(is_learned=False, career_url="http://techcorp.com/jobs")
+    mock_config = Mock(is_learned=False, career_url="http://techcorp.com/jobs", wait_for="selector",
+                       browser=None)
     mock_db.get_scraper_config.return_value = mock_config
     
     # 2. Scraper fetches HTML for learning
@@ -52,7 +69,8 @@ def test_end_to_end_flow(
     mock_learner.learn_selectors.return_value = learned_config
     
     # 4. Scraper uses new config to find jobs
-    job = Mock(id="job1", company="TechCorp", role="Dev", location="Remote", link="http://job1")
+    job = JobRecord(id="job1", company="TechCorp", role="Dev", location="Remote", link="http://job1",
+                    source_url="http://techcorp.com/jobs")
     mock_scraper.scrape_company.return_value = [job]
     
     # Run Handler
@@ -61,19 +79,22 @@ def test_end_to_end_flow(
     # Verifications
     
     # Should have tried to learn
-    mock_scraper.fetch_html_for_learning.assert_called_with("http://techcorp.com/jobs")
+    mock_scraper.fetch_html_for_learning.assert_called_with("http://techcorp.com/jobs", browser=None)
     mock_learner.learn_selectors.assert_called()
-    mock_db.save_scraper_config.assert_called_with(learned_config)
+    # The existing config's page-load settings carry over to the learned one
+    learned_config.model_copy.assert_called_with(update={"wait_for": "selector", "browser": None})
+    mock_db.save_scraper_config.assert_called_with(learned_config.model_copy.return_value)
     
     # Should have scraped with new config
     # Note: handler updates local variable 'config' after learning
     mock_scraper.scrape_company.assert_called()
     
-    # Should have sent notification
-    mock_notify.dispatch.assert_called()
-    call_args = mock_notify.dispatch.call_args
-    assert len(call_args[0][0]) == 1 # 1 new job
-    assert call_args[0][0][0].id == "job1"
+    # Should have queued and then sent the notification
+    mock_db.enqueue_outbox.assert_called_once()
+    mock_notify.publish.assert_called_once()
+    messages = mock_notify.publish.call_args[0][0]
+    assert messages == [("token123", ["job1"])] # 1 new job for the subscriber
+    mock_db.mark_outbox_sent.assert_called_once()
     
     # Should have updated seen jobs
     mock_db.add_seen_jobs.assert_called_with(["job1"])
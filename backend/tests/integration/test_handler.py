@@ -1,12 +1,15 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from src.handler import lambda_handler
+from src.notifier.expo_push import DispatchResult
+from src.models import JobRecord, ScanCursor, UserProfile, UserFilters
+from src.diff.near_duplicates import NearDuplicateIndex
 
 @patch('src.handler.Config.validate')
-@patch('src.handler.FirestoreClient')
-@patch('src.handler.SelectorLearner')
-@patch('src.handler.CareerPageScraper')
-@patch('src.handler.NotificationService')
+@patch('src.database.firestore_client.FirestoreClient')
+@patch('src.llm.selector_learner.SelectorLearner')
+@patch('src.scraper.playwright_scraper.CareerPageScraper')
+@patch('src.notifier.expo_push.NotificationService')
 def test_lambda_handler_full_flow(
     mock_notifier, mock_scraper, mock_learner, mock_db, mock_config
 ):
@@ -15,11 +18,16 @@ def test_lambda_handler_full_flow(
     mock_db_instance = Mock()
     mock_db_instance.get_seen_jobs.return_value = set()
     mock_db_instance.get_users.return_value = [
-        Mock(
+        UserProfile(
             push_token="ExponentPushToken[test]",
-            filters=Mock(matches=Mock(return_value=True), companies=["TestCo"])
+            filters=UserFilters(companies=["TestCo"]),
+            user_id="user1",
         )
     ]
+    mock_db_instance.get_pending_outbox.return_value = []
+    mock_db_instance.get_job_fingerprints.return_value = NearDuplicateIndex()
+    mock_db_instance.get_job_snapshot.return_value = None
+    mock_db_instance.get_scan_cursor.return_value = ScanCursor()
     mock_db_instance.get_scraper_config.return_value = Mock(
         company="TestCo",
         career_url="https://test.com/careers",
@@ -34,7 +42,7 @@ def test_lambda_handler_full_flow(
     # Mock scraper returning new jobs
     mock_scraper_instance = Mock()
     mock_scraper_instance.scrape_company.return_value = [
-        Mock(
+        JobRecord(
             id="job123",
             company="TestCo",
             role="SWE",
@@ -45,20 +53,29 @@ def test_lambda_handler_full_flow(
     ]
     mock_scraper.return_value = mock_scraper_instance
 
+    mock_notifier.return_value.check_receipts.return_value = ([], [])
+    mock_db_instance.enqueue_outbox.return_value = 1
+
     # Execute handler
     result = lambda_handler(None, None)
 
     assert result["status"] == "success"
     assert result["new_jobs"] >= 0
+    assert result["notifications_queued"] == 1
+    # Selectors were already learned, so the learner was never built
+    mock_learner.assert_not_called()
+    assert "learner" not in result["startup"]["init_ms"]
+    assert result["metrics"]["counters"]["new_jobs"] == 1
+    assert result["metrics"]["companies"]["outcomes"] == {"ok": 1}
 
 def test_lambda_handler_no_new_jobs(mock_firestore):
     """Test handler when no new jobs are found."""
     # We mocked firestore fixture in conftest, but here we need to patch classes used in handler
     
-    with patch('src.handler.FirestoreClient') as mock_db, \
-         patch('src.handler.CareerPageScraper') as mock_scraper, \
-         patch('src.handler.SelectorLearner'), \
-         patch('src.handler.NotificationService'), \
+    with patch('src.database.firestore_client.FirestoreClient') as mock_db, \
+         patch('src.scraper.playwright_scraper.CareerPageScraper') as mock_scraper, \
+         patch('src.llm.selector_learner.SelectorLearner'), \
+         patch('src.notifier.expo_push.NotificationService') as mock_notifier, \
          patch('src.handler.Config.validate'):
          
         mock_db_instance = Mock()
@@ -68,6 +85,7 @@ def test_lambda_handler_no_new_jobs(mock_firestore):
         ]
         # Config needs to be returned
         mock_db_instance.get_scraper_config.return_value = Mock(is_learned=True)
+        mock_db_instance.get_scan_cursor.return_value = ScanCursor()
         mock_db.return_value = mock_db_instance
     
         # All scraped jobs are already seen
@@ -76,7 +94,97 @@ def test_lambda_handler_no_new_jobs(mock_firestore):
             Mock(id="job123")  # Already seen
         ]
         mock_scraper.return_value = mock_scraper_instance
+        mock_notifier.return_value.check_receipts.return_value = ([], [])
 
         result = lambda_handler(None, None)
 
         assert result["new_jobs"] == 0
+
+@patch('src.handler.Config.validate')
+@patch('src.database.firestore_client.FirestoreClient')
+@patch('src.llm.selector_learner.SelectorLearner')
+@patch('src.scraper.playwright_scraper.CareerPageScraper')
+@patch('src.notifier.expo_push.NotificationService')
+def test_lambda_handler_prunes_dead_tokens(
+    mock_notifier, mock_scraper, mock_learner, mock_db, mock_config
+):
+    """Test that unregistered devices are deactivated before users are loaded."""
+    mock_db_instance = mock_db.return_value
+    mock_db_instance.get_seen_jobs.return_value = set()
+    mock_db_instance.get_push_tickets.return_value = [Mock(), Mock()]
+    mock_db_instance.get_users.return_value = []
+    mock_notifier.return_value.check_receipts.return_value = (["t1", "t2"], ["user1"])
+
+    result = lambda_handler(None, None)
+
+    mock_db_instance.deactivate_users.assert_called_once_with(["user1"])
+    mock_db_instance.delete_push_tickets.assert_called_once_with(["t1", "t2"])
+    assert result["pruned_tokens"] == 1
+
+@patch('src.handler.Config.validate')
+@patch('src.database.firestore_client.FirestoreClient')
+@patch('src.llm.selector_learner.SelectorLearner')
+@patch('src.scraper.playwright_scraper.CareerPageScraper')
+@patch('src.notifier.expo_push.NotificationService')
+def test_lambda_handler_enqueues_before_marking_seen(
+    mock_notifier, mock_scraper, mock_learner, mock_db, mock_config
+):
+    """Test that deliveries are queued durably before jobs are marked seen."""
+    calls = []
+    mock_db_instance = mock_db.return_value
+    mock_db_instance.get_seen_jobs.return_value = set()
+    mock_db_instance.get_push_tickets.return_value = []
+    mock_db_instance.get_job_fingerprints.return_value = NearDuplicateIndex()
+    mock_db_instance.get_job_snapshot.return_value = None
+    mock_db_instance.get_scan_cursor.return_value = ScanCursor()
+    mock_db_instance.get_users.return_value = [
+        UserProfile(push_token="ExponentPushToken[a]", filters=UserFilters(companies=["TestCo"]))
+    ]
+    mock_db_instance.get_scraper_config.return_value = Mock(is_learned=True)
+    mock_db_instance.enqueue_outbox.side_effect = lambda entries: calls.append("enqueue") or len(entries)
+    mock_db_instance.add_seen_jobs.side_effect = lambda ids: calls.append("seen")
+    mock_db_instance.get_pending_outbox.return_value = []
+    mock_notifier.return_value.check_receipts.return_value = ([], [])
+    mock_scraper.return_value.scrape_company.return_value = [
+        JobRecord(id="job1", company="TestCo", role="SWE", location="SF", source_url="http://test.com")
+    ]
+
+    with patch('src.handler.Config.OUTBOX_DRAIN_INLINE', False):
+        result = lambda_handler(None, None)
+
+    assert calls == ["enqueue", "seen"]
+    mock_db_instance.get_pending_outbox.assert_not_called()
+    assert result["notifications_queued"] == 1
+
+@patch('src.handler.Config.validate')
+@patch('src.database.firestore_client.FirestoreClient')
+@patch('src.llm.selector_learner.SelectorLearner')
+@patch('src.scraper.playwright_scraper.CareerPageScraper')
+@patch('src.notifier.expo_push.NotificationService')
+def test_lambda_handler_skips_near_duplicate_jobs(
+    mock_notifier, mock_scraper, mock_learner, mock_db, mock_config
+):
+    """Test that a trivially edited posting is not treated as a new job, but is marked seen."""
+    existing = JobRecord.assign_ids([JobRecord(company="TestCo", role="SWE", location="Remote - US")])[0]
+    edited = JobRecord.assign_ids([JobRecord(company="TestCo", role="SWE (R123456)", location="Remote, US")])[0]
+
+    mock_db_instance = mock_db.return_value
+    mock_db_instance.get_seen_jobs.return_value = {existing.id}
+    mock_db_instance.get_push_tickets.return_value = []
+    mock_db_instance.get_job_fingerprints.return_value = NearDuplicateIndex()
+    mock_db_instance.get_job_snapshot.return_value = None
+    mock_db_instance.get_scan_cursor.return_value = ScanCursor()
+    mock_db_instance.get_users.return_value = [
+        UserProfile(push_token="ExponentPushToken[a]", filters=UserFilters(companies=["TestCo"]))
+    ]
+    mock_db_instance.get_scraper_config.return_value = Mock(company="TestCo", is_learned=True)
+    mock_notifier.return_value.check_receipts.return_value = ([], [])
+    mock_scraper.return_value.scrape_company.return_value = [existing, edited]
+
+    result = lambda_handler(None, None)
+
+    assert result["new_jobs"] == 0
+    mock_db_instance.enqueue_outbox.assert_not_called()
+    mock_db_instance.save_job_fingerprints.assert_called_once()
+    # Otherwise it is re-detected (and fingerprinted again) on every scan
+    mock_db_instance.add_seen_jobs.assert_called_once_with([edited.id])
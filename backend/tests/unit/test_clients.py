@@ -0,0 +1,19 @@
+import pytest
+from unittest.mock import patch
+from src import clients
+
+@patch('src.database.firestore_client.FirestoreClient')
+def test_clients_are_reused_across_warm_invocations(mock_db):
+    """Test that a client is built once per container and only reported when built."""
+    clients.begin_invocation()
+    first = clients.get_db()
+    cold = clients.startup_report()
+
+    clients.begin_invocation()
+    second = clients.get_db()
+    warm = clients.startup_report()
+
+    assert first is second
+    mock_db.assert_called_once()
+    assert cold["cold_start"] and "firestore" in cold["init_ms"]
+    assert not warm["cold_start"] and warm["init_ms"] == {}
@@ -0,0 +1,212 @@
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from src.pipeline.cycle import ScanCycle
+from src.models import JobList, JobRecord, ScanCursor, ScraperConfig, UserProfile, UserFilters
+from src.scraper.errors import SelectorError
+from src.diff.near_duplicates import NearDuplicateIndex
+
+def make_config(company):
+    return ScraperConfig(
+        company=company,
+        career_url=f"https://{company.lower()}.com/careers",
+        job_container_selector=".job",
+        title_selector="h3",
+        location_selector=".loc",
+        link_selector="a",
+    )
+
+def make_jobs(company, count):
+    jobs = [JobRecord(company=company, role=f"Engineer {i}", location="SF") for i in range(count)]
+    return JobRecord.assign_ids(jobs)
+
+@pytest.fixture
+def db():
+    db = Mock()
+    db.get_scraper_config.side_effect = make_config
+    db.get_job_fingerprints.side_effect = lambda company: NearDuplicateIndex()
+    db.get_job_snapshot.return_value = None
+    return db
+
+@pytest.fixture
+def users():
+    return [UserProfile(push_token="ExponentPushToken[a]", filters=UserFilters(companies=["Fast", "Slow"]), user_id="a")]
+
+@patch('src.pipeline.cycle.Config.SCRAPER_CONCURRENCY', 2)
+def test_fast_company_notified_before_slow_one_finishes(db, users):
+    """Test that a fast company's jobs are persisted and delivered while a slow one is still loading."""
+    delivered = threading.Event()
+    events = []
+
+    def scrape(config):
+        if config.company == "Slow":
+            # Only finishes once the fast company has been delivered
+            assert delivered.wait(timeout=5)
+        events.append(("scraped", config.company))
+        return make_jobs(config.company, 2)
+
+    scraper = Mock()
+    scraper.scrape_company.side_effect = scrape
+    db.add_seen_jobs.side_effect = lambda ids: events.append(("seen", len(ids)))
+
+    outbox = Mock()
+    outbox.enqueue.side_effect = lambda jobs, users, index=None: len(jobs)
+
+    def drain():
+        events.append(("drained",))
+        delivered.set()
+        return {"batches": 1, "delivered": 2, "failed": 0, "notifications": 1, "pruned_tokens": 0}
+    outbox.drain.side_effect = drain
+
+    seen = set()
+    stats = ScanCycle(db, scraper, Mock(), outbox).run(["Slow", "Fast"], users, seen)
+
+    assert events.index(("scraped", "Fast")) < events.index(("drained",)) < events.index(("scraped", "Slow"))
+    assert stats["new_jobs"] == 4
+    assert stats["companies_scraped"] == 2
+    assert stats["notifications"]["notifications"] >= 1
+    assert "first_notification_ms" in stats["notifications"]
+    assert len(seen) == 4
+
+def test_failed_company_does_not_stop_cycle(db, users):
+    """Test that only selector breakage marks a config for re-learning and other companies still complete."""
+    def scrape(config):
+        if config.company == "Slow":
+            raise TimeoutError("page load timed out")
+        if config.company == "Broken":
+            raise SelectorError("No elements match '.job'")
+        return make_jobs(config.company, 1)
+
+    scraper = Mock()
+    scraper.scrape_company.side_effect = scrape
+    outbox = Mock()
+    outbox.enqueue.return_value = 1
+    outbox.drain.return_value = {"notifications": 1}
+
+    cursor = ScanCursor()
+    stats = ScanCycle(db, scraper, Mock(), outbox).run(["Slow", "Broken", "Fast"], users, set(), cursor=cursor)
+
+    db.mark_config_needs_relearning.assert_called_once_with("Broken")
+    assert stats["companies_failed"] == 2
+    assert cursor.health["Slow"].failures == {"timeout": 1}
+    assert cursor.health["Broken"].failures == {"selector": 1}
+    assert "Fast" not in cursor.health
+    assert stats["new_jobs"] == 1
+    db.add_seen_jobs.assert_called_once()
+
+def test_failure_outside_the_scan_still_yields_a_result(db, users):
+    """Test that an error in the memory watcher becomes that company's error result instead of hanging the cycle."""
+    from contextlib import contextmanager
+
+    @contextmanager
+    def watch():
+        yield Mock(peak_mb=0.0)
+        raise RuntimeError("memory probe failed")
+
+    scraper = Mock()
+    scraper.scrape_company.side_effect = lambda config: make_jobs(config.company, 1)
+    outbox = Mock()
+    outbox.enqueue.return_value = 1
+    outbox.drain.return_value = {"notifications": 1}
+
+    with patch('src.pipeline.cycle.watching_memory', watch):
+        results = list(ScanCycle(db, scraper, Mock(), outbox).scrape(["Fast", "Slow"]))
+
+    assert sorted(r.company for r in results) == ["Fast", "Slow"]
+    assert all(r.error == "memory probe failed" and r.failure == "error" for r in results)
+
+@patch('src.pipeline.cycle.Config.SCHEDULER_RELEARN_AFTER_EMPTY', 3)
+def test_empty_listing_relearns_after_consecutive_misses_with_backoff(db, users):
+    """Test that an empty page is not a failure and is relearned on its 3rd, 6th and 12th empty scan in a row."""
+    from datetime import timedelta
+    from config import Config
+
+    scraper = Mock()
+    scraper.scrape_company.side_effect = lambda config: JobList()
+    outbox = Mock()
+    outbox.enqueue.return_value = 0
+    cycle = ScanCycle(db, scraper, Mock(), outbox)
+
+    cursor = ScanCursor(change_rate={"Empty": 0.01})
+    intervals = []
+    for scan in range(1, 13):
+        stats = cycle.run(["Empty"], users, set(), cursor=cursor)
+        assert stats["companies_failed"] == 0
+        assert "Empty" not in cursor.health
+        intervals.append(cursor.next_due["Empty"] - cursor.last_scanned["Empty"])
+        if scan < 3:
+            db.mark_config_needs_relearning.assert_not_called()
+
+    assert db.mark_config_needs_relearning.call_count == 3
+    # Rescanned soon until the first relearn; empty scans never decay the posting rate
+    minimum = timedelta(seconds=Config.SCHEDULER_MIN_INTERVAL_S)
+    assert intervals[:3] == [minimum] * 3
+    assert intervals[3] > minimum
+    assert cursor.change_rate["Empty"] == 0.01
+
+    scraper.scrape_company.side_effect = lambda config: make_jobs(config.company, 1)
+    cycle.run(["Empty"], users, set(), cursor=cursor)
+    assert "Empty" not in cursor.empty_scans
+
+def test_empty_scans_leave_the_page_timeout_unchanged(db, users):
+    """Test that listings whose containers never appeared do not push up the learned timeout."""
+    from src.scheduling.timeouts import page_timeout_ms
+
+    scraper = Mock()
+    scraper.scrape_company.side_effect = lambda config: JobList()  # load_ms None: nothing rendered
+    outbox = Mock()
+    outbox.enqueue.return_value = 0
+    cursor = ScanCursor(load_ms={"Empty": [800.0, 900.0, 1000.0]})
+    before = page_timeout_ms(cursor, "Empty")
+
+    cycle = ScanCycle(db, scraper, Mock(), outbox)
+    for _ in range(3):
+        cycle.run(["Empty"], users, set(), cursor=cursor)
+
+    assert page_timeout_ms(cursor, "Empty") == before
+    assert cursor.load_ms["Empty"] == [800.0, 900.0, 1000.0]
+
+def test_persist_failure_does_not_stop_cycle(db, users):
+    """Test that a Firestore error persisting one company leaves the others and the cursor updated."""
+    def add_seen_jobs(ids):
+        if any(job.id in ids for job in make_jobs("Flaky", 2)):
+            raise RuntimeError("Deadline exceeded")
+
+    db.add_seen_jobs.side_effect = add_seen_jobs
+    scraper = Mock()
+    scraper.scrape_company.side_effect = lambda config: make_jobs(config.company, 2)
+    outbox = Mock()
+    outbox.enqueue.side_effect = lambda jobs, users, index=None: len(jobs)
+    outbox.drain.return_value = {"notifications": 1}
+
+    seen = set()
+    cursor = ScanCursor()
+    stats = ScanCycle(db, scraper, Mock(), outbox).run(["Flaky", "Fast"], users, seen, cursor=cursor)
+
+    assert stats["companies_failed"] == 1 and stats["companies_scraped"] == 1
+    assert stats["new_jobs"] == 2
+    assert seen == {job.id for job in make_jobs("Fast", 2)}  # Flaky's jobs are detected again next scan
+    assert set(cursor.next_due) == {"Flaky", "Fast"}
+
+def test_closed_postings_are_detected_from_snapshots(db, users):
+    """Test that jobs gone from a complete page are closed, and an incomplete page closes nothing."""
+    from src.diff.snapshots import JobSnapshot
+    from src.models import JobList
+
+    jobs = make_jobs("Fast", 5)
+    snapshots = {"Fast": JobSnapshot.from_ids(job.id for job in jobs)}
+    db.get_job_snapshot.side_effect = snapshots.get
+    db.save_job_snapshot.side_effect = snapshots.__setitem__
+    page = JobList(jobs[2:])
+    scraper = Mock()
+    scraper.scrape_company.side_effect = lambda config: page
+    seen = {job.id for job in jobs}
+
+    page.complete = False
+    ScanCycle(db, scraper, Mock(), Mock()).run(["Fast"], users, seen)
+    db.update_job_status.assert_not_called()
+
+    page.complete = True
+    ScanCycle(db, scraper, Mock(), Mock()).run(["Fast"], users, seen)
+    db.update_job_status.assert_called_once_with(sorted(job.id for job in jobs[:2]), "closed")
+    assert len(snapshots["Fast"]) == 3
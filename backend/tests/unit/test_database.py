@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
-from src.database.firestore_client import FirestoreClient
+from src.database.firestore_client import SCRAPER_CONFIG_FIELDS, USER_FIELDS, FirestoreClient
+from src.metrics.recorder import CycleMetrics, recording
 from src.models import JobPosting, UserProfile, UserFilters, ScraperConfig
 
 @pytest.fixture
@@ -87,3 +88,92 @@ def test_save_scraper_config(mock_firestore_db):
 
     # Verify set was called with correct data
     mock_firestore_db.collection.return_value.document.return_value.set.assert_called_once()
+
+def test_deactivate_users_uses_one_batch(mock_firestore_db):
+    """Test that dead tokens are pruned with a single batched update."""
+    client = FirestoreClient()
+
+    client.deactivate_users(["user1", "user2", "user1"])
+
+    batch = mock_firestore_db.batch.return_value
+    assert mock_firestore_db.batch.call_count == 1
+    assert batch.update.call_count == 2
+    batch.commit.assert_called_once()
+
+def test_enqueue_outbox_skips_existing_deliveries(mock_firestore_db):
+    """Test that re-enqueueing an already queued delivery writes nothing."""
+    from src.models import OutboxEntry
+    entries = [
+        OutboxEntry(push_token="ExponentPushToken[a]", user_id="a", job_id="job1",
+                    company="A", role="R", location="L"),
+        OutboxEntry(push_token="ExponentPushToken[a]", user_id="a", job_id="job2",
+                    company="A", role="R", location="L"),
+    ]
+    existing = Mock(id=entries[0].dedupe_key, exists=True)
+    mock_firestore_db.get_all.return_value = [existing]
+
+    client = FirestoreClient()
+    queued = client.enqueue_outbox(entries)
+
+    assert queued == 1
+    assert mock_firestore_db.batch.return_value.set.call_count == 1
+
+@patch('src.database.firestore_client.Config.OUTBOX_RETRY_BACKOFF_S', 60)
+def test_failed_deliveries_back_off_before_retry(mock_firestore_db):
+    """Test that a failed send is only due again after a backoff doubling per attempt."""
+    from datetime import datetime, timedelta
+    from src.models import OutboxEntry
+    entries = [
+        OutboxEntry(push_token="ExponentPushToken[a]", user_id="a", job_id="job1",
+                    company="A", role="R", location="L", attempts=attempts)
+        for attempts in (0, 2)
+    ]
+
+    client = FirestoreClient()
+    client.mark_outbox_failed(entries)
+
+    updates = [c.args[1] for c in mock_firestore_db.batch.return_value.update.call_args_list]
+    assert [u["attempts"] for u in updates] == [1, 3]
+    delays = [u["next_attempt_at"] - datetime.utcnow() for u in updates]
+    assert timedelta(seconds=50) < delays[0] <= timedelta(seconds=60)
+    assert timedelta(seconds=230) < delays[1] <= timedelta(seconds=240)
+
+    query = mock_firestore_db.collection.return_value.where.return_value
+    query.where.return_value.order_by.return_value.limit.return_value.stream.return_value = []
+    client.get_pending_outbox(10)
+    due = query.where.call_args.kwargs["filter"]
+    assert (due.field_path, due.op_string) == ("next_attempt_at", "<=")
+
+def test_hot_path_reads_are_projected_and_accounted(mock_firestore_db):
+    """Test that users and configs are read through field masks and each call's reads and writes are recorded."""
+    users_query = mock_firestore_db.collection.return_value.where.return_value.select.return_value
+    users_query.stream.return_value = [
+        Mock(id=f"user{i}", to_dict=Mock(return_value={"push_token": f"ExponentPushToken[{i}]", "filters": {}}))
+        for i in range(2)
+    ]
+    missing = Mock(exists=False)
+    mock_firestore_db.collection.return_value.document.return_value.get.return_value = missing
+    mock_firestore_db.collection.return_value.select.return_value.stream.return_value = []
+
+    client = FirestoreClient()
+    metrics = CycleMetrics()
+    with recording(metrics):
+        users = client.get_users()
+        assert client.get_scraper_config("Acme") is None
+        client.get_seen_jobs()
+        client.add_seen_jobs(["hash1", "hash2", "hash3"])
+
+    assert [user.user_id for user in users] == ["user0", "user1"]
+    mock_firestore_db.collection.return_value.where.return_value.select.assert_called_once_with(USER_FIELDS)
+    mock_firestore_db.collection.return_value.document.return_value.get.assert_called_once_with(
+        field_paths=SCRAPER_CONFIG_FIELDS
+    )
+    assert SCRAPER_CONFIG_FIELDS == list(ScraperConfig(
+        company="A", career_url="u", job_container_selector="", title_selector="", location_selector="",
+        link_selector="",
+    ).to_dict())
+    usage = metrics.summary()["firestore"]["methods"]
+    assert usage["get_users"]["reads"] == 2 and usage["get_users"]["bytes_read"] > 0
+    assert usage["get_scraper_config"]["reads"] == 1  # Billed even though missing
+    assert usage["get_seen_jobs"]["reads"] == 1  # An empty query still costs a read
+    assert usage["add_seen_jobs"]["writes"] == 3
@@ -0,0 +1,162 @@
+import os
+import time
+import pytest
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+from src import clients
+from src.fanout.backends import DispatchBackend, ProcessPoolBackend
+from src.fanout.coordinator import Coordinator
+from src.fanout.shard import scrape_shard
+from src.fanout.sharding import ShardRing
+from src.models import ScanCursor, ScraperConfig, UserProfile, UserFilters
+from src.pipeline.cycle import ScanCycle
+from src.scheduling.budget import FakeLambdaContext, TimeBudget
+from benchmarks.fakes import FakeScraper, write_fakes_spec
+
+COMPANIES = [f"Company {i}" for i in range(12)]
+
+def make_config(company):
+    return ScraperConfig(
+        company=company,
+        career_url=f"https://{company.lower().replace(' ', '')}.com/careers",
+        job_container_selector=".job",
+        title_selector="h3",
+        location_selector=".loc",
+        link_selector="a",
+    )
+
+def test_process_backend_is_refused_inside_lambda():
+    """Test that fan-out over a process pool fails config validation in Lambda instead of at runtime."""
+    from config import Config
+
+    with patch.object(Config, "FIREBASE_PROJECT_ID", "p"), patch.object(Config, "ANTHROPIC_API_KEY", "k"), \
+         patch.object(Config, "FANOUT_SHARDS", 4), patch.object(Config, "FANOUT_BACKEND", "process"):
+        Config.validate()
+        with patch.dict(os.environ, {"AWS_LAMBDA_FUNCTION_NAME": "scraper"}):
+            with pytest.raises(ValueError):
+                Config.validate()
+            with patch.object(Config, "FANOUT_BACKEND", "lambda"):
+                Config.validate()
+
+class InlineBackend(DispatchBackend):
+    """Runs shards in this process, failing the ones listed."""
+
+    def __init__(self, failing=(), refused=(), hung=()):
+        self.failing = set(failing)
+        self.refused = set(refused)
+        self.hung = set(hung)
+        self.payloads = []
+
+    def submit(self, payload):
+        if payload["shard"] in self.refused:
+            raise ConnectionError("invoke refused")
+        self.payloads.append(payload)
+        future = Future()
+        if payload["shard"] in self.hung:
+            return future
+        if payload["shard"] in self.failing:
+            future.set_exception(RuntimeError("worker crashed"))
+        else:
+            future.set_result(scrape_shard(payload))
+        return future
+
+def test_ring_is_stable_and_moves_few_companies():
+    """Test that shard assignment ignores spelling and adding a shard moves roughly 1/n of companies."""
+    companies = [f"Company {i}" for i in range(2000)]
+    four, five = ShardRing(4), ShardRing(5)
+
+    assert four.shard_for("Acme Inc.") == four.shard_for("acme")
+    assert min(len(shard) for shard in four.partition(companies)) > 2000 / 4 * 0.7
+    moved = sum(four.shard_for(c) != five.shard_for(c) for c in companies)
+    assert moved < 2000 * 0.3
+
+def test_coordinator_merges_shards_into_one_notify_stage():
+    """Test that shard results are diffed and queued once, and a failed shard is deferred."""
+    db = Mock()
+    db.get_scraper_config.side_effect = make_config
+    db.get_companies.return_value = []
+    clients.use("firestore", db)
+    clients.use("scraper", FakeScraper(jobs=2))
+
+    ring = ShardRing(3)
+    failing = ring.shard_for(COMPANIES[0])
+    backend = InlineBackend(failing=[failing])
+    outbox = Mock()
+    outbox.enqueue.side_effect = lambda jobs, users, index=None: len(jobs)
+    outbox.drain.return_value = {"notifications": 1}
+    users = [UserProfile(push_token="ExponentPushToken[a]", user_id="a", filters=UserFilters())]
+    cursor = ScanCursor()
+
+    deferred = []
+    coordinator = Coordinator(backend, 3)
+    cycle = ScanCycle(db, None, None, outbox, metrics=coordinator.metrics)
+    with patch('src.pipeline.cycle.Config.NEAR_DUPLICATE_ENABLED', False):
+        stats = cycle.consume(
+            coordinator.scrape(COMPANIES, cursor, deferred=deferred),
+            users, set(), cursor=cursor, deferred=deferred,
+        )
+
+    failed = ring.partition(COMPANIES)[failing]
+    assert sorted(stats["deferred"]) == sorted(failed)
+    assert stats["companies_scraped"] == len(COMPANIES) - len(failed)
+    assert stats["new_jobs"] == 2 * stats["companies_scraped"]
+    assert set(cursor.next_due) == set(COMPANIES) - set(failed)
+    assert coordinator.metrics.stages["config_fetch"]
+
+def test_coordinator_contains_dispatch_failures_and_hung_shards():
+    """Test that a refused shard becomes error results and a shard still running at the deadline is deferred."""
+    db = Mock()
+    db.get_scraper_config.side_effect = make_config
+    clients.use("firestore", db)
+    clients.use("scraper", FakeScraper(jobs=2))
+
+    ring = ShardRing(3)
+    shards = ring.partition(COMPANIES)
+    backend = InlineBackend(refused=[0], hung=[1])
+    budget = TimeBudget(FakeLambdaContext(timeout_ms=400), reserve_ms=200)
+    cursor = ScanCursor(cost_ms={c: 1.0 for c in COMPANIES})
+    deferred = []
+
+    started = time.monotonic()
+    with patch('src.scheduling.budget.Config.SCHEDULER_RESERVE_MS', 0):
+        results = list(Coordinator(backend, 3).scrape(COMPANIES, cursor, budget=budget, deferred=deferred))
+
+    assert time.monotonic() - started < 2
+    errors = {r.company: r for r in results if r.error}
+    assert sorted(errors) == sorted(shards[0])
+    assert all(r.failure == "network" for r in errors.values())
+    assert sorted(deferred) == sorted(shards[1])
+    assert sorted(r.company for r in results if r.error is None) == sorted(shards[2])
+
+def test_lambda_shard_stops_at_the_coordinators_deadline():
+    """Test that a shard with a long Lambda timeout still defers work the coordinator has no time left for."""
+    db = Mock()
+    db.get_scraper_config.side_effect = make_config
+    db.get_companies.return_value = []
+    clients.use("firestore", db)
+    clients.use("scraper", FakeScraper(jobs=2))
+    context = Mock(get_remaining_time_in_millis=Mock(return_value=900000))
+
+    with patch('src.scheduling.budget.Config.SCHEDULER_RESERVE_MS', 20000):
+        late = scrape_shard({"shard": 0, "companies": COMPANIES[:3], "budget_ms": 5000}, context)
+        on_time = scrape_shard({"shard": 0, "companies": COMPANIES[:3], "budget_ms": 600000}, context)
+        context.get_remaining_time_in_millis.return_value = 5000
+        own_timeout = scrape_shard({"shard": 0, "companies": COMPANIES[:3], "budget_ms": 600000}, context)
+
+    assert late["results"] == [] and late["deferred"] == COMPANIES[:3]
+    assert len(on_time["results"]) == 3
+    assert own_timeout["deferred"] == COMPANIES[:3]
+
+def test_process_pool_backend_runs_shards_in_workers(tmp_path):
+    """Test that shards run in spawned processes with clients from the initializer."""
+    with patch.dict(os.environ), patch('src.fanout.backends.Config.FANOUT_PROCESS_INITIALIZER', None):
+        write_fakes_spec(str(tmp_path / "fakes.json"), [make_config(c) for c in COMPANIES], scraper="fake", jobs=3)
+        backend = ProcessPoolBackend(2)
+        try:
+            results = list(Coordinator(backend, 2).scrape(COMPANIES, ScanCursor()))
+        finally:
+            backend.close()
+
+    assert sorted(r.company for r in results) == sorted(COMPANIES)
+    assert all(len(r.jobs) == 3 and r.jobs[0].id for r in results)
+    assert results[0].jobs[0].source_url == results[0].config.career_url
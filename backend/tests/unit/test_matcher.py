@@ -0,0 +1,60 @@
+import random
+import pytest
+from src.notifier.matcher import FilterIndex, TermAutomaton
+from src.models import JobPosting, UserProfile, UserFilters
+
+COMPANIES = ["Anthropic", "OpenAI", "Google", "Google DeepMind", "Meta", ""]
+TERMS = ["engineer", "new grad", "ML", "research", "intern", "eng", "", "Product"]
+
+def make_job(company, role):
+    return JobPosting(
+        id="auto",
+        company=company,
+        role=role,
+        location="Remote",
+        source_url="https://example.com/careers",
+    )
+
+def test_automaton_finds_overlapping_terms():
+    """Test that every term occurring in the text is reported, including nested ones."""
+    automaton = TermAutomaton(["he", "she", "his", "hers"])
+    found = {automaton.terms[i] for i in automaton.search("ushers")}
+    assert found == {"he", "she", "hers"}
+
+def test_filter_index_matches_user_filters():
+    """Test that the index agrees with UserFilters.matches on random filters."""
+    rng = random.Random(42)
+    users = [
+        UserProfile(
+            push_token=f"ExponentPushToken[{i}]",
+            filters=UserFilters(
+                companies=rng.sample(COMPANIES, rng.randint(0, 2)),
+                roles=rng.sample(TERMS, rng.randint(0, 2)),
+                keywords=rng.sample(TERMS, rng.randint(0, 1)),
+                exclude_keywords=rng.sample(TERMS, rng.randint(0, 1)) if i % 5 == 0 else [],
+                match_mode="word" if i % 7 == 0 else "substring",
+            ),
+        )
+        for i in range(300)
+    ]
+    jobs = [
+        make_job("Google DeepMind", "Research Engineer"),
+        make_job("OpenAI", "Software Engineer - New Grad"),
+        make_job("Anthropic", "ML Intern"),
+        make_job("Meta", "Product Manager"),
+        make_job("Stripe", "Accountant"),
+    ]
+
+    index = FilterIndex(users)
+    for job in jobs:
+        expected = {i for i, user in enumerate(users) if user.filters.matches(job)}
+        assert index.match(job) == expected
+
+def test_filter_index_groups_jobs_in_order():
+    """Test that match_all keeps each user's jobs in discovery order."""
+    users = [UserProfile(push_token="ExponentPushToken[a]", filters=UserFilters(roles=["engineer"]))]
+    jobs = [make_job("OpenAI", "Research Engineer"), make_job("Meta", "Designer"), make_job("Meta", "Engineer")]
+
+    matches = FilterIndex(users).match_all(jobs)
+
+    assert [job.company for job in matches[0]] == ["OpenAI", "Meta"]
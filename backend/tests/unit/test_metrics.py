@@ -0,0 +1,77 @@
+import json
+import pytest
+from unittest.mock import patch
+from src.metrics.recorder import CycleMetrics, percentile, recording, timed
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentiles, including the empty case."""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile([], 95) == 0.0
+
+def test_summary_ranks_slowest_companies():
+    """Test that the summary reports stage stats, outcomes and the slowest companies first."""
+    metrics = CycleMetrics()
+    metrics.add_timing("page_load", 100.0)
+    metrics.add_timing("page_load", 300.0)
+    metrics.record_company("Fast", "ok", 150.0, jobs_found=10, new_jobs=1)
+    metrics.record_company("Slow", "error", 9000.0)
+    metrics.incr("new_jobs")
+
+    summary = metrics.summary()
+
+    assert summary["stages"]["page_load"]["count"] == 2
+    assert summary["stages"]["page_load"]["max_ms"] == 300.0
+    assert summary["companies"]["outcomes"] == {"ok": 1, "error": 1}
+    assert summary["companies"]["slowest"][0]["company"] == "Slow"
+    assert summary["counters"] == {"new_jobs": 1}
+
+def test_timed_records_only_inside_a_cycle():
+    """Test that timed() is a no-op without an active cycle."""
+    metrics = CycleMetrics()
+    with timed("extraction"):
+        pass
+    with recording(metrics):
+        with timed("extraction"):
+            pass
+
+    assert len(metrics.stages["extraction"]) == 1
+
+@patch('src.metrics.recorder.Config.METRICS_FORMAT', "emf")
+def test_emf_records_declare_their_metrics():
+    """Test that EMF records carry CloudWatch metadata matching their fields."""
+    metrics = CycleMetrics()
+    metrics.add_timing("diff", 2.0)
+    metrics.record_company("Acme", "ok", 1200.0, jobs_found=3, peak_memory_mb=412.5)
+
+    records = [json.loads(json.dumps(r)) for r in metrics.records()]
+    stage, company = records
+
+    assert stage["Stage"] == "diff" and stage["DurationMs"] == [2.0]
+    assert stage["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Stage"]]
+    # Company is a property, so metrics do not multiply per company
+    assert company["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Outcome"]]
+    assert company["Company"] == "Acme" and company["Outcome"] == "ok"
+    declared = {m["Name"] for m in company["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+    assert declared == {"LatencyMs", "JobsFound", "NewJobs", "PeakMemoryMb"}
+    assert all(name in company for name in declared)
+
+@patch('src.metrics.recorder.Config.FIRESTORE_READ_BUDGET', 100)
+def test_firestore_usage_merges_and_checks_read_budget(capsys):
+    """Test that Firestore usage is summed per method, merged from workers and warned about over budget."""
+    metrics = CycleMetrics()
+    metrics.record_firestore("get_users", 60, 0, 6000, 40.0)
+    metrics.record_firestore("add_seen_jobs", 0, 25, 0, 15.0)
+    assert metrics.check_read_budget() is False
+
+    metrics.merge_firestore("get_scraper_config", {"reads": 50, "writes": 0, "bytes_read": 9000,
+                                                   "latency_ms": [5.0, 7.0]})
+    assert metrics.check_read_budget() is True
+
+    usage = metrics.summary()["firestore"]
+    assert (usage["reads"], usage["writes"], usage["bytes_read"]) == (110, 25, 15000)
+    assert list(usage["methods"]) == ["get_users", "get_scraper_config", "add_seen_jobs"]
+    assert usage["methods"]["get_scraper_config"]["calls"] == 2
+    assert metrics.counters == {"firestore_over_budget": 1}
+    assert "over the budget of 100" in capsys.readouterr().out
@@ -1,6 +1,6 @@
 import pytest
 from datetime import datetime
-from src.models import JobPosting, UserProfile, UserFilters, ScraperConfig
+from src.models import JobPosting, JobRecord, UserProfile, UserFilters, ScraperConfig
 
 def test_job_posting_creation():
     """Test JobPosting model creation and validation."""
@@ -61,3 +61,55 @@ def test_scraper_config_validation():
 
     assert config.company == "Anthropic"
     assert config.is_learned is True
+
+def make_job(role, company="Google"):
+    return JobPosting(id="auto", company=company, role=role, location="NYC", source_url="x")
+
+def test_user_filters_compile_normalized_terms():
+    """Test that terms are trimmed, lowercased and deduplicated once."""
+    filters = UserFilters(companies=[" Google ", "google", ""], roles=["SWE"], keywords=["swe", "New Grad"])
+
+    assert filters.company_terms == ("google",)
+    assert filters.search_terms == ("swe", "new grad")
+    assert filters.matches(make_job("SWE - New Grad"))
+    assert not filters.matches(make_job("SWE", company="Meta"))
+
+def test_user_filters_word_mode_and_exclusions():
+    """Test whole-word matching and exclusion terms."""
+    filters = UserFilters(roles=["ML"], exclude_keywords=["senior"], match_mode="word")
+
+    assert filters.matches(make_job("ML Engineer"))
+    assert not filters.matches(make_job("HTML Developer"))
+    assert not filters.matches(make_job("Senior ML Engineer"))
+
+def test_user_filters_regex_mode():
+    """Test regex terms, and that invalid patterns are rejected."""
+    filters = UserFilters(roles=[r"engineer\b.*\b20\d\d"], match_mode="regex")
+
+    assert filters.matches(make_job("Software Engineer, Class of 2026"))
+    assert not filters.matches(make_job("Software Engineer"))
+    with pytest.raises(ValueError):
+        UserFilters(roles=["(unclosed"], match_mode="regex")
+
+def test_job_record_ids_match_job_posting_hash():
+    """Test that bulk-hashed record IDs equal JobPosting.generate_hash."""
+    records = JobRecord.assign_ids([
+        JobRecord(company=" Meta", role="SWE ", location="NYC"),
+        JobRecord(company="Meta", role="Data Scientist", location="Remote"),
+        JobRecord(company="OpenAI", role="SWE", location="SF"),
+    ])
+
+    for record in records:
+        assert record.id == JobPosting.generate_hash(record.company, record.role, record.location)
+
+def test_job_record_materializes_posting():
+    """Test that only to_posting builds the full validated model."""
+    record = JobRecord.assign_ids([JobRecord(company="Meta", role="SWE", location="NYC",
+                                             link="http://x", source_url="http://meta.com")])[0]
+
+    job = record.to_posting()
+
+    assert isinstance(job, JobPosting)
+    assert job.id == record.id
+    assert job.link == "http://x"
+    assert isinstance(job.discovered_at, datetime)
@@ -0,0 +1,78 @@
+import json
+from pathlib import Path
+import pytest
+from src.diff.near_duplicates import (
+    NearDuplicateIndex, drop_near_duplicates, fingerprint, normalize_tokens
+)
+from src.models import JobRecord
+
+FIXTURES = json.loads((Path(__file__).parent.parent / "fixtures" / "near_duplicates.json").read_text())
+
+def is_near_duplicate(a, b, max_distance):
+    index = NearDuplicateIndex([fingerprint(*a)], max_distance=max_distance)
+    return index.find(fingerprint(*b)) is not None
+
+@pytest.mark.parametrize("max_distance", [0, 3, 6])
+def test_precision_and_recall_on_fixtures(max_distance):
+    """Test near-duplicate detection quality on labelled pairs."""
+    true_pos = sum(is_near_duplicate(a, b, max_distance) for a, b in FIXTURES["duplicates"])
+    false_pos = sum(is_near_duplicate(a, b, max_distance) for a, b in FIXTURES["distinct"])
+    false_neg = len(FIXTURES["duplicates"]) - true_pos
+
+    precision = true_pos / (true_pos + false_pos)
+    recall = true_pos / (true_pos + false_neg)
+
+    assert precision >= 0.95
+    assert recall >= 0.9
+
+def test_normalize_tokens_drops_requisition_numbers():
+    """Test that punctuation, abbreviations and requisition IDs are normalized away."""
+    assert normalize_tokens("Sr. Engineer - Payments (Req #123456)") == ["senior", "engineer", "payments"]
+    assert normalize_tokens("Remote, United States") == normalize_tokens("Remote - US")
+
+def test_index_round_trips_through_bytes():
+    """Test that packed fingerprints restore an equivalent index."""
+    index = NearDuplicateIndex([fingerprint("SWE", "NYC"), fingerprint("PM", "SF")])
+
+    restored = NearDuplicateIndex.from_bytes(index.to_bytes(), last_seen=index.last_seen_bytes())
+
+    assert restored.fingerprints == index.fingerprints
+    assert restored.last_seen == index.last_seen
+    assert restored.find(fingerprint("SWE ", "NYC")) is not None
+
+def test_drop_near_duplicates_seeds_from_known_jobs():
+    """Test that an empty index is seeded from jobs already seen on the page."""
+    known = [JobRecord(company="A", role="Data Scientist", location="Remote - US")]
+    new = [
+        JobRecord(company="A", role="Data Scientist #991", location="Remote, US"),
+        JobRecord(company="A", role="Data Engineer", location="Remote, US"),
+    ]
+
+    kept = drop_near_duplicates(NearDuplicateIndex(), new, known)
+
+    assert [job.role for job in kept] == ["Data Engineer"]
+
+def test_relisted_posting_is_new_after_retention():
+    """Test that a closed posting's fingerprint ages out with its seen entry, so a re-listing is notified."""
+    from config import Config
+    job = JobRecord(company="A", role="Data Scientist", location="Remote - US")
+    listed = 700000
+    index = NearDuplicateIndex()
+    assert drop_near_duplicates(index, [job], day=listed) == [job]
+
+    # Closed meanwhile (not on the page), re-listed within the retention window
+    assert drop_near_duplicates(index, [job], day=listed + 10) == []
+
+    relisted = listed + Config.SEEN_JOB_RETENTION_DAYS + 1
+    assert drop_near_duplicates(index, [job], day=relisted) == [job]
+
+def test_open_postings_stay_known_past_retention():
+    """Test that jobs still on the page are refreshed, so their edited copies stay near-duplicates."""
+    from config import Config
+    job = JobRecord(company="A", role="Data Scientist", location="Remote - US")
+    edited = JobRecord(company="A", role="Data Scientist #991", location="Remote, US")
+    index = NearDuplicateIndex()
+    drop_near_duplicates(index, [job], day=700000)
+
+    later = 700000 + Config.SEEN_JOB_RETENTION_DAYS * 2
+    assert drop_near_duplicates(index, [edited], known_jobs=[job], day=later) == []
@@ -1,7 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch
 from src.notifier.expo_push import NotificationService
-from src.models import JobPosting, UserProfile, UserFilters
+from src.models import JobPosting, UserProfile, UserFilters, PushTicketRecord
 
 @pytest.fixture
 def sample_jobs():
@@ -79,3 +79,104 @@ def test_notification_dispatch(mock_push_client, sample_jobs, sample_users):
 
     # Verify publish_multiple was called
     assert mock_client_instance.publish_multiple.called
+
+def make_messages(count):
+    from exponent_server_sdk import PushMessage
+    return [PushMessage(to=f"ExponentPushToken[{i}]", body="hi") for i in range(count)]
+
+@patch('src.notifier.expo_push.PushClient')
+def test_publish_splits_into_chunks(mock_push_client):
+    """Test that messages are sent in chunks within Expo's per-request limit."""
+    mock_client_instance = mock_push_client.return_value
+    mock_client_instance.publish_multiple.return_value = []
+
+    service = NotificationService()
+    summary = service.publish(make_messages(250)).stats
+
+    sizes = sorted(len(call.args[0]) for call in mock_client_instance.publish_multiple.call_args_list)
+    assert sizes == [50, 100, 100]
+    assert summary["chunks"] == 3
+    assert summary["failed_chunks"] == 0
+
+@patch('src.notifier.expo_push.time.sleep')
+@patch('src.notifier.expo_push.PushClient')
+def test_publish_retries_transient_errors(mock_push_client, mock_sleep):
+    """Test that 429/5xx responses are retried per chunk with backoff."""
+    from exponent_server_sdk import PushServerError
+    throttled = PushServerError("Request failed", Mock(status_code=429, headers={}))
+    mock_client_instance = mock_push_client.return_value
+    mock_client_instance.publish_multiple.side_effect = [throttled, []]
+
+    service = NotificationService()
+    summary = service.publish(make_messages(10)).stats
+
+    assert mock_client_instance.publish_multiple.call_count == 2
+    assert mock_sleep.call_count == 1
+    assert summary["retries"] == 1
+    assert summary["failed_chunks"] == 0
+
+@patch('src.notifier.expo_push.time.sleep')
+@patch('src.notifier.expo_push.PushClient')
+def test_publish_isolates_failed_chunk(mock_push_client, mock_sleep):
+    """Test that a chunk failing permanently does not drop the other chunks."""
+    from exponent_server_sdk import PushServerError
+
+    def publish(chunk):
+        if chunk[0].to == "ExponentPushToken[0]":
+            raise PushServerError("Request failed", Mock(status_code=400, headers={}))
+        return []
+
+    mock_client_instance = mock_push_client.return_value
+    mock_client_instance.publish_multiple.side_effect = publish
+
+    service = NotificationService()
+    summary = service.publish(make_messages(150)).stats
+
+    assert summary["failed_chunks"] == 1
+    assert summary["messages_failed"] == 100
+    assert mock_client_instance.publish_multiple.call_count == 2
+    mock_sleep.assert_not_called()
+
+@patch('src.notifier.expo_push.PushClient')
+def test_dispatch_reports_tickets_and_dead_tokens(mock_push_client, sample_jobs, sample_users):
+    """Test that tickets are kept for receipt polling and dead tokens attributed to users."""
+    from exponent_server_sdk import PushTicket
+
+    def publish(chunk):
+        return [
+            PushTicket(push_message=chunk[0], status="ok", message="", details=None, id="ticket-1"),
+            PushTicket(push_message=chunk[1], status="error", message="gone",
+                       details={"error": "DeviceNotRegistered"}, id=""),
+        ]
+
+    mock_push_client.return_value.publish_multiple.side_effect = publish
+    sample_users[0].user_id = "user-a"
+    sample_users[1].user_id = "user-b"
+
+    result = NotificationService().dispatch(sample_jobs, sample_users)
+
+    assert [t.ticket_id for t in result.tickets] == ["ticket-1"]
+    assert result.tickets[0].user_id == "user-a"
+    assert result.unregistered_user_ids == ["user-b"]
+
+@patch('src.notifier.expo_push.PushClient')
+def test_check_receipts_finds_unregistered_devices(mock_push_client):
+    """Test that receipts are fetched in bulk and dead devices reported."""
+    from exponent_server_sdk import PushTicket
+    mock_push_client.return_value.check_receipts_multiple.return_value = [
+        PushTicket(push_message=None, status="ok", message="", details=None, id="t1"),
+        PushTicket(push_message=None, status="error", message="gone",
+                   details={"error": "DeviceNotRegistered"}, id="t2"),
+    ]
+    tickets = [
+        PushTicketRecord(ticket_id="t1", push_token="ExponentPushToken[a]", user_id="a"),
+        PushTicketRecord(ticket_id="t2", push_token="ExponentPushToken[b]", user_id="b"),
+        PushTicketRecord(ticket_id="t3", push_token="ExponentPushToken[c]", user_id="c"),
+    ]
+
+    resolved, unregistered = NotificationService().check_receipts(tickets)
+
+    # t3 has no receipt yet, so it stays pending
+    assert sorted(resolved) == ["t1", "t2"]
+    assert unregistered == ["b"]
+    assert mock_push_client.return_value.check_receipts_multiple.call_count == 1
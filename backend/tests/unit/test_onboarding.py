@@ -0,0 +1,104 @@
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from src.models import CompanyEntry, JobRecord, ScraperConfig
+from src.onboarding import Onboarding, read_companies
+
+def learned_config(company, career_url, html):
+    return ScraperConfig(
+        company=company,
+        career_url=career_url,
+        job_container_selector=".job",
+        title_selector="h3",
+        location_selector=".loc",
+        link_selector="a",
+    )
+
+def job(config):
+    return JobRecord(company=config.company, role="Engineer", location="Remote", link=f"{config.career_url}/1",
+                     source_url=config.career_url)
+
+@pytest.fixture
+def companies_csv(tmp_path):
+    path = tmp_path / "companies.csv"
+    path.write_text(
+        "company,career_url,aliases,browser\n"
+        "Acme,https://acme.com/jobs,Acme Corp;ACME,\n"
+        "Globex,https://globex.com/careers,,chromium\n"
+        "Initech,https://initech.com/jobs,,\n"
+        "Umbrella,https://umbrella.com/jobs,,\n"
+        "Hooli,https://hooli.com/jobs,,\n"
+    )
+    return str(path)
+
+def test_onboarding_learns_validates_and_resumes(companies_csv):
+    """Test that companies are learned, validated and saved, learned ones skipped, and failures reported by stage."""
+    db = Mock()
+    db.get_companies.return_value = [CompanyEntry(name="Acme", aliases=["Acme Inc"])]
+    db.get_scraper_config.side_effect = lambda company: (
+        learned_config(company, "https://hooli.com/jobs", "") if company == "Hooli" else None
+    )
+    scraper = Mock()
+    scraper.fetch_html_for_learning.side_effect = lambda url, browser=None: f"<html>{url}</html>"
+    scraper.scrape_company.side_effect = lambda config: [] if config.company == "Initech" else [job(config)]
+    learner = Mock()
+
+    def learn(company, career_url, html):
+        if company == "Umbrella":
+            raise ValueError("Invalid JSON")
+        return learned_config(company, career_url, html)
+
+    learner.learn_selectors.side_effect = learn
+
+    report = Onboarding(db, scraper, learner, browsers=2, llm_calls=2).run(read_companies(companies_csv))
+
+    assert (report["learned"], report["skipped"], report["failed"]) == (2, 1, 2)
+    assert report["failures"] == {"validate:selector": 1, "learn:learning": 1}
+    saved = {config.company: config for config in (c.args[0] for c in db.save_scraper_config.call_args_list)}
+    assert set(saved) == {"Acme", "Globex"}
+    assert saved["Globex"].browser == "chromium"
+    scraper.fetch_html_for_learning.assert_any_call("https://globex.com/careers", browser="chromium")
+    registered = {entry.name: entry for entry in (c.args[0] for c in db.save_company.call_args_list)}
+    assert registered["Acme"].aliases == ["Acme Inc", "Acme Corp", "ACME"]
+    assert registered["Acme"].career_url == "https://acme.com/jobs"
+    assert scraper.close_thread_browser.call_count == 2
+    assert set(report["stages"]) >= {"fetch", "learn", "validate"}
+
+def test_onboarding_bounds_browsers_and_llm_calls(companies_csv):
+    """Test that no more pages load and no more learning calls run at once than allowed."""
+    lock = threading.Lock()
+    active = {"browser": 0, "llm": 0}
+    peak = {"browser": 0, "llm": 0}
+
+    def busy(kind, value):
+        def call(*args, **kwargs):
+            with lock:
+                active[kind] += 1
+                peak[kind] = max(peak[kind], active[kind])
+            time.sleep(0.01)
+            with lock:
+                active[kind] -= 1
+            return value(*args, **kwargs)
+        return call
+
+    db = Mock()
+    db.get_companies.return_value = []
+    db.get_scraper_config.return_value = None
+    scraper = Mock()
+    scraper.fetch_html_for_learning.side_effect = busy("browser", lambda url, browser=None: "<html></html>")
+    scraper.scrape_company.side_effect = busy("browser", lambda config: [job(config)])
+    learner = Mock()
+    learner.learn_selectors.side_effect = busy("llm", learned_config)
+
+    report = Onboarding(db, scraper, learner, browsers=2, llm_calls=1).run(read_companies(companies_csv))
+
+    assert report["learned"] == 5
+    assert peak == {"browser": 2, "llm": 1}
+
+def test_read_companies_rejects_unknown_browsers(tmp_path):
+    """Test that a CSV naming an unsupported engine fails before anything is onboarded."""
+    path = tmp_path / "companies.csv"
+    path.write_text("company,career_url,browser\nAcme,https://acme.com/jobs,edge\n")
+    with pytest.raises(ValueError, match="edge"):
+        read_companies(str(path))
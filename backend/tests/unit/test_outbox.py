@@ -0,0 +1,54 @@
+import pytest
+from unittest.mock import Mock
+from src.notifier.outbox import NotificationOutbox
+from src.notifier.expo_push import DispatchResult
+from src.models import JobPosting, OutboxEntry, UserProfile, UserFilters
+
+@pytest.fixture
+def users():
+    return [
+        UserProfile(push_token="ExponentPushToken[a]", filters=UserFilters(companies=["Anthropic"]), user_id="a"),
+        UserProfile(push_token="ExponentPushToken[b]", filters=UserFilters(roles=["research"]), user_id="b"),
+    ]
+
+@pytest.fixture
+def jobs():
+    return [
+        JobPosting(id="job1", company="Anthropic", role="Research Engineer", location="SF", source_url="x"),
+        JobPosting(id="job2", company="OpenAI", role="Designer", location="SF", source_url="x"),
+    ]
+
+def test_dedupe_key_is_stable():
+    """Test that the same (user, job) delivery always maps to the same key."""
+    job = JobPosting(id="job1", company="A", role="R", location="L", source_url="x")
+    user = UserProfile(push_token="ExponentPushToken[a]", filters=UserFilters(), user_id="a")
+
+    assert OutboxEntry.for_job(user, job).dedupe_key == OutboxEntry.for_job(user, job).dedupe_key
+
+def test_enqueue_matches_users(users, jobs):
+    """Test that one delivery is queued per matching (user, job) pair."""
+    db = Mock()
+    db.enqueue_outbox.side_effect = len
+    outbox = NotificationOutbox(db, Mock())
+
+    queued = outbox.enqueue(jobs, users)
+
+    entries = db.enqueue_outbox.call_args[0][0]
+    assert queued == 2
+    assert sorted((e.user_id, e.job_id) for e in entries) == [("a", "job1"), ("b", "job1")]
+
+def test_drain_keeps_failed_deliveries_pending(users, jobs):
+    """Test that deliveries in failed chunks are retried, others marked sent."""
+    entries = [OutboxEntry.for_job(users[0], jobs[0]), OutboxEntry.for_job(users[1], jobs[0])]
+    db = Mock()
+    db.get_pending_outbox.side_effect = [entries, []]
+    notifier = Mock()
+    notifier.publish.return_value = DispatchResult(failed_tokens=["ExponentPushToken[b]"])
+    outbox = NotificationOutbox(db, notifier)
+
+    stats = outbox.drain()
+
+    assert stats["delivered"] == 1
+    assert stats["failed"] == 1
+    assert db.mark_outbox_sent.call_args[0][0] == [entries[0]]
+    assert db.mark_outbox_failed.call_args[0][0] == [entries[1]]
@@ -0,0 +1,73 @@
+import os
+import pytest
+from unittest.mock import patch
+from src.metrics.profiling import CycleProfiler
+from src.metrics.recorder import CycleMetrics
+
+def _allocate():
+    return [str(i) * 10 for i in range(5000)]
+
+@patch('src.metrics.profiling.Config.PROFILE_MODE', "off")
+def test_from_config_is_off_unless_enabled_or_forced():
+    """Test that profiling is off by default but an event can force it."""
+    assert CycleProfiler.from_config(None) is None
+
+    forced = CycleProfiler.from_config({"profile": "stages"})
+    assert forced is not None
+    assert forced.mode == "stages"
+
+@patch('src.metrics.profiling.Config.PROFILE_MODE', "cycle")
+@patch('src.metrics.profiling.Config.PROFILE_SAMPLE_RATE', 0.25)
+def test_from_config_samples_cycles():
+    """Test that PROFILE_SAMPLE_RATE decides which cycles are profiled."""
+    with patch('src.metrics.profiling.random.random', return_value=0.9):
+        assert CycleProfiler.from_config(None) is None
+    with patch('src.metrics.profiling.random.random', return_value=0.1):
+        assert CycleProfiler.from_config(None).mode == "cycle"
+
+def _scrape_work():
+    return len(_allocate())
+
+def test_cycle_profile_covers_threads_it_starts(tmp_path):
+    """Test that "cycle" mode profiles the worker threads, not only the thread waiting on them."""
+    import pstats
+    import threading
+
+    profiler = CycleProfiler("cycle", trace_allocations=False)
+    with profiler.profile("cycle", threads=True):
+        worker = threading.Thread(target=_scrape_work)
+        worker.start()
+        worker.join()
+
+    with patch('src.metrics.profiling.Config.PROFILE_DIR', str(tmp_path)), \
+         patch('src.metrics.profiling.Config.PROFILE_S3_BUCKET', None):
+        paths = profiler.flush()
+
+    stats = pstats.Stats(next(p for p in paths if p.endswith(".prof")))
+    assert "_scrape_work" in {func for _, _, func in stats.stats}
+
+def test_selected_stages_are_profiled_and_flushed(tmp_path):
+    """Test that only selected stages are profiled, merged per stage and written out."""
+    profiler = CycleProfiler("stages", stages=["extraction"])
+    metrics = CycleMetrics(profiler=profiler)
+
+    for _ in range(2):
+        with metrics.stage("extraction"):
+            kept = _allocate()
+    with metrics.stage("diff"):
+        _allocate()
+
+    report = profiler.allocation_report("extraction")
+    assert report and report[0][1] > 0
+
+    with patch('src.metrics.profiling.Config.PROFILE_DIR', str(tmp_path)), \
+         patch('src.metrics.profiling.Config.PROFILE_S3_BUCKET', None):
+        paths = profiler.flush()
+
+    assert sorted(os.path.basename(p).split("-")[-1] for p in paths) == ["extraction.prof", "extraction.txt"]
+    with open(next(p for p in paths if p.endswith(".txt"))) as f:
+        summary = f.read()
+    assert "2 profiled run(s)" in summary
+    assert "Top allocations" in summary
+    assert len(metrics.stages["extraction"]) == 2
+    del kept
@@ -0,0 +1,50 @@
+import pytest
+from src.models import CompanyEntry, UserProfile, UserFilters
+from src.registry.companies import CompanyRegistry, normalize_company
+
+def make_user(user_id, companies, roles=None):
+    return UserProfile(
+        push_token=f"ExponentPushToken[{user_id}]",
+        user_id=user_id,
+        filters=UserFilters(companies=companies, roles=roles or []),
+    )
+
+def test_normalize_company_ignores_case_punctuation_and_suffixes():
+    """Test that spelling variants of a company share one key."""
+    assert normalize_company("  Stripe, Inc. ") == normalize_company("stripe") == "stripe"
+    assert normalize_company("Johnson & Johnson") == "johnson & johnson"
+    assert normalize_company("Co") == "co"
+
+def test_canonicalize_merges_aliases_and_spellings():
+    """Test that aliases and spelling variants become one company and the report counts the removed scrapes."""
+    registry = CompanyRegistry([
+        CompanyEntry(name="Google", aliases=["Alphabet"], career_url="https://careers.google.com"),
+    ])
+    users = [
+        make_user("a", ["google ", "Alphabet"]),
+        make_user("b", ["Google", "openai"]),
+        make_user("c", ["OpenAI"], roles=["engineer"]),
+        make_user("d", ["OpenAI"]),
+    ]
+
+    resolved, report = registry.canonicalize(users)
+
+    assert resolved[0].filters.companies == ["Google"]
+    assert resolved[1].filters.companies == ["Google", "OpenAI"]
+    assert resolved[2] is users[2]  # Unchanged users are not rebuilt
+    assert resolved[2].filters.roles == ["engineer"]
+    assert report["company_spellings"] == 5
+    assert report["companies"] == 2
+    assert report["duplicate_scrapes_removed"] == 3
+    assert report["merged"]["Google"] == ["Alphabet", "Google", "google "]
+    assert registry.career_url("alphabet") == "https://careers.google.com"
+
+def test_canonicalize_keeps_spellings_without_a_key():
+    """Test that a filter of only punctuation is kept as typed instead of emptying into "any company"."""
+    users = [make_user("a", ["!!!"]), make_user("b", ["  ", "stripe", "Stripe"])]
+
+    resolved, report = CompanyRegistry().canonicalize(users)
+
+    assert resolved[0].filters.companies == ["!!!"]
+    assert resolved[1].filters.companies == ["  ", "Stripe"]
+    assert report["company_spellings"] == 2
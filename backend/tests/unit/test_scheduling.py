@@ -0,0 +1,159 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from src.scheduling.budget import FakeLambdaContext, TimeBudget, plan_companies
+from src.scheduling.frequency import observe_scan
+from src.scheduling.health import observe_health
+from src.scheduling.timeouts import observe_load, page_timeout_ms
+from src.pipeline.cycle import ScanCycle
+from src.models import ScanCursor, ScraperConfig, UserProfile, UserFilters
+
+COMPANIES = ["A", "B", "C", "D", "E"]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_config(company):
+    return ScraperConfig(
+        company=company,
+        career_url=f"https://{company.lower()}.com/careers",
+        job_container_selector=".job",
+        title_selector="h3",
+        location_selector=".loc",
+        link_selector="a",
+    )
+
+def test_plan_puts_unscanned_then_stalest_first():
+    """Test that never-scanned companies lead, then oldest scans, with priority breaking ties."""
+    now = datetime(2026, 1, 1)
+    cursor = ScanCursor(last_scanned={"A": now, "B": now - timedelta(hours=1)})
+
+    order = plan_companies(["A", "B", "C", "D"], cursor, priority={"D": 5, "C": 1})
+
+    assert order == ["D", "C", "B", "A"]
+
+def test_plan_groups_companies_by_browser():
+    """Test that companies sharing an engine are scanned back to back, engines ordered by their most urgent company."""
+    cursor = ScanCursor(browsers={"B": "chromium", "D": "chromium"})
+
+    order = plan_companies(["A", "B", "C", "D"], cursor, priority={"B": 4, "A": 3, "D": 2, "C": 1})
+
+    assert order == ["B", "D", "A", "C"]
+
+def test_budget_unlimited_without_context():
+    """Test that local runs without a context never defer work."""
+    assert TimeBudget(None).can_start(10 ** 9)
+
+@patch('src.pipeline.cycle.Config.SCRAPER_CONCURRENCY', 1)
+@patch('src.pipeline.cycle.Config.OUTBOX_DRAIN_INLINE', False)
+def test_cycle_defers_work_and_resumes_from_cursor():
+    """Test that a short invocation stops before the deadline and the next one covers the rest."""
+    clock = FakeClock()
+    db = Mock()
+    db.get_scraper_config.side_effect = make_config
+
+    def scrape(config):
+        clock.now += 1.0  # Every company takes a second
+        return []
+
+    scraper = Mock()
+    scraper.scrape_company.side_effect = scrape
+    users = [UserProfile(push_token="ExponentPushToken[a]", filters=UserFilters(companies=COMPANIES))]
+    cursor = ScanCursor(cost_ms={company: 1000 for company in COMPANIES})
+
+    first = plan_companies(COMPANIES, cursor)
+    budget = TimeBudget(FakeLambdaContext(timeout_ms=3500, clock=clock), reserve_ms=500)
+    stats = ScanCycle(db, scraper, Mock(), Mock()).run(first, users, set(), budget=budget, cursor=cursor)
+
+    assert stats["deferred"] == ["D", "E"]
+    assert clock.now == 3.0
+
+    # The next invocation picks up the companies the last one did not reach
+    second = plan_companies(COMPANIES, cursor)
+    assert second == ["D", "E"]
+
+    budget = TimeBudget(FakeLambdaContext(timeout_ms=3500, clock=clock), reserve_ms=500)
+    stats = ScanCycle(db, scraper, Mock(), Mock()).run(second, users, set(), budget=budget, cursor=cursor)
+
+    assert stats["deferred"] == []
+    assert set(cursor.last_scanned) == set(COMPANIES)
+
+@patch('src.scheduling.frequency.Config.SCHEDULER_MIN_INTERVAL_S', 900)
+@patch('src.scheduling.frequency.Config.SCHEDULER_MAX_INTERVAL_S', 6 * 3600)
+@patch('src.scheduling.frequency.Config.SCHEDULER_TARGET_NEW_JOBS', 0.5)
+def test_interval_adapts_to_posting_rate():
+    """Test that busy companies are rescanned every tick and quiet ones back off to the ceiling."""
+    cursor = ScanCursor()
+    start = datetime(2026, 1, 1)
+
+    for hour in range(12):
+        at = start + timedelta(hours=hour)
+        observe_scan(cursor, "Busy", 1000, new_jobs=3, scanned_at=at)
+        observe_scan(cursor, "Quiet", 1000, new_jobs=0, scanned_at=at)
+
+    assert cursor.next_due["Busy"] - cursor.last_scanned["Busy"] == timedelta(minutes=15)
+    assert cursor.next_due["Quiet"] - cursor.last_scanned["Quiet"] == timedelta(hours=6)
+
+    now = start + timedelta(hours=11, minutes=30)
+    assert plan_companies(["Busy", "Quiet"], cursor, now=now) == ["Busy"]
+
+def test_plan_prefers_subscribers_among_equally_stale():
+    """Test that subscriber count raises a company's urgency."""
+    now = datetime(2026, 1, 1)
+    cursor = ScanCursor()
+    for company in ["A", "B"]:
+        observe_scan(cursor, company, 1000, new_jobs=0, scanned_at=now - timedelta(days=1))
+
+    assert plan_companies(["A", "B"], cursor, priority={"B": 50, "A": 1}, now=now) == ["B", "A"]
+
+@patch('src.scheduling.health.Config.SCHEDULER_BREAKER_THRESHOLD', 3)
+@patch('src.scheduling.health.Config.SCHEDULER_BREAKER_BASE_S', 1800)
+def test_breaker_opens_backs_off_and_closes_on_probe():
+    """Test that repeated failures open the breaker with growing backoff and a successful probe closes it."""
+    cursor = ScanCursor()
+    at = datetime(2026, 1, 1)
+
+    def scan(new_jobs, failure=None):
+        observe_scan(cursor, "Down", 30000, new_jobs=new_jobs, scanned_at=at)
+        observe_health(cursor, "Down", failure, error="boom" if failure else None, scanned_at=at)
+
+    for _ in range(2):
+        scan(None, "timeout")
+    assert cursor.health["Down"].state(at) == "closed"
+    assert cursor.next_due["Down"] == at + timedelta(minutes=15)
+
+    scan(None, "timeout")
+    assert cursor.health["Down"].state(at) == "open"
+    assert cursor.next_due["Down"] == at + timedelta(minutes=30)
+    assert plan_companies(["Down"], cursor, now=at + timedelta(minutes=20)) == []
+
+    # The half-open probe fails: open again for twice as long
+    at += timedelta(minutes=30)
+    assert cursor.health["Down"].state(at) == "half_open"
+    assert plan_companies(["Down"], cursor, now=at) == ["Down"]
+    scan(None, "timeout")
+    assert cursor.next_due["Down"] == at + timedelta(hours=1)
+
+    at += timedelta(hours=1)
+    scan(2)
+    assert "Down" not in cursor.health
+
+def test_page_timeout_learned_from_load_times():
+    """Test that fast sites get short timeouts, slow ones long ones, and timeouts grow after a timed-out load."""
+    cursor = ScanCursor()
+    assert page_timeout_ms(cursor, "Fast") is None
+
+    for _ in range(5):
+        observe_load(cursor, "Fast", 800.0)
+        observe_load(cursor, "Slow", 25000.0)
+    assert page_timeout_ms(cursor, "Fast") == 5000  # SCRAPER_MIN_TIMEOUT_MS
+    assert page_timeout_ms(cursor, "Slow") == 50000
+
+    for _ in range(30):
+        observe_load(cursor, "Slow", page_timeout_ms(cursor, "Slow"))
+    assert len(cursor.load_ms["Slow"]) == 20
+    assert page_timeout_ms(cursor, "Slow") == 60000  # SCRAPER_MAX_TIMEOUT_MS
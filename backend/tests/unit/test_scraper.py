@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import Mock, patch
 from src.scraper.playwright_scraper import CareerPageScraper
 from src.models import ScraperConfig, JobPosting
+from src.scraper.errors import PageTooLargeError, SelectorError
 
 @pytest.fixture
 def sample_config():
@@ -120,3 +121,189 @@ def test_scraper_handles_timeouts(sample_config):
 
         with pytest.raises(TimeoutError):
             scraper.scrape_company(sample_config)
+
+def test_scraper_reports_selector_breakage(sample_config):
+    """Test that containers yielding no job raise SelectorError, while an empty listing reads as no jobs."""
+    scraper = CareerPageScraper()
+    mock_page = Mock()
+    broken = Mock()
+    broken.locator.return_value.first.text_content.side_effect = RuntimeError("detached")
+    mock_page.locator.return_value.all.return_value = [broken]
+
+    with pytest.raises(SelectorError):
+        scraper._extract_jobs_from_page(mock_page, sample_config)
+
+    mock_page.locator.return_value.all.return_value = []
+    jobs = scraper._extract_jobs_from_page(mock_page, sample_config)
+    assert list(jobs) == []
+    assert jobs.complete is False
+
+def _container(title):
+    container = Mock()
+    container.locator.return_value.first.text_content.return_value = title
+    container.locator.return_value.first.get_attribute.return_value = f"/apply/{title}"
+    return container
+
+@patch('src.scraper.playwright_scraper.Config.SCRAPER_EXTRACTION_CHUNK', 2)
+@patch('src.scraper.playwright_scraper.Config.SCRAPER_MAX_CONTAINERS', 5)
+def test_scraper_caps_containers_and_streams_chunks(sample_config):
+    """Test that extraction reads at most SCRAPER_MAX_CONTAINERS containers, yielding jobs in chunks."""
+    scraper = CareerPageScraper()
+    mock_page = Mock()
+    mock_page.locator.return_value.all.return_value = [_container(f"Role {i}") for i in range(50)]
+
+    chunks = list(scraper.iter_jobs(mock_page, sample_config))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert all(job.id for chunk in chunks for job in chunk)
+
+def test_scraper_stops_at_extraction_deadline(sample_config):
+    """Test that a slow page keeps the jobs extracted before the deadline instead of failing."""
+    scraper = CareerPageScraper()
+    mock_page = Mock()
+    mock_page.locator.return_value.all.return_value = [_container(f"Role {i}") for i in range(10)]
+
+    clock = iter(range(0, 100, 5))
+    with patch('src.scraper.playwright_scraper.Config.SCRAPER_EXTRACTION_TIMEOUT_MS', 12000), \
+         patch('src.scraper.playwright_scraper.time.monotonic', side_effect=lambda: next(clock)):
+        jobs = scraper._extract_jobs_from_page(mock_page, sample_config)
+
+    assert 0 < len(jobs) < 10
+
+def test_scraper_marks_page_incomplete_when_a_container_fails(sample_config):
+    """Test that a container that cannot be read leaves the page incomplete, so its postings are not closed."""
+    scraper = CareerPageScraper()
+    mock_page = Mock()
+    broken = Mock()
+    broken.locator.return_value.first.text_content.side_effect = RuntimeError("detached")
+    mock_page.locator.return_value.all.return_value = [_container("Role 0"), broken]
+
+    jobs = scraper._extract_jobs_from_page(mock_page, sample_config)
+
+    assert [job.role for job in jobs] == ["Role 0"]
+    assert jobs.complete is False
+
+    mock_page.locator.return_value.all.return_value = [_container("Role 0")]
+    assert scraper._extract_jobs_from_page(mock_page, sample_config).complete is True
+
+@patch('src.scraper.playwright_scraper.Config.SCRAPER_FIELD_TIMEOUT_MS', 1000)
+def test_scraper_reads_fields_with_a_short_timeout(sample_config):
+    """Test that a missing location waits one field timeout, not the extraction deadline."""
+    from playwright.sync_api import TimeoutError
+
+    scraper = CareerPageScraper()
+    mock_page = Mock()
+    no_location = _container("Role 0")
+    no_location.locator.return_value.first.text_content.side_effect = ["Role 0", TimeoutError("Timeout 1000ms exceeded")]
+    mock_page.locator.return_value.all.return_value = [no_location, _container("Role 1")]
+
+    jobs = scraper._extract_jobs_from_page(mock_page, sample_config)
+
+    assert [(job.role, job.location) for job in jobs] == [("Role 0", ""), ("Role 1", "Role 1")]
+    for call in no_location.locator.return_value.first.text_content.call_args_list:
+        assert call.kwargs["timeout"] <= 1000
+
+@patch('src.scraper.playwright_scraper.Config.SCRAPER_MAX_DOM_NODES', 1000)
+def test_scraper_refuses_oversized_pages(sample_config):
+    """Test that a page over the DOM-size guard fails fast with PageTooLargeError."""
+    scraper = CareerPageScraper()
+
+    with patch('src.scraper.playwright_scraper.sync_playwright') as mock_pw:
+        mock_browser = Mock()
+        mock_pw.return_value.__enter__.return_value.webkit.launch.return_value = mock_browser
+        mock_page = Mock()
+        mock_browser.new_page.return_value = mock_page
+        mock_page.goto.return_value.status = 200
+        mock_page.evaluate.return_value = 250000
+
+        with pytest.raises(PageTooLargeError):
+            scraper.scrape_company(sample_config)
+
+    mock_page.locator.assert_not_called()
+    mock_page.close.assert_called_once()
+
+def _har_browser(mock_pw):
+    mock_browser = Mock()
+    mock_pw.return_value.__enter__.return_value.webkit.launch.return_value = mock_browser
+    mock_page = mock_browser.new_context.return_value.new_page.return_value
+    mock_page.goto.return_value.status = 200
+    mock_page.evaluate.return_value = 100
+    mock_page.locator.return_value.all.return_value = [_container("Role 1")]
+    return mock_browser
+
+def test_scraper_records_and_replays_har(sample_config, tmp_path):
+    """Test that HAR mode records page loads per URL and replays them without touching the network."""
+    from src.scraper.har import har_path
+
+    scraper = CareerPageScraper()
+    with patch('src.scraper.har.Config.SCRAPER_HAR_DIR', str(tmp_path)), \
+         patch('src.scraper.playwright_scraper.sync_playwright') as mock_pw:
+        path = har_path(sample_config.career_url)
+        mock_browser = _har_browser(mock_pw)
+
+        with patch('src.scraper.playwright_scraper.Config.SCRAPER_HAR_MODE', "record"):
+            scraper.scrape_company(sample_config)
+        assert mock_browser.new_context.call_args.kwargs["record_har_path"] == path
+        mock_browser.new_page.assert_not_called()
+        mock_browser.new_context.return_value.close.assert_called_once()
+
+        with patch('src.scraper.playwright_scraper.Config.SCRAPER_HAR_MODE', "replay"):
+            with pytest.raises(FileNotFoundError):
+                scraper.scrape_company(sample_config)
+
+            open(path, "w").close()
+            jobs = scraper.scrape_company(sample_config)
+
+        assert [job.role for job in jobs] == ["Role 1"]
+        mock_browser.new_context.return_value.route_from_har.assert_called_once_with(path, not_found="abort")
+
+def test_scraper_waits_for_job_containers(sample_config):
+    """Test that a load waits for the container selector within the company's timeout, then reads what is there."""
+    from playwright.sync_api import TimeoutError
+
+    scraper = CareerPageScraper()
+    with patch('src.scraper.playwright_scraper.sync_playwright') as mock_pw:
+        mock_browser = Mock()
+        mock_pw.return_value.__enter__.return_value.webkit.launch.return_value = mock_browser
+        mock_page = mock_browser.new_page.return_value
+        mock_page.goto.return_value.status = 200
+        mock_page.evaluate.return_value = 100
+        mock_page.locator.return_value.all.return_value = [_container("Role 1")]
+
+        jobs = scraper.scrape_company(sample_config.model_copy(update={"timeout_ms": 5000}))
+        assert mock_page.goto.call_args.kwargs["wait_until"] == "domcontentloaded"
+        assert mock_page.wait_for_selector.call_args.args == (sample_config.job_container_selector,)
+        assert 0 < mock_page.wait_for_selector.call_args.kwargs["timeout"] <= 5000
+        assert jobs.load_ms is not None
+
+        mock_page.wait_for_selector.side_effect = TimeoutError("Timeout 5000ms exceeded")
+        mock_page.locator.return_value.all.return_value = []
+        jobs = scraper.scrape_company(sample_config.model_copy(update={"timeout_ms": 5000}))
+        assert list(jobs) == []
+        assert jobs.load_ms is None
+
+        mock_page.wait_for_selector.reset_mock()
+        scraper.scrape_company(sample_config.model_copy(update={"wait_for": "networkidle"}))
+        assert mock_page.goto.call_args.kwargs["wait_until"] == "networkidle"
+        mock_page.wait_for_selector.assert_not_called()
+
+def test_scraper_launches_each_companys_engine(sample_config):
+    """Test that a warm thread relaunches only when the engine changes, with Chromium flags only for Chromium."""
+    scraper = CareerPageScraper(keep_browser=True)
+    with patch('src.scraper.playwright_scraper.sync_playwright') as mock_pw:
+        playwright = mock_pw.return_value.start.return_value
+        for engine in (playwright.webkit, playwright.chromium):
+            mock_page = engine.launch.return_value.new_page.return_value
+            mock_page.goto.return_value.status = 200
+            mock_page.evaluate.return_value = 100
+            mock_page.locator.return_value.all.return_value = [_container("Role 1")]
+
+        scraper.scrape_company(sample_config)
+        scraper.scrape_company(sample_config.model_copy(update={"browser": "webkit"}))
+        assert playwright.webkit.launch.call_count == 1
+        assert playwright.webkit.launch.call_args.kwargs["args"] == []
+
+        scraper.scrape_company(sample_config.model_copy(update={"browser": "chromium"}))
+        playwright.webkit.launch.return_value.close.assert_called_once()
+        assert "--single-process" in playwright.chromium.launch.call_args.kwargs["args"]
+        scraper.close_thread_browser()
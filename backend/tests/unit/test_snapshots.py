@@ -0,0 +1,25 @@
+import hashlib
+from src.diff.snapshots import JobSnapshot
+
+def job_id(n):
+    return hashlib.sha256(f"job {n}".encode()).hexdigest()
+
+def test_snapshot_diff_finds_added_and_removed_jobs():
+    """Test that diffing two snapshots yields exactly the added and removed job IDs."""
+    previous = JobSnapshot.from_ids(job_id(n) for n in range(0, 100))
+    current = JobSnapshot.from_ids(job_id(n) for n in range(10, 120))
+
+    added, removed = previous.diff(current)
+
+    assert sorted(added) == sorted(job_id(n) for n in range(100, 120))
+    assert sorted(removed) == sorted(job_id(n) for n in range(0, 10))
+    assert JobSnapshot().diff(current) == (current.ids(), [])
+
+def test_snapshot_round_trips_through_packed_bytes():
+    """Test that a snapshot packs to 32 bytes per job and unpacks to the same IDs."""
+    snapshot = JobSnapshot.from_ids([job_id(3), job_id(1), job_id(3), job_id(2)])
+
+    data = snapshot.to_bytes()
+
+    assert len(data) == 3 * 32
+    assert JobSnapshot.from_bytes(data).ids() == snapshot.ids() == sorted({job_id(1), job_id(2), job_id(3)})
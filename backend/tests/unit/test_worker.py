@@ -0,0 +1,82 @@
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from src import clients
+from src.models import ScanCursor, ScraperConfig, UserProfile, UserFilters
+from src.worker import ScanWorker
+
+def make_config(company):
+    return ScraperConfig(
+        company=company,
+        career_url=f"https://{company.lower()}.com/careers",
+        job_container_selector=".job",
+        title_selector="h3",
+        location_selector=".loc",
+        link_selector="a",
+    )
+
+@pytest.fixture
+def worker():
+    db = Mock()
+    db.get_users.return_value = [
+        UserProfile(push_token="ExponentPushToken[a]", user_id="a", filters=UserFilters(companies=["Acme", "Globex"])),
+    ]
+    db.get_companies.return_value = []
+    db.get_scan_cursor.return_value = ScanCursor()
+    db.get_seen_jobs.return_value = set()
+    db.get_scraper_config.side_effect = make_config
+    db.get_push_tickets.return_value = []
+    scraper = Mock()
+    scraper.scrape_company.return_value = []
+    clients.use("firestore", db)
+    clients.use("scraper", scraper)
+    clients.use("notifier", Mock())
+
+    with patch('src.worker.Config.FIREBASE_PROJECT_ID', "test"), \
+         patch('src.worker.Config.ANTHROPIC_API_KEY', "test"), \
+         patch('src.worker.Config.NEAR_DUPLICATE_ENABLED', False), \
+         patch('src.worker.Config.SCRAPER_CONCURRENCY', 2):
+        worker = ScanWorker()
+        worker.start()
+        yield worker
+
+def test_worker_scans_due_companies_and_keeps_state(worker):
+    """Test that a tick scans due companies once, keeps state in memory and reloads nothing."""
+    worker.tick()
+    worker.tick()
+
+    assert worker.scraper.scrape_company.call_count == 2
+    assert worker.scraper.keep_browser is True
+    assert set(worker.cursor.next_due) == {"Acme", "Globex"}
+    assert worker.db.get_users.call_count == 1
+    assert worker.db.get_seen_jobs.call_count == 1
+    assert worker.sleep_seconds() > 1.0
+
+def test_stop_defers_new_companies_and_closes_browsers(worker):
+    """Test that after a stop request no company starts and shutdown closes each thread's browser."""
+    closed_on = []
+    worker.scraper.close_thread_browser.side_effect = lambda: closed_on.append(threading.get_ident())
+
+    worker.stop()
+    stats = worker.tick()
+    worker.shutdown()
+
+    worker.scraper.scrape_company.assert_not_called()
+    assert sorted(stats["deferred"]) == ["Acme", "Globex"]
+    worker.db.save_scan_cursor.assert_called()
+    assert len(set(closed_on)) == 2
+
+def test_refresh_reloads_the_seen_set(worker):
+    """Test that the seen set is replaced on refresh, dropping expired IDs and picking up other scanners' writes."""
+    worker.db.get_seen_jobs.return_value = {"old"}
+    worker.refresh_users()
+    assert worker.seen_job_ids == {"old"}
+    worker.db.get_seen_jobs.return_value = {"other"}
+
+    with patch('src.worker.Config.WORKER_USERS_REFRESH_S', 0):
+        worker.refresh_users()
+        assert worker.seen_job_ids == {"other"}
+
+        worker.db.get_seen_jobs.side_effect = RuntimeError("unavailable")
+        worker.refresh_users()
+        assert worker.seen_job_ids == {"other"}